@@ -9,13 +9,18 @@
 """
 
 import logging
-from typing import List
+from datetime import datetime
+from typing import Dict, Iterable, List
 
-from sqlalchemy import create_engine, Table, MetaData, select
+from sqlalchemy import create_engine, Table, MetaData, select, func, text
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import CursorResult
 from typing_extensions import Self
 
 from . import configs
+from .price_alerts import evaluate_price_alerts
+
+logger = logging.getLogger(__name__)
 
 
 class DatabaseConnect:
@@ -114,3 +119,126 @@ def _read_symbols_and_ids_from_db():
         for row in result:
             all_listed_symbols.append({"symbol": row[0], "symbol_id": row[1]})
     return all_listed_symbols
+
+
+def _write_latest_stock_prices_to_db(db_connection: DatabaseConnect, all_daily_stock_data: List[Dict]) -> None:
+    """Fold newly written daily_stock_summary rows into the latest_stock_price table
+
+    Only rows with a close price are used, and an existing row is only replaced by a row with the same or a later date,
+    so that backfilling older dates never overwrites the latest price.
+    """
+    latest_stock_prices: Dict[str, Dict] = {}
+    for daily_stock_data in all_daily_stock_data:
+        if not daily_stock_data.get("close_price"):
+            continue
+        stock_date = daily_stock_data["date"]
+        if isinstance(stock_date, str):
+            stock_date = datetime.strptime(stock_date, "%Y-%m-%d").date()
+        elif isinstance(stock_date, datetime):
+            stock_date = stock_date.date()
+        symbol = daily_stock_data["symbol"]
+        if symbol not in latest_stock_prices or latest_stock_prices[symbol]["date"] <= stock_date:
+            latest_stock_prices[symbol] = {
+                "symbol": symbol,
+                "date": stock_date,
+                "close_price": daily_stock_data["close_price"],
+            }
+    if not latest_stock_prices:
+        return
+    latest_stock_price_table = Table(
+        "latest_stock_price",
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connection.dbengine,
+    )
+    insert_stmt = insert(latest_stock_price_table).values(list(latest_stock_prices.values()))
+    # the close price has to be set before the date, since MySQL applies these assignments in order
+    upsert_stmt = insert_stmt.on_duplicate_key_update(
+        [
+            (
+                "close_price",
+                func.IF(
+                    insert_stmt.inserted.date >= latest_stock_price_table.c.date,
+                    insert_stmt.inserted.close_price,
+                    latest_stock_price_table.c.close_price,
+                ),
+            ),
+            ("date", func.GREATEST(latest_stock_price_table.c.date, insert_stmt.inserted.date)),
+        ]
+    )
+    result = db_connection.dbcon.execute(upsert_stmt)
+    logger.debug("Number of rows affected in the latest_stock_price table was " + str(result.rowcount))
+    _publish_data_changes(
+        db_connection, "latest_stock_price", symbols=[stock_data["symbol"] for stock_data in all_daily_stock_data]
+    )
+    # alert the users monitoring these symbols if the new prices reached any of their alert prices
+    try:
+        evaluate_price_alerts(db_connection, latest_stock_prices.keys())
+    except Exception:
+        logger.exception("Could not evaluate the price alerts for the latest stock prices.")
+
+
+def _bump_data_versions(db_connection: DatabaseConnect, names: List[str]) -> None:
+    """Bump the version counters of the tables that were just written to
+
+    The website makes these versions part of its cache keys, so bumping them invalidates any cached pages
+    built from these tables (see stocks/caching.py).
+    """
+    if not names:
+        return
+    data_versions_table = Table(
+        "data_versions",
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connection.dbengine,
+    )
+    updated_at = datetime.utcnow()
+    insert_stmt = insert(data_versions_table).values(
+        [{"name": name, "version": 1, "updated_at": updated_at} for name in names]
+    )
+    upsert_stmt = insert_stmt.on_duplicate_key_update(
+        version=data_versions_table.c.version + 1,
+        updated_at=insert_stmt.inserted.updated_at,
+    )
+    db_connection.dbcon.execute(upsert_stmt)
+    logger.debug(f"Bumped the data versions for {names}")
+
+
+def _data_version_names(table_name: str, dates: Iterable = (), symbols: Iterable = ()) -> List[str]:
+    """Build the data version names that are published when rows of a table change
+
+    The names must match the ones that the website builds in stocks/caching.py.
+    """
+    names = [table_name]
+    # dates may be strings, dates, datetimes or pandas timestamps, so only keep the YYYY-MM-DD part
+    names += [f"{table_name}:date:{changed_date}" for changed_date in sorted({str(d)[:10] for d in dates})]
+    names += [f"{table_name}:symbol:{symbol}" for symbol in sorted(set(symbols))]
+    return list(dict.fromkeys(names))
+
+
+def _publish_data_changes(
+        db_connection: DatabaseConnect, table_name: str, dates: Iterable = (), symbols: Iterable = ()
+) -> None:
+    """Tell the website which dates and symbols of a table were just written to
+
+    This bumps the version of the whole table, as well as one version for each of the dates and symbols
+    changed, so that the website only has to drop the cached pages and API responses that depend on them.
+    """
+    _bump_data_versions(db_connection, _data_version_names(table_name, dates, symbols))
+
+
+def rebuild_latest_stock_price_table() -> int:
+    """Rebuild the latest_stock_price table from the full daily_stock_summary history"""
+    with DatabaseConnect() as db_connection:
+        result = db_connection.dbcon.execute(
+            text(
+                "INSERT INTO latest_stock_price (symbol, date, close_price) "
+                "SELECT t.symbol, t.date, t.close_price FROM daily_stock_summary t "
+                "INNER JOIN (SELECT symbol, MAX(date) AS max_date FROM daily_stock_summary "
+                "WHERE close_price > 0 GROUP BY symbol) tm ON t.symbol = tm.symbol AND t.date = tm.max_date "
+                "ON DUPLICATE KEY UPDATE date = VALUES(date), close_price = VALUES(close_price)"
+            )
+        )
+        logger.info("Rebuilt the latest_stock_price table. Number of rows affected was " + str(result.rowcount))
+        _bump_data_versions(db_connection, ["latest_stock_price"])
+    return 0
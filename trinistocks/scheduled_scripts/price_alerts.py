@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""This module alerts users when the price of a stock that they monitor crosses one of their alert prices
+
+The alerts are evaluated after every write of new prices (intraday or end of day), for the symbols written only.
+The alert rules of those symbols and their latest prices are each read in a single query, and are joined and
+compared in one vectorized pass, so the time taken depends on the number of symbols that changed rather than on
+the number of users. Each alert is only sent once per user, symbol, price date and type of alert, which is
+enforced by the unique key of the price_alerts table.
+"""
+
+import logging
+import smtplib
+import uuid
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from sqlalchemy import MetaData, Table, bindparam, text
+from sqlalchemy.dialects.mysql import insert
+
+logger = logging.getLogger(__name__)
+
+ALERT_PRICE_ABOVE = "price_above"
+ALERT_PRICE_BELOW = "price_below"
+# the column of the monitored stocks that holds the threshold of each type of alert
+ALERT_THRESHOLD_COLUMNS = {
+    ALERT_PRICE_ABOVE: "alert_price_above",
+    ALERT_PRICE_BELOW: "alert_price_below",
+}
+ALERT_COLUMNS = ["user_id", "email", "symbol", "date", "alert_type", "price", "threshold"]
+
+
+class AlertNotifier:
+    """Sends the alerts that were triggered. Subclass this to send alerts some other way."""
+
+    def notify(self, triggered_alerts_df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+
+class EmailAlertNotifier(AlertNotifier):
+    """Sends each user one email listing all of their alerts"""
+
+    def __init__(self, mailhost: str = "localhost", fromaddr: str = "admin@trinistocks.com"):
+        self.mailhost = mailhost
+        self.fromaddr = fromaddr
+
+    def notify(self, triggered_alerts_df: pd.DataFrame) -> None:
+        with smtplib.SMTP(self.mailhost) as smtp:
+            for email, user_alerts_df in triggered_alerts_df.groupby("email"):
+                message = EmailMessage()
+                message["Subject"] = "trinistocks.com price alerts"
+                message["From"] = self.fromaddr
+                message["To"] = email
+                message.set_content("\n".join(describe_alert(alert) for alert in user_alerts_df.to_dict("records")))
+                smtp.send_message(message)
+        logger.info(f"Emailed {len(triggered_alerts_df.index)} price alerts.")
+
+
+class LocalAlertNotifier(AlertNotifier):
+    """Keeps the alerts in memory instead of sending them, for tests and for running the alerts locally"""
+
+    def __init__(self):
+        self.sent_alerts: List[Dict] = []
+
+    def notify(self, triggered_alerts_df: pd.DataFrame) -> None:
+        self.sent_alerts.extend(triggered_alerts_df.to_dict("records"))
+
+
+def describe_alert(alert: Dict) -> str:
+    direction = "risen to" if alert["alert_type"] == ALERT_PRICE_ABOVE else "fallen to"
+    return (
+        f"{alert['symbol']} has {direction} ${alert['price']:.2f} on {alert['date']} "
+        f"(your alert price was ${alert['threshold']:.2f})."
+    )
+
+
+def find_triggered_alerts(alert_rules_df: pd.DataFrame, latest_prices_df: pd.DataFrame) -> pd.DataFrame:
+    """Join the alert rules of the monitored stocks with the latest prices of their symbols,
+    and return one row for each alert price that was reached
+
+    :param alert_rules_df: the user_id, email, symbol and alert price columns of the monitored stocks
+    :param latest_prices_df: the symbol, date and close_price of the symbols
+    """
+    rules_and_prices_df = alert_rules_df.merge(latest_prices_df, how="inner", on="symbol")
+    price = pd.to_numeric(rules_and_prices_df["close_price"], errors="coerce")
+    triggered_alerts = []
+    for alert_type, threshold_column in ALERT_THRESHOLD_COLUMNS.items():
+        threshold = pd.to_numeric(rules_and_prices_df[threshold_column], errors="coerce")
+        # comparisons with missing prices or thresholds are always false
+        if alert_type == ALERT_PRICE_ABOVE:
+            triggered = price >= threshold
+        else:
+            triggered = price <= threshold
+        triggered_alerts.append(
+            rules_and_prices_df.loc[triggered, ["user_id", "email", "symbol", "date"]].assign(
+                alert_type=alert_type, price=price[triggered], threshold=threshold[triggered]
+            )
+        )
+    return pd.concat(triggered_alerts, ignore_index=True)[ALERT_COLUMNS]
+
+
+def _read_alert_rules_from_db(db_connection, symbols: List[str]) -> pd.DataFrame:
+    """Read the alert prices set on the symbols, by the users with active accounts"""
+    select_stmt = text(
+        "SELECT m.user_id, u.email, m.symbol, m.alert_price_above, m.alert_price_below "
+        "FROM stocks_monitoredstocks m INNER JOIN stocks_user u ON u.id = m.user_id "
+        "WHERE m.symbol IN :symbols AND u.is_active "
+        "AND (m.alert_price_above IS NOT NULL OR m.alert_price_below IS NOT NULL)"
+    ).bindparams(bindparam("symbols", expanding=True))
+    return pd.read_sql(select_stmt, db_connection.dbcon, params={"symbols": symbols})
+
+
+def _read_latest_prices_from_db(db_connection, symbols: List[str]) -> pd.DataFrame:
+    select_stmt = text(
+        "SELECT symbol, date, close_price FROM latest_stock_price WHERE symbol IN :symbols"
+    ).bindparams(bindparam("symbols", expanding=True))
+    return pd.read_sql(select_stmt, db_connection.dbcon, params={"symbols": symbols})
+
+
+def _drop_alerts_already_sent(db_connection, triggered_alerts_df: pd.DataFrame) -> pd.DataFrame:
+    """Leave out the alerts that were already sent for the same price date"""
+    select_stmt = text(
+        "SELECT user_id, symbol, date, alert_type, 1 AS already_sent FROM price_alerts "
+        "WHERE symbol IN :symbols AND date IN :dates"
+    ).bindparams(bindparam("symbols", expanding=True), bindparam("dates", expanding=True))
+    sent_alerts_df = pd.read_sql(
+        select_stmt,
+        db_connection.dbcon,
+        params={
+            "symbols": triggered_alerts_df["symbol"].unique().tolist(),
+            "dates": triggered_alerts_df["date"].unique().tolist(),
+        },
+    )
+    merged_alerts_df = triggered_alerts_df.merge(
+        sent_alerts_df, how="left", on=["user_id", "symbol", "date", "alert_type"]
+    )
+    return merged_alerts_df[merged_alerts_df["already_sent"].isnull()][ALERT_COLUMNS]
+
+
+def _claim_alerts_in_db(db_connection, new_alerts_df: pd.DataFrame) -> pd.DataFrame:
+    """Record the alerts as sent, and return the ones that this run recorded first
+
+    The alerts are inserted with a token for this run, and the ones that another run already inserted are ignored
+    by the unique key, so reading back the rows with this run's token gives the alerts that this run must send.
+    """
+    price_alerts_table = Table(
+        "price_alerts",
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connection.dbengine,
+    )
+    claim_token = uuid.uuid4().hex
+    sent_at = pd.Timestamp.utcnow().to_pydatetime().replace(tzinfo=None)
+    insert_stmt = insert(price_alerts_table).prefix_with("IGNORE").values(
+        new_alerts_df.drop(columns=["email"]).assign(sent_at=sent_at, claim_token=claim_token).to_dict("records")
+    )
+    result = db_connection.dbcon.execute(insert_stmt)
+    logger.debug("Number of rows affected in the price_alerts table was " + str(result.rowcount))
+    claimed_alerts_df = pd.read_sql(
+        text("SELECT user_id, symbol, date, alert_type FROM price_alerts WHERE claim_token = :claim_token"),
+        db_connection.dbcon,
+        params={"claim_token": claim_token},
+    )
+    claimed_alerts_df["date"] = pd.to_datetime(claimed_alerts_df["date"]).dt.date
+    return new_alerts_df.assign(date=pd.to_datetime(new_alerts_df["date"]).dt.date).merge(
+        claimed_alerts_df, how="inner", on=["user_id", "symbol", "date", "alert_type"]
+    )[ALERT_COLUMNS]
+
+
+def evaluate_price_alerts(
+        db_connection, symbols: Iterable[str], notifier: Optional[AlertNotifier] = None
+) -> int:
+    """Send the alerts triggered by the latest prices of the symbols that were just written to
+
+    :param db_connection: the DatabaseConnect that wrote the prices
+    :param symbols: the symbols whose prices were written
+    :param notifier: what sends the alerts (emails by default)
+    :return: the number of alerts sent
+    """
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return 0
+    alert_rules_df = _read_alert_rules_from_db(db_connection, symbols)
+    if alert_rules_df.empty:
+        return 0
+    latest_prices_df = _read_latest_prices_from_db(db_connection, alert_rules_df["symbol"].unique().tolist())
+    triggered_alerts_df = find_triggered_alerts(alert_rules_df, latest_prices_df)
+    if triggered_alerts_df.empty:
+        return 0
+    new_alerts_df = _drop_alerts_already_sent(db_connection, triggered_alerts_df)
+    if new_alerts_df.empty:
+        return 0
+    # record the alerts before sending them, so that a failure to send can never send them twice,
+    # and only send the ones that an overlapping run did not record first
+    claimed_alerts_df = _claim_alerts_in_db(db_connection, new_alerts_df)
+    if claimed_alerts_df.empty:
+        return 0
+    if notifier is None:
+        notifier = EmailAlertNotifier()
+    notifier.notify(claimed_alerts_df)
+    logger.info(f"Sent {len(claimed_alerts_df.index)} price alerts for {symbols}.")
+    return len(claimed_alerts_df.index)
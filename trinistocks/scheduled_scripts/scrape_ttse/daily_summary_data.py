@@ -17,7 +17,8 @@ from typing_extensions import Self
 
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db
+from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db, \
+    _write_latest_stock_prices_to_db, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
@@ -135,6 +136,16 @@ class DailySummaryDataScraper:
                     insert_stmt = insert(daily_stock_summary_table).values(all_daily_stock_data)
                     upsert_stmt = insert_stmt.on_duplicate_key_update({x.name: x for x in insert_stmt.inserted})
                     result = db_connect.dbcon.execute(upsert_stmt)
+                    _write_latest_stock_prices_to_db(db_connect, all_daily_stock_data)
+                    _publish_data_changes(
+                        db_connect, "historical_indices_info", dates=market_indices_table["date"]
+                    )
+                    _publish_data_changes(
+                        db_connect,
+                        "daily_stock_summary",
+                        dates=[stock_data["date"] for stock_data in all_daily_stock_data],
+                        symbols=[stock_data["symbol"] for stock_data in all_daily_stock_data],
+                    )
                     execute_completed_successfully = True
                     logger.info(
                         "Successfully scraped and wrote to db daily equity/shares data for " + fetch_date + pid_string
@@ -417,7 +428,7 @@ class DailySummaryDataScraper:
             custom_logging.flush_smtp_logger()
 
     def _write_daily_stock_data_for_today_to_db(self, all_daily_stock_data):
-        with DatabaseConnect as db_connect:
+        with DatabaseConnect() as db_connect:
             # load the daily summary table
             daily_stock_summary_table = Table(
                 "daily_stock_summary",
@@ -432,6 +443,13 @@ class DailySummaryDataScraper:
                     insert_stmt = insert(daily_stock_summary_table).values(all_daily_stock_data)
                     upsert_stmt = insert_stmt.on_duplicate_key_update({x.name: x for x in insert_stmt.inserted})
                     result = db_connect.dbcon.execute(upsert_stmt)
+                    _write_latest_stock_prices_to_db(db_connect, all_daily_stock_data)
+                    _publish_data_changes(
+                        db_connect,
+                        "daily_stock_summary",
+                        dates=[stock_data["date"] for stock_data in all_daily_stock_data],
+                        symbols=[stock_data["symbol"] for stock_data in all_daily_stock_data],
+                    )
                     execute_completed_successfully = True
                     logger.debug("Successfully scraped and wrote to db daily equity/shares data for daily trades.")
                     logger.debug("Number of rows affected in the daily_stock_summary table was " + str(result.rowcount))
@@ -12,7 +12,7 @@ from typing_extensions import Self
 
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db
+from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
@@ -69,6 +69,9 @@ class DividendScraper:
                     upsert_stmt = insert_stmt.on_duplicate_key_update({x.name: x for x in insert_stmt.inserted})
                     result = db_connection.dbcon.execute(upsert_stmt)
                     execute_completed_successfully = True
+                    _publish_data_changes(
+                        db_connection, "historical_dividend_info", dates=dividend_table["record_date"], symbols=[symbol]
+                    )
                 except sqlalchemy.exc.OperationalError as operr:
                     logger.warning(str(operr))
                     time.sleep(2)
@@ -11,7 +11,7 @@ from typing_extensions import Self
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts.crosslisted_symbols import USD_STOCK_SYMBOLS
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect
+from scheduled_scripts.database_ops import DatabaseConnect, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger()
@@ -73,6 +73,7 @@ class ListedEquitiesScraper:
             )
             result = db_obj.dbcon.execute(listed_equities_upsert_stmt)
             logger.debug("Database update successful. Number of rows affected was " + str(result.rowcount))
+            _publish_data_changes(db_obj, "listed_equities", symbols=all_listed_equity_data_df["symbol"])
 
     def _scrape_symbol_ids(self):
         logger.info("Now trying to fetch symbol ids for news")
@@ -11,7 +11,7 @@ from typing_extensions import Self
 
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect, _read_symbols_and_ids_from_db
+from scheduled_scripts.database_ops import DatabaseConnect, _read_symbols_and_ids_from_db, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger('root')
@@ -61,6 +61,12 @@ class NewsroomDataScraper:
             upsert_stmt = insert_stmt.on_duplicate_key_update({x.name: x for x in insert_stmt.inserted})
             result = db_connection.dbcon.execute(upsert_stmt)
             logger.debug("Database update successful. Number of rows affected was " + str(result.rowcount))
+            _publish_data_changes(
+                db_connection,
+                "stock_news_data",
+                dates=[news_data["date"] for news_data in all_news_data],
+                symbols=[news_data["symbol"] for news_data in all_news_data],
+            )
 
     def _setup_newsroom_data_scrapers_in_subprocesses(self, all_listed_symbols, end_date, start_date):
         # set up a variable to store all data to be written to the db table
@@ -8,7 +8,7 @@ from typing_extensions import Self
 
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect
+from scheduled_scripts.database_ops import DatabaseConnect, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
@@ -88,4 +88,9 @@ class StockIndicesScraper:
             insert_stmt = insert(historical_indices_table).values(all_indices_data)
             upsert_stmt = insert_stmt.on_duplicate_key_update({x.name: x for x in insert_stmt.inserted})
             result = db_connection.dbcon.execute(upsert_stmt)
-            logger.debug("Database update successful. Number of rows affected was " + str(result.rowcount))
\ No newline at end of file
+            logger.debug("Database update successful. Number of rows affected was " + str(result.rowcount))
+            _publish_data_changes(
+                db_connection,
+                "historical_indices_info",
+                dates=[index_data["date"] for index_data in all_indices_data],
+            )
\ No newline at end of file
@@ -11,7 +11,7 @@ from typing_extensions import Self
 
 from scheduled_scripts.scraping_engine import ScrapingEngine
 from scheduled_scripts import custom_logging, logging_configs
-from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db
+from scheduled_scripts.database_ops import DatabaseConnect, _read_listed_symbols_from_db, _publish_data_changes
 
 dictConfig(logging_configs.LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
@@ -75,6 +75,11 @@ class TechnicalAnalysisDataScraper:
                     )
                     result = db_connect.dbcon.execute(technical_analysis_summary_upsert_stmt)
                     execute_completed_successfully = True
+                    _publish_data_changes(
+                        db_connect,
+                        "technical_analysis_summary",
+                        symbols=[stock_technical_data["symbol"] for stock_technical_data in all_technical_data],
+                    )
                 except sqlalchemy.exc.OperationalError as operr:
                     logger.warning(str(operr))
                     time.sleep(1)
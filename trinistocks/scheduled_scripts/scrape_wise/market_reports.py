@@ -4,6 +4,7 @@ setup_django_orm()
 
 from datetime import date, datetime, timedelta
 from stocks.models import DailyStockSummary, HistoricalIndicesInfo, ListedEquities
+from stocks import caching
 from typing_extensions import Self
 from typing import List, TypedDict, Tuple, Optional
 import requests
@@ -22,6 +23,7 @@ from django.db.models import QuerySet
 from pandas import DataFrame, Series
 
 from scheduled_scripts import logging_configs
+from scheduled_scripts.database_ops import DatabaseConnect, _write_latest_stock_prices_to_db
 from logging.config import dictConfig
 
 dictConfig(logging_configs.LOGGING_CONFIG)
@@ -203,9 +205,11 @@ class MarketReportsScraper:
                         historical_indices_info = HistoricalIndicesInfo(date=report_date, index_name="Sme Totals")
                     historical_indices_info.index_value = row[1].replace(",", "")
                     historical_indices_info.save()
+        caching.publish_data_changes(caching.HISTORICAL_INDICES_INFO, dates=[report_date])
 
     def _parse_data_from_daily_trading_report_table(self: Self, report_date: datetime.date,
                                                     daily_trading_report_table: DataFrame):
+        all_daily_stock_data: List[dict] = []
         for index, row in daily_trading_report_table.iterrows():
             security_name: str = row[0]
             if not security_name or security_name in ['Security', 'Banking', 'Conglomerates', 'Energy', 'Manufacturing',
@@ -242,6 +246,16 @@ class MarketReportsScraper:
             daily_stock_summary.last_sale_price = close_quote
             daily_stock_summary.change_dollars = close_quote - open_quote
             daily_stock_summary.save()
+            all_daily_stock_data.append(
+                {"symbol": listed_equity.symbol, "date": report_date, "close_price": close_quote})
+        # keep the latest prices table in step with the daily summaries that we just saved
+        with DatabaseConnect() as db_connect:
+            _write_latest_stock_prices_to_db(db_connect, all_daily_stock_data)
+        caching.publish_data_changes(
+            caching.DAILY_STOCK_SUMMARY,
+            dates=[report_date],
+            symbols=[stock_data["symbol"] for stock_data in all_daily_stock_data],
+        )
 
     def _parse_prices_for_symbol(self: Self, row: Series) -> Tuple[
         float, float, float, float, int, float, float, int, float, int, bool]:
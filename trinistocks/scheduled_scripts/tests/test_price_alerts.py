@@ -0,0 +1,47 @@
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+from scheduled_scripts.price_alerts import ALERT_PRICE_ABOVE, ALERT_PRICE_BELOW, LocalAlertNotifier, \
+    describe_alert, find_triggered_alerts
+
+
+def _alert_rules_df():
+    return pd.DataFrame.from_records(
+        [
+            {"user_id": 1, "email": "a@trinistocks.com", "symbol": "AGL", "alert_price_above": Decimal("20.00"),
+             "alert_price_below": None},
+            {"user_id": 2, "email": "b@trinistocks.com", "symbol": "AGL", "alert_price_above": None,
+             "alert_price_below": Decimal("25.00")},
+            {"user_id": 2, "email": "b@trinistocks.com", "symbol": "NCBFG", "alert_price_above": Decimal("5.00"),
+             "alert_price_below": Decimal("2.00")},
+            {"user_id": 3, "email": "c@trinistocks.com", "symbol": "WCO", "alert_price_above": Decimal("1.00"),
+             "alert_price_below": None},
+        ]
+    )
+
+
+def _latest_prices_df():
+    return pd.DataFrame.from_records(
+        [
+            {"symbol": "AGL", "date": date(2023, 4, 12), "close_price": Decimal("21.50")},
+            {"symbol": "NCBFG", "date": date(2023, 4, 12), "close_price": Decimal("3.10")},
+        ]
+    )
+
+
+def test_find_triggered_alerts():
+    triggered_alerts_df = find_triggered_alerts(_alert_rules_df(), _latest_prices_df())
+    triggered_alerts = triggered_alerts_df[["user_id", "symbol", "alert_type"]].to_dict("records")
+    assert sorted(triggered_alerts, key=lambda alert: alert["user_id"]) == [
+        {"user_id": 1, "symbol": "AGL", "alert_type": ALERT_PRICE_ABOVE},
+        {"user_id": 2, "symbol": "AGL", "alert_type": ALERT_PRICE_BELOW},
+    ]
+
+
+def test_local_alert_notifier():
+    notifier = LocalAlertNotifier()
+    notifier.notify(find_triggered_alerts(_alert_rules_df(), _latest_prices_df()))
+    assert len(notifier.sent_alerts) == 2
+    assert describe_alert(notifier.sent_alerts[0]).startswith("AGL has")
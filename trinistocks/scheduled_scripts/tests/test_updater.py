@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from scheduled_scripts.updatedb.updater import PRICE_DEPENDENT_RATIO_COLUMNS, RAW_FUNDAMENTAL_DATA_HASHES_TABLE_NAME, \
+    _calculate_eps_growth_rates, _drop_unchanged_latest_reports, _hash_raw_fundamental_data, \
+    _select_reports_to_recalculate
+
+
+def _reports_df():
+    return pd.DataFrame.from_records(
+        [
+            {"symbol": "AGL", "report_type": "annual", "date": pd.Timestamp(2021, 12, 31),
+             "basic_earnings_per_share": 4.0, "price_to_earnings_ratio": 10.0},
+            {"symbol": "AGL", "report_type": "annual", "date": pd.Timestamp(2020, 12, 31),
+             "basic_earnings_per_share": 2.0, "price_to_earnings_ratio": 12.0},
+            {"symbol": "NCBFG", "report_type": "annual", "date": pd.Timestamp(2020, 9, 30),
+             "basic_earnings_per_share": -2.0, "price_to_earnings_ratio": None},
+            {"symbol": "NCBFG", "report_type": "annual", "date": pd.Timestamp(2021, 9, 30),
+             "basic_earnings_per_share": -1.0, "price_to_earnings_ratio": None},
+        ]
+    )
+
+
+def test_eps_growth_rate_of_latest_report():
+    calculated_ratios_df = _calculate_eps_growth_rates(_reports_df()).set_index(["symbol", "date"])
+    latest_report = calculated_ratios_df.loc[("AGL", pd.Timestamp(2021, 12, 31))]
+    assert latest_report["EPS_growth_rate"] == pytest.approx(100.0)
+    assert latest_report["PEG"] == pytest.approx(0.1)
+    # the first report has nothing to grow from
+    assert pd.isnull(calculated_ratios_df.loc[("AGL", pd.Timestamp(2020, 12, 31)), "EPS_growth_rate"])
+    # a loss halving is growth
+    assert calculated_ratios_df.loc[("NCBFG", pd.Timestamp(2021, 9, 30)), "EPS_growth_rate"] == pytest.approx(50.0)
+
+
+def _recalculate_reports(db_connect, raw_data_df):
+    """Select the reports that an incremental run recalculates, and calculate their EPS growth rates"""
+    raw_data_df = raw_data_df.assign(report_hash=_hash_raw_fundamental_data(raw_data_df))
+    raw_data_df["is_latest_report"] = raw_data_df["date"] == raw_data_df.groupby(
+        ["symbol", "report_type"]
+    )["date"].transform("max")
+    calculated_ratios_df = _calculate_eps_growth_rates(_select_reports_to_recalculate(db_connect, raw_data_df))
+    calculated_ratios_df = calculated_ratios_df[~calculated_ratios_df["is_previous_report"]]
+    return calculated_ratios_df.assign(dividend_yield=None, price_to_book_ratio=None, cash_per_share=None)
+
+
+def _store_ratios(db_connect, written_ratios_df):
+    written_ratios_df = written_ratios_df.assign(date=written_ratios_df["date"].dt.date)
+    written_ratios_df[["symbol", "date", "report_type", "report_hash"]].to_sql(
+        RAW_FUNDAMENTAL_DATA_HASHES_TABLE_NAME, db_connect.dbcon, index=False, if_exists="replace"
+    )
+    written_ratios_df[["symbol", "date", "report_type", "EPS_growth_rate"] + PRICE_DEPENDENT_RATIO_COLUMNS].to_sql(
+        "calculated_fundamental_ratios", db_connect.dbcon, index=False, if_exists="replace"
+    )
+
+
+def test_unchanged_latest_report_keeps_its_eps_growth_rate():
+    dbengine = create_engine("sqlite://")
+    db_connect = SimpleNamespace(dbengine=dbengine, dbcon=dbengine.connect())
+    raw_data_df = _reports_df().query("symbol == 'AGL'")
+    # nothing has been stored yet, so the first run writes every report
+    _store_ratios(db_connect, _calculate_eps_growth_rates(raw_data_df).assign(
+        report_hash="", dividend_yield=None, price_to_book_ratio=None, cash_per_share=None
+    ).iloc[:0])
+    first_run_ratios_df = _drop_unchanged_latest_reports(db_connect, _recalculate_reports(db_connect, raw_data_df))
+    assert len(first_run_ratios_df) == 2
+    _store_ratios(db_connect, first_run_ratios_df)
+    # rerunning with the same reports and price only recalculates the latest report, to the same EPS growth rate
+    # and PEG as before, so nothing is written over them
+    rerun_ratios_df = _recalculate_reports(db_connect, raw_data_df)
+    assert len(rerun_ratios_df) == 1
+    assert rerun_ratios_df.iloc[0]["EPS_growth_rate"] == pytest.approx(100.0)
+    assert rerun_ratios_df.iloc[0]["PEG"] == pytest.approx(0.1)
+    assert _drop_unchanged_latest_reports(db_connect, rerun_ratios_df).empty
@@ -41,6 +41,15 @@ def test_calculate_fundamental_analysis_ratios():
     )
 
 
+def test_recalculate_all_fundamental_analysis_ratios():
+    assert (
+            updater.calculate_fundamental_analysis_ratios(
+                TTD_JMD=21.33, TTD_USD=0.15, TTD_BBD=0.29, recalculate_all_ratios=True
+            )
+            == 0
+    )
+
+
 def test_update_dividend_yields():
     assert (
             updater.update_dividend_yields(TTD_JMD=21.33, TTD_USD=0.15, TTD_BBD=0.29) == 0
@@ -51,6 +60,14 @@ def test_update_portfolio_summary_book_costs():
     assert updater.update_portfolio_summary_book_costs() == 0
 
 
+def test_backfill_portfolio_daily_values():
+    assert updater.backfill_portfolio_daily_values() == 0
+
+
+def test_update_portfolio_daily_values():
+    assert updater.update_portfolio_daily_values() == 0
+
+
 def test_update_simulator_portfolio_summary_book_costs():
     assert updater.update_simulator_portfolio_summary_book_costs() == 0
 
@@ -75,5 +92,17 @@ def test_update_simulator_games():
     assert updater.update_simulator_games() == 0
 
 
+def test_rebuild_stock_screener():
+    assert updater.rebuild_stock_screener() == 0
+
+
+def test_update_simulator_games_for_specific_games():
+    assert updater.update_simulator_games(game_ids=[1]) == 0
+
+
 def test_main():
     assert updater.main([]) == 0
+
+
+def test_rebuild_latest_stock_prices():
+    assert updater.main(["--rebuild_latest_stock_prices"]) == 0
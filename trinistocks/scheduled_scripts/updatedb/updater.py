@@ -31,11 +31,11 @@ import sqlalchemy.exc
 # Imports from the cheese factory
 from pid import PidFile
 from pid.decorator import pidfile
-from sqlalchemy import (MetaData, Table)
+from sqlalchemy import (MetaData, Table, bindparam, text)
 from sqlalchemy.dialects.mysql import insert
 
 # Imports from the local filesystem
-from scheduled_scripts.database_ops import DatabaseConnect
+from scheduled_scripts.database_ops import DatabaseConnect, rebuild_latest_stock_price_table, _publish_data_changes
 from scheduled_scripts import logging_configs
 from scheduled_scripts.crosslisted_symbols import (BBD_DIVIDEND_SYMBOLS, JMD_DIVIDEND_SYMBOLS,
                                                    USD_DIVIDEND_SYMBOLS, USD_STOCK_SYMBOLS)
@@ -48,7 +48,38 @@ logger = logging.getLogger()
 
 # region CONSTANTS
 # Put your constants here. These should be named in CAPS.
-
+CURRENCY_CONVERSION_RATES_TABLE_NAME = "historical_currency_conversion_rates"
+RAW_FUNDAMENTAL_DATA_HASHES_TABLE_NAME = "raw_fundamental_data_hashes"
+# the number of portfolio daily values written to the database at a time
+PORTFOLIO_DAILY_VALUE_WRITE_CHUNK_SIZE = 5000
+# the latest technical analysis, annual fundamental ratios and dividend yields of every listed symbol, in one row each
+STOCK_SCREENER_SELECT_QUERY = """
+SELECT le.symbol, le.security_name, le.sector,
+    COALESCE(lsp.close_price, ta.last_close_price) AS last_close_price,
+    ta.sma_20, ta.sma_200, ta.beta, ta.adtv, ta.high_52w, ta.low_52w, ta.wtd, ta.mtd, ta.ytd,
+    lf.date AS report_date, lf.RoE, lf.EPS, lf.EPS_growth_rate, lf.PEG, lf.RoIC, lf.price_to_earnings_ratio,
+    lf.price_to_book_ratio, lf.dividend_yield, lf.dividend_payout_ratio, lf.current_ratio,
+    dy.ttm_yield, dy.three_year_yield, dy.five_year_yield, dy.ten_year_yield
+FROM listed_equities le
+LEFT JOIN latest_stock_price lsp ON lsp.symbol = le.symbol
+LEFT JOIN technical_analysis_summary ta ON ta.symbol = le.symbol
+LEFT JOIN latest_fundamental_ratios lf ON lf.symbol = le.symbol AND lf.report_type = 'annual'
+LEFT JOIN stocks_summarizeddividendyield dy ON dy.symbol_id = le.symbol
+"""
+STOCK_SCREENER_COLUMNS = (
+    "symbol, security_name, sector, last_close_price, sma_20, sma_200, beta, adtv, high_52w, low_52w, wtd, mtd, ytd, "
+    "report_date, RoE, EPS, EPS_growth_rate, PEG, RoIC, price_to_earnings_ratio, price_to_book_ratio, "
+    "dividend_yield, dividend_payout_ratio, current_ratio, ttm_yield, three_year_yield, five_year_yield, "
+    "ten_year_yield"
+)
+# The ratios that depend on the share price or conversion rates, and so can change without a new report
+PRICE_DEPENDENT_RATIO_COLUMNS = [
+    "price_to_earnings_ratio",
+    "PEG",
+    "dividend_yield",
+    "price_to_book_ratio",
+    "cash_per_share",
+]
 
 # endregion CONSTANTS
 # Put your global variables here.
@@ -76,6 +107,10 @@ def fetch_latest_currency_conversion_rates():
             json.loads(api_response_ttd.content.decode("utf-8"))["response"]["BBD"]
         )
         logger.debug("Currency conversions fetched correctly.")
+        try:
+            _write_currency_conversion_rates_to_db(TTD_JMD, TTD_USD, TTD_BBD)
+        except Exception as exc:
+            logger.warning("Could not store the latest currency conversions.", exc_info=exc)
         return TTD_JMD, TTD_USD, TTD_BBD
     else:
         logger.exception(
@@ -83,236 +118,495 @@ def fetch_latest_currency_conversion_rates():
         )
 
 
-def calculate_fundamental_analysis_ratios(TTD_JMD, TTD_USD, TTD_BBD):
+def _write_currency_conversion_rates_to_db(TTD_JMD, TTD_USD, TTD_BBD):
+    """
+    Store today's conversion rates, so that the fundamental ratios can later be calculated with the
+    rates that were in effect at each report date
+    """
+    with DatabaseConnect() as db_connect:
+        currency_conversion_rates_table = Table(
+            CURRENCY_CONVERSION_RATES_TABLE_NAME,
+            MetaData(),
+            autoload=True,
+            autoload_with=db_connect.dbengine,
+        )
+        todays_rates = [
+            {"date": date.today(), "currency": currency, "ttd_rate": rate}
+            for currency, rate in (("JMD", TTD_JMD), ("USD", TTD_USD), ("BBD", TTD_BBD))
+        ]
+        insert_stmt = insert(currency_conversion_rates_table).values(todays_rates)
+        upsert_stmt = insert_stmt.on_duplicate_key_update(
+            {x.name: x for x in insert_stmt.inserted}
+        )
+        result = db_connect.dbcon.execute(upsert_stmt)
+        logger.debug(
+            "Stored the latest currency conversions. Number of rows affected was "
+            + str(result.rowcount)
+        )
+
+
+def _read_currency_conversion_rates_history(db_connect, TTD_JMD, TTD_USD, TTD_BBD):
+    """
+    Read all stored conversion rates into a df with one row per date and one column per currency,
+    with the rates passed in as the rates in effect today
+    """
+    rates_df = pd.io.sql.read_sql(
+        f"SELECT date,currency,ttd_rate FROM {CURRENCY_CONVERSION_RATES_TABLE_NAME};",
+        db_connect.dbengine,
+    )
+    todays_rates_df = pd.DataFrame(
+        {
+            "date": [date.today()] * 3,
+            "currency": ["JMD", "USD", "BBD"],
+            "ttd_rate": [TTD_JMD, TTD_USD, TTD_BBD],
+        }
+    )
+    rates_df = pd.concat([rates_df, todays_rates_df], ignore_index=True)
+    rates_df["date"] = pd.to_datetime(rates_df["date"])
+    rates_df["ttd_rate"] = rates_df["ttd_rate"].astype(float)
+    # one column per currency, carrying the last known rate forward over dates where a currency was not recorded
+    rates_df = (
+        rates_df.pivot_table(index="date", columns="currency", values="ttd_rate", aggfunc="last")
+        .reindex(columns=["JMD", "USD", "BBD"])
+        .sort_index()
+        .ffill()
+        .bfill()
+    )
+    return rates_df.reset_index()
+
+
+def _merge_prices_and_rates_as_of_report_dates(raw_data_df, share_price_df, rates_df):
+    """
+    Pair every report with the closing price and conversion rates in effect at its valuation date.
+    Historical reports are valued at their report date, while the latest report for each symbol
+    and report type is valued at the latest closing price, since that is the report currently in effect
+    """
+    raw_data_df["valuation_date"] = raw_data_df["date"]
+    latest_report_dates = raw_data_df.groupby(["symbol", "report_type"])["date"].transform("max")
+    raw_data_df.loc[raw_data_df["date"] == latest_report_dates, "valuation_date"] = pd.Timestamp(
+        date.today()
+    )
+    raw_data_df = raw_data_df.sort_values("valuation_date")
+    share_price_df = share_price_df.rename(columns={"date": "valuation_date"}).sort_values(
+        "valuation_date"
+    )
+    calculated_ratios_df = pd.merge_asof(
+        raw_data_df,
+        share_price_df,
+        on="valuation_date",
+        by="symbol",
+        direction="backward",
+    )
+    calculated_ratios_df = pd.merge_asof(
+        calculated_ratios_df,
+        rates_df.rename(columns={"date": "valuation_date"}),
+        on="valuation_date",
+        direction="backward",
+    )
+    # reports older than our first recorded conversion rates use the earliest rates that we have
+    for currency in ["JMD", "USD", "BBD"]:
+        calculated_ratios_df[currency] = calculated_ratios_df[currency].fillna(
+            rates_df[currency].iloc[0]
+        )
+    return calculated_ratios_df
+
+
+def _calculate_eps_growth_rates(calculated_ratios_df):
+    """
+    Calculate the EPS growth rate (as a percentage) of each report over the previous report of the same symbol and
+    report type, and the price to earnings-to-growth ratio from it.
+    The growth is taken over the size of the previous EPS, so that a loss shrinking is still counted as growth
+    """
+    calculated_ratios_df = calculated_ratios_df.sort_values(["symbol", "report_type", "date"])
+    eps_by_report = calculated_ratios_df.groupby(["symbol", "report_type"])["basic_earnings_per_share"]
+    previous_eps = eps_by_report.shift()
+    calculated_ratios_df["EPS_growth_rate"] = (
+            100 * eps_by_report.diff() / previous_eps.abs()
+    )
+    calculated_ratios_df["PEG"] = (
+            calculated_ratios_df["price_to_earnings_ratio"]
+            / calculated_ratios_df["EPS_growth_rate"]
+    )
+    return calculated_ratios_df
+
+
+def _hash_raw_fundamental_data(raw_data_df):
+    """
+    Build a content hash of each raw report row, so that we can tell which reports changed since the last run
+    """
+    hash_columns = raw_data_df.columns.difference(["id"])
+    numeric_columns = raw_data_df[hash_columns].select_dtypes("number").columns
+    hash_df = raw_data_df[hash_columns].astype({column: float for column in numeric_columns}).astype(str)
+    return pd.util.hash_pandas_object(hash_df, index=False).astype(str)
+
+
+def _select_reports_to_recalculate(db_connect, raw_data_df):
+    """
+    Keep every report in the (symbol, report_type) groups that have a new or changed report, since the EPS growth
+    rate and the valuation date depend on the neighbouring reports, plus the latest report in every other group,
+    since its price dependent ratios follow the latest closing price.
+    The report before the latest one of every other group is kept as well (marked as is_previous_report),
+    only so that the EPS growth rate of the latest report can be calculated
+    """
+    stored_hashes_df = pd.io.sql.read_sql(
+        f"SELECT symbol,date,report_type,report_hash FROM {RAW_FUNDAMENTAL_DATA_HASHES_TABLE_NAME};",
+        db_connect.dbengine,
+    )
+    stored_hashes_df["date"] = pd.to_datetime(stored_hashes_df["date"])
+    merged_hashes_df = raw_data_df[["symbol", "date", "report_type", "report_hash"]].merge(
+        stored_hashes_df,
+        how="left",
+        on=["symbol", "date", "report_type"],
+        suffixes=("", "_stored"),
+    )
+    raw_data_df["report_changed"] = (
+            merged_hashes_df["report_hash"] != merged_hashes_df["report_hash_stored"]
+    ).to_numpy()
+    group_changed = raw_data_df.groupby(["symbol", "report_type"])["report_changed"].transform("any")
+    report_recency = raw_data_df.groupby(["symbol", "report_type"])["date"].rank(method="first", ascending=False)
+    raw_data_df["is_previous_report"] = ~group_changed & (report_recency == 2)
+    logger.info(
+        f"Found {raw_data_df['report_changed'].sum()} new or changed reports in the raw fundamental data."
+    )
+    return raw_data_df[group_changed | (report_recency <= 2)].copy()
+
+
+def _drop_unchanged_latest_reports(db_connect, calculated_ratios_df):
+    """
+    Drop the latest reports of unchanged groups whose price dependent ratios and EPS growth rate are the same as the
+    stored ones, so that nothing is written to the ratios table when prices and reports have not moved.
+    Only the stored ratios of the symbols and report dates being written are read.
+    """
+    if calculated_ratios_df.empty:
+        return calculated_ratios_df
+    # the ratios that can change without their own report changing, and the decimal places that they are stored with.
+    # The EPS growth rate depends on the previous report, which may have changed on its own
+    compared_ratio_decimal_places = dict.fromkeys(PRICE_DEPENDENT_RATIO_COLUMNS, 3)
+    compared_ratio_decimal_places["EPS_growth_rate"] = 2
+    compared_columns = list(compared_ratio_decimal_places)
+    select_stmt = text(
+        f"SELECT symbol,date,report_type,{','.join(compared_columns)} FROM calculated_fundamental_ratios "
+        "WHERE symbol IN :symbols AND date IN :dates"
+    ).bindparams(bindparam("symbols", expanding=True), bindparam("dates", expanding=True))
+    stored_ratios_df = pd.io.sql.read_sql(
+        select_stmt,
+        db_connect.dbcon,
+        params={
+            "symbols": calculated_ratios_df["symbol"].unique().tolist(),
+            "dates": pd.to_datetime(calculated_ratios_df["date"]).dt.date.unique().tolist(),
+        },
+    )
+    stored_ratios_df["date"] = pd.to_datetime(stored_ratios_df["date"])
+    merged_ratios_df = calculated_ratios_df[
+        ["symbol", "date", "report_type"] + compared_columns
+        ].merge(
+        stored_ratios_df,
+        how="left",
+        on=["symbol", "date", "report_type"],
+        suffixes=("", "_stored"),
+    )
+    compared_ratios_changed = np.zeros(len(merged_ratios_df), dtype=bool)
+    for column, decimal_places in compared_ratio_decimal_places.items():
+        calculated = pd.to_numeric(merged_ratios_df[column], errors="coerce").round(decimal_places)
+        stored = pd.to_numeric(merged_ratios_df[f"{column}_stored"], errors="coerce").round(decimal_places)
+        compared_ratios_changed |= ~(
+                (calculated == stored) | (calculated.isnull() & stored.isnull())
+        ).to_numpy()
+    return calculated_ratios_df[
+        calculated_ratios_df["report_changed"].to_numpy() | compared_ratios_changed
+        ]
+
+
+def _write_raw_fundamental_data_hashes_to_db(db_connect, changed_reports_df):
+    """
+    Store the hashes of the reports that were just recalculated
+    """
+    raw_fundamental_data_hashes_table = Table(
+        RAW_FUNDAMENTAL_DATA_HASHES_TABLE_NAME,
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connect.dbengine,
+    )
+    changed_reports_df = changed_reports_df[["symbol", "date", "report_type", "report_hash"]].copy()
+    changed_reports_df["date"] = changed_reports_df["date"].dt.date
+    insert_stmt = insert(raw_fundamental_data_hashes_table).values(
+        changed_reports_df.to_dict("records")
+    )
+    upsert_stmt = insert_stmt.on_duplicate_key_update(
+        {x.name: x for x in insert_stmt.inserted}
+    )
+    result = db_connect.dbcon.execute(upsert_stmt)
+    logger.info(
+        "Number of rows affected in the raw fundamental data hashes table was "
+        + str(result.rowcount)
+    )
+
+
+def _write_latest_fundamental_ratios_to_db(db_connect, latest_ratios_df):
+    """
+    Keep the latest_fundamental_ratios snapshot (one row per symbol and report type) in step with the
+    latest reports that were just written, so that the summary pages don't have to search the ratio history
+    """
+    if latest_ratios_df.empty:
+        return
+    latest_fundamental_ratios_table = Table(
+        "latest_fundamental_ratios",
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connect.dbengine,
+    )
+    insert_stmt = insert(latest_fundamental_ratios_table).values(
+        latest_ratios_df.to_dict("records")
+    )
+    upsert_stmt = insert_stmt.on_duplicate_key_update(
+        {x.name: x for x in insert_stmt.inserted if x.name != "id"}
+    )
+    result = db_connect.dbcon.execute(upsert_stmt)
+    logger.info(
+        "Number of rows affected in the latest fundamental ratios table was "
+        + str(result.rowcount)
+    )
+
+
+def calculate_fundamental_analysis_ratios(TTD_JMD, TTD_USD, TTD_BBD, recalculate_all_ratios=False):
     """
-    Calculate the important ratios for fundamental analysis, based off our manually entered data from the financial statements
+    Calculate the important ratios for fundamental analysis, based off our manually entered data from the financial statements.
+    The closing prices and currency conversion rates used for each report are the ones in effect at the report date,
+    and all symbols, periods and report types are calculated together in a single pass.
+    Unless recalculate_all_ratios is set, only the reports that changed since the last run (and the latest report
+    of each symbol, if its price dependent ratios moved) are recalculated and written
     """
-    raw_data_table_names = ["raw_annual_data", "raw_quarterly_data"]
+    raw_data_table_names = {"raw_annual_data": "year_end_date", "raw_quarterly_data": "quarter_end_date"}
     calculated_fundamental_ratios_table_name = "calculated_fundamental_ratios"
     daily_stock_summary_table_name = "daily_stock_summary"
-    historical_dividend_info_table_name = "historical_dividend_info"
     try:
-        for raw_data_table_name in raw_data_table_names:
-            with DatabaseConnect() as db_connect:
-                logger.info("Successfully connected to database")
+        with DatabaseConnect() as db_connect:
+            logger.info("Successfully connected to database")
+            calculated_fundamental_ratios_table = Table(
+                calculated_fundamental_ratios_table_name,
+                MetaData(),
+                autoload=True,
+                autoload_with=db_connect.dbengine,
+            )
+            # read the audited raw tables as a single pandas df
+            all_raw_data_dfs = []
+            for raw_data_table_name, date_column in raw_data_table_names.items():
                 logger.info(f"Now reading raw data from {raw_data_table_name}")
-                calculated_fundamental_ratios_table = Table(
-                    calculated_fundamental_ratios_table_name,
-                    MetaData(),
-                    autoload=True,
-                    autoload_with=db_connect.dbengine,
-                )
-                # set date column name
-                if "annual" in raw_data_table_name:
-                    date_column = "year_end_date"
-                else:
-                    date_column = "quarter_end_date"
-                # read the audited raw table as a pandas df
                 raw_data_df = pd.io.sql.read_sql(
-                    f"SELECT * FROM {raw_data_table_name} ORDER BY symbol,{date_column} DESC;",
+                    f"SELECT * FROM {raw_data_table_name};",
                     db_connect.dbengine,
                 )
-                # first get the latest share price data
-                # get the latest date from the daily stock table
-                latest_stock_date = pd.io.sql.read_sql(
-                    f"SELECT date FROM {daily_stock_summary_table_name} WHERE os_bid_vol !=0 ORDER BY date DESC LIMIT 1;",
-                    db_connect.dbengine,
-                )["date"][0].strftime("%Y-%m-%d")
-                # get the closing price df
-                share_price_df = pd.io.sql.read_sql(
-                    f"SELECT symbol,close_price \
-                    FROM {daily_stock_summary_table_name} WHERE \
-                    {daily_stock_summary_table_name}.date='{latest_stock_date}';",
-                    db_connect.dbengine,
-                )
-                # create a merged df
-                calculated_ratios_df = pd.merge(
-                    raw_data_df, share_price_df, how="outer", on="symbol"
-                )
-                # set the report type
+                raw_data_df = raw_data_df.rename(columns={date_column: "date"})
                 if "annual" in raw_data_table_name:
-                    calculated_ratios_df["report_type"] = "annual"
+                    raw_data_df["report_type"] = "annual"
                 else:
-                    calculated_ratios_df["report_type"] = "quarterly"
-                # calculate the return on equity
-                calculated_ratios_df["RoE"] = (
-                        calculated_ratios_df["net_income"]
-                        / calculated_ratios_df["total_shareholders_equity"]
-                )
-                # now calculate the return on invested capital
-                calculated_ratios_df["RoIC"] = (
-                        calculated_ratios_df["profit_after_tax"]
-                        / calculated_ratios_df["total_shareholders_equity"]
-                )
-                # now calculate the working capital
-                calculated_ratios_df["working_capital"] = (
-                        calculated_ratios_df["total_assets"]
-                        - calculated_ratios_df["total_liabilities"]
-                )
-                # and the current ratio
-                calculated_ratios_df["current_ratio"] = (
-                        calculated_ratios_df["total_assets"]
-                        / calculated_ratios_df["total_liabilities"]
-                )
-                calculated_ratios_df[
-                    "share_price_conversion_rates"
-                ] = calculated_ratios_df.apply(
-                    lambda x: TTD_USD
-                    if x.currency == "USD"
-                    else (
-                        TTD_JMD
-                        if x.currency == "JMD"
-                        else (TTD_BBD if x.currency == "BBD" else 1.00)
-                    ),
-                    axis=1,
-                )
-                calculated_ratios_df["price_to_earnings_ratio"] = (
-                                                                          calculated_ratios_df["close_price"]
-                                                                          * calculated_ratios_df[
-                                                                              "share_price_conversion_rates"]
-                                                                  ) / calculated_ratios_df["basic_earnings_per_share"]
-                # calculate cash per share
-                calculated_ratios_df["cash_per_share"] = (
-                                                             calculated_ratios_df["cash_cash_equivalents"]
-                                                         ) / (
-                                                                 calculated_ratios_df["total_shares_outstanding"]
-                                                                 * calculated_ratios_df["share_price_conversion_rates"]
-                                                         )
-                # calculate dividend yield and dividend payout ratio
-                # add the dividend conversion rates for this df as well
-                # first note that dividends are paid in various currencies, so we need to convert them all to TTD
-                calculated_ratios_df[
-                    "dividend_conversion_rates"
-                ] = calculated_ratios_df.apply(
-                    lambda x: 1 / TTD_USD
-                    if x.symbol in USD_DIVIDEND_SYMBOLS
-                    else (
-                        1 / TTD_JMD
-                        if x.symbol in JMD_DIVIDEND_SYMBOLS
-                        else (1 / TTD_BBD if x.symbol in BBD_DIVIDEND_SYMBOLS else 1.00)
-                    ),
-                    axis=1,
-                )
-                # now calculate a conversion rate for the price for the dividend yields
-                calculated_ratios_df[
-                    "dividend_stock_price_conversion_rates"
-                ] = calculated_ratios_df.apply(
-                    lambda x: 1 / TTD_USD if x.symbol in USD_STOCK_SYMBOLS else 1.00,
-                    axis=1,
-                )
-                # note that the price_to_earnings_df contains the share price
-                calculated_ratios_df["dividend_yield"] = (
-                        100
-                        * (
-                                calculated_ratios_df["dividends_per_share"]
-                                * calculated_ratios_df["dividend_conversion_rates"]
-                        )
-                        / (
-                                calculated_ratios_df["close_price"]
-                                * calculated_ratios_df["dividend_stock_price_conversion_rates"]
-                        )
-                )
-                # now dividend payout ratio
-                calculated_ratios_df["dividend_payout_ratio"] = (
-                        100
-                        * calculated_ratios_df["dividends_per_share"]
-                        / calculated_ratios_df["basic_earnings_per_share"]
-                )
-                # now calculate the eps growth rate
-                calculated_ratios_df["EPS_growth_rate"] = (
-                        calculated_ratios_df["basic_earnings_per_share"].diff() * 100
-                )
-                # now calculate the price to earnings-to-growth ratio
-                calculated_ratios_df["PEG"] = (
-                        calculated_ratios_df["price_to_earnings_ratio"]
-                        / calculated_ratios_df["EPS_growth_rate"]
-                )
-                # calculate the book value per share (BVPS)
-                calculated_ratios_df["book_value_per_share"] = (
-                                                                       calculated_ratios_df["total_assets"]
-                                                                       - calculated_ratios_df["total_liabilities"]
-                                                               ) / calculated_ratios_df["total_shares_outstanding"]
-                # calculate the price to book ratio
-                calculated_ratios_df["price_to_book_ratio"] = (
+                    raw_data_df["report_type"] = "quarterly"
+                all_raw_data_dfs.append(raw_data_df)
+            raw_data_df = pd.concat(all_raw_data_dfs, ignore_index=True)
+            # remove the rows where the date is None
+            raw_data_df = raw_data_df[~raw_data_df["date"].isnull()].copy()
+            raw_data_df["date"] = pd.to_datetime(raw_data_df["date"])
+            raw_data_df["report_hash"] = _hash_raw_fundamental_data(raw_data_df)
+            raw_data_df["is_latest_report"] = raw_data_df["date"] == raw_data_df.groupby(
+                ["symbol", "report_type"]
+            )["date"].transform("max")
+            if recalculate_all_ratios:
+                raw_data_df["report_changed"] = True
+                raw_data_df["is_previous_report"] = False
+            else:
+                raw_data_df = _select_reports_to_recalculate(db_connect, raw_data_df)
+            # get the full closing price history
+            share_price_df = pd.io.sql.read_sql(
+                f"SELECT symbol,date,close_price FROM {daily_stock_summary_table_name} \
+                WHERE os_bid_vol !=0 AND close_price IS NOT NULL;",
+                db_connect.dbengine,
+            )
+            share_price_df["date"] = pd.to_datetime(share_price_df["date"])
+            # and the conversion rates over time
+            rates_df = _read_currency_conversion_rates_history(
+                db_connect, TTD_JMD, TTD_USD, TTD_BBD
+            )
+            calculated_ratios_df = _merge_prices_and_rates_as_of_report_dates(
+                raw_data_df, share_price_df, rates_df
+            )
+            # calculate the return on equity
+            calculated_ratios_df["RoE"] = (
+                    calculated_ratios_df["net_income"]
+                    / calculated_ratios_df["total_shareholders_equity"]
+            )
+            # now calculate the return on invested capital
+            calculated_ratios_df["RoIC"] = (
+                    calculated_ratios_df["profit_after_tax"]
+                    / calculated_ratios_df["total_shareholders_equity"]
+            )
+            # now calculate the working capital
+            calculated_ratios_df["working_capital"] = (
+                    calculated_ratios_df["total_assets"]
+                    - calculated_ratios_df["total_liabilities"]
+            )
+            # and the current ratio
+            calculated_ratios_df["current_ratio"] = (
+                    calculated_ratios_df["total_assets"]
+                    / calculated_ratios_df["total_liabilities"]
+            )
+            calculated_ratios_df["share_price_conversion_rates"] = np.select(
+                [
+                    calculated_ratios_df["currency"] == "USD",
+                    calculated_ratios_df["currency"] == "JMD",
+                    calculated_ratios_df["currency"] == "BBD",
+                ],
+                [
+                    calculated_ratios_df["USD"],
+                    calculated_ratios_df["JMD"],
+                    calculated_ratios_df["BBD"],
+                ],
+                default=1.00,
+            )
+            calculated_ratios_df["price_to_earnings_ratio"] = (
                                                                       calculated_ratios_df["close_price"]
                                                                       * calculated_ratios_df[
                                                                           "share_price_conversion_rates"]
-                                                              ) / (
-                                                                      (
-                                                                              calculated_ratios_df["total_assets"]
-                                                                              - calculated_ratios_df[
-                                                                                  "total_liabilities"]
-                                                                      )
-                                                                      / calculated_ratios_df["total_shares_outstanding"]
-                                                              )
-                # replace inf with None
-                calculated_ratios_df = calculated_ratios_df.replace(
-                    [np.inf, -np.inf], None
-                )
-                # remove the columns that we don't need
-                calculated_ratios_df = calculated_ratios_df[
-                    calculated_ratios_df.columns.intersection(
-                        [
-                            "symbol",
-                            "year_end_date",
-                            "quarter_end_date",
-                            "report_type",
-                            "RoE",
-                            "basic_earnings_per_share",
-                            "EPS_growth_rate",
-                            "PEG",
-                            "RoIC",
-                            "working_capital",
-                            "price_to_earnings_ratio",
-                            "dividend_yield",
-                            "dividend_payout_ratio",
-                            "book_value_per_share",
-                            "price_to_book_ratio",
-                            "current_ratio",
-                            "cash_per_share",
-                        ]
+                                                              ) / calculated_ratios_df["basic_earnings_per_share"]
+            # calculate cash per share
+            calculated_ratios_df["cash_per_share"] = (
+                                                         calculated_ratios_df["cash_cash_equivalents"]
+                                                     ) / (
+                                                             calculated_ratios_df["total_shares_outstanding"]
+                                                             * calculated_ratios_df["share_price_conversion_rates"]
+                                                     )
+            # calculate dividend yield and dividend payout ratio
+            # add the dividend conversion rates for this df as well
+            # first note that dividends are paid in various currencies, so we need to convert them all to TTD
+            calculated_ratios_df["dividend_conversion_rates"] = np.select(
+                [
+                    calculated_ratios_df["symbol"].isin(USD_DIVIDEND_SYMBOLS),
+                    calculated_ratios_df["symbol"].isin(JMD_DIVIDEND_SYMBOLS),
+                    calculated_ratios_df["symbol"].isin(BBD_DIVIDEND_SYMBOLS),
+                ],
+                [
+                    1 / calculated_ratios_df["USD"],
+                    1 / calculated_ratios_df["JMD"],
+                    1 / calculated_ratios_df["BBD"],
+                ],
+                default=1.00,
+            )
+            # now calculate a conversion rate for the price for the dividend yields
+            calculated_ratios_df["dividend_stock_price_conversion_rates"] = np.where(
+                calculated_ratios_df["symbol"].isin(USD_STOCK_SYMBOLS),
+                1 / calculated_ratios_df["USD"],
+                1.00,
+            )
+            # note that the price_to_earnings_df contains the share price
+            calculated_ratios_df["dividend_yield"] = (
+                    100
+                    * (
+                            calculated_ratios_df["dividends_per_share"]
+                            * calculated_ratios_df["dividend_conversion_rates"]
+                    )
+                    / (
+                            calculated_ratios_df["close_price"]
+                            * calculated_ratios_df["dividend_stock_price_conversion_rates"]
                     )
+            )
+            # now dividend payout ratio
+            calculated_ratios_df["dividend_payout_ratio"] = (
+                    100
+                    * calculated_ratios_df["dividends_per_share"]
+                    / calculated_ratios_df["basic_earnings_per_share"]
+            )
+            # now calculate the eps growth rate and the price to earnings-to-growth ratio
+            calculated_ratios_df = _calculate_eps_growth_rates(calculated_ratios_df)
+            # calculate the book value per share (BVPS)
+            calculated_ratios_df["book_value_per_share"] = (
+                                                                   calculated_ratios_df["total_assets"]
+                                                                   - calculated_ratios_df["total_liabilities"]
+                                                           ) / calculated_ratios_df["total_shares_outstanding"]
+            # calculate the price to book ratio
+            calculated_ratios_df["price_to_book_ratio"] = (
+                                                                  calculated_ratios_df["close_price"]
+                                                                  * calculated_ratios_df[
+                                                                      "share_price_conversion_rates"]
+                                                          ) / calculated_ratios_df["book_value_per_share"]
+            # replace inf with None
+            calculated_ratios_df = calculated_ratios_df.replace(
+                [np.inf, -np.inf], None
+            )
+            # the previous reports of unchanged groups were only needed for the growth rates of the latest reports
+            calculated_ratios_df = calculated_ratios_df[~calculated_ratios_df["is_previous_report"].astype(bool)]
+            if not recalculate_all_ratios:
+                calculated_ratios_df = _drop_unchanged_latest_reports(db_connect, calculated_ratios_df)
+            changed_reports_df = calculated_ratios_df[calculated_ratios_df["report_changed"]]
+            if calculated_ratios_df.empty:
+                logger.info("No fundamental reports or price dependent ratios changed. Nothing to write.")
+                return 0
+            latest_reports_mask = calculated_ratios_df["is_latest_report"].to_numpy(dtype=bool)
+            # remove the columns that we don't need
+            calculated_ratios_df = calculated_ratios_df[
+                [
+                    "symbol",
+                    "date",
+                    "report_type",
+                    "RoE",
+                    "basic_earnings_per_share",
+                    "EPS_growth_rate",
+                    "PEG",
+                    "RoIC",
+                    "working_capital",
+                    "price_to_earnings_ratio",
+                    "dividend_yield",
+                    "dividend_payout_ratio",
+                    "book_value_per_share",
+                    "price_to_book_ratio",
+                    "current_ratio",
+                    "cash_per_share",
                 ]
-                # rename the columns
-                calculated_ratios_df.rename(
-                    columns={
-                        "year_end_date": "date",
-                        "quarter_end_date": "date",
-                        "basic_earnings_per_share": "EPS",
-                    },
-                    inplace=True,
+            ]
+            # rename the columns
+            calculated_ratios_df = calculated_ratios_df.rename(
+                columns={"basic_earnings_per_share": "EPS"}
+            )
+            calculated_ratios_df["date"] = calculated_ratios_df["date"].dt.date
+            # remove the null values
+            calculated_ratios_df = calculated_ratios_df.astype(object).replace({np.nan: None})
+            # now write the df to the database
+            logger.info("Now writing fundamental data to database.")
+            execute_completed_successfully = False
+            execute_failed_times = 0
+            while not execute_completed_successfully and execute_failed_times < 5:
+                try:
+                    insert_stmt = insert(
+                        calculated_fundamental_ratios_table
+                    ).values(calculated_ratios_df.to_dict("records"))
+                    upsert_stmt = insert_stmt.on_duplicate_key_update(
+                        {x.name: x for x in insert_stmt.inserted}
+                    )
+                    result = db_connect.dbcon.execute(upsert_stmt)
+                    execute_completed_successfully = True
+                    logger.info("Successfully wrote calculated fundamental ratios to db")
+                    logger.info(
+                        "Number of rows affected in the calculated table was "
+                        + str(result.rowcount)
+                    )
+                except sqlalchemy.exc.OperationalError as operr:
+                    logger.warning(str(operr))
+                    time.sleep(1)
+                    execute_failed_times += 1
+            if execute_completed_successfully:
+                _write_latest_fundamental_ratios_to_db(
+                    db_connect, calculated_ratios_df[latest_reports_mask]
                 )
-                # remove the rows where the date is None
-                calculated_ratios_df = calculated_ratios_df[
-                    ~calculated_ratios_df["date"].isnull()
-                ]
-                # remove the null values
-                calculated_ratios_df = calculated_ratios_df.replace({np.nan: None})
-                # now write the df to the database
-                logger.info("Now writing fundamental data to database.")
-                execute_completed_successfully = False
-                execute_failed_times = 0
-                while not execute_completed_successfully and execute_failed_times < 5:
-                    try:
-                        insert_stmt = insert(
-                            calculated_fundamental_ratios_table
-                        ).values(calculated_ratios_df.to_dict("records"))
-                        upsert_stmt = insert_stmt.on_duplicate_key_update(
-                            {x.name: x for x in insert_stmt.inserted}
-                        )
-                        result = db_connect.dbcon.execute(upsert_stmt)
-                        execute_completed_successfully = True
-                        logger.info(
-                            f"Successfully wrote calculated fundamental ratios to db from {raw_data_table_name}"
-                        )
-                        logger.info(
-                            "Number of rows affected in the calculated table was "
-                            + str(result.rowcount)
-                        )
-                    except sqlalchemy.exc.OperationalError as operr:
-                        logger.warning(str(operr))
-                        time.sleep(1)
-                        execute_failed_times += 1
+                changed_symbols = calculated_ratios_df["symbol"].unique()
+                _publish_data_changes(
+                    db_connect,
+                    calculated_fundamental_ratios_table_name,
+                    dates=calculated_ratios_df["date"],
+                    symbols=changed_symbols,
+                )
+                _publish_data_changes(
+                    db_connect, "latest_fundamental_ratios", symbols=changed_symbols
+                )
+            if execute_completed_successfully and not changed_reports_df.empty:
+                _write_raw_fundamental_data_hashes_to_db(db_connect, changed_reports_df)
         return 0
     except Exception as exc:
         logger.exception("Could not complete fundamental data update.", exc_info=exc)
@@ -322,7 +616,7 @@ def update_dividend_yields(TTD_JMD, TTD_USD, TTD_BBD):
     """Use the historical dividend info table
     to calculate dividend yields per year
     """
-    daily_stock_summary_table_name = "daily_stock_summary"
+    latest_stock_price_table_name = "latest_stock_price"
     historical_dividend_info_table_name = "historical_dividend_info"
     historical_dividend_yield_table_name = "historical_dividend_yield"
     summarized_dividend_yield_table_name: str = "summarized_dividend_yield"
@@ -333,16 +627,11 @@ def update_dividend_yields(TTD_JMD, TTD_USD, TTD_BBD):
             f"SELECT symbol,record_date,dividend_amount FROM {historical_dividend_info_table_name};",
             db_connect.dbengine,
         )
-        # get the latest date from the daily stock table
-        latest_stock_date: str = pd.io.sql.read_sql(
-            f"SELECT date FROM {daily_stock_summary_table_name} WHERE os_bid_vol !=0 ORDER BY date DESC LIMIT 1;",
-            db_connect.dbengine,
-        )["date"][0].strftime("%Y-%m-%d")
-        # then get the share price for each listed stock at this date
+        # then get the latest share price for each listed stock
         share_price_df: pd.DataFrame = pd.io.sql.read_sql(
-            f"SELECT {daily_stock_summary_table_name}.symbol,{daily_stock_summary_table_name}.close_price, listed_equities.currency \
-                FROM {daily_stock_summary_table_name}, listed_equities WHERE \
-                {daily_stock_summary_table_name}.symbol = listed_equities.symbol AND {daily_stock_summary_table_name}.date='{latest_stock_date}';",
+            f"SELECT {latest_stock_price_table_name}.symbol,{latest_stock_price_table_name}.close_price, listed_equities.currency \
+                FROM {latest_stock_price_table_name}, listed_equities WHERE \
+                {latest_stock_price_table_name}.symbol = listed_equities.symbol;",
             db_connect.dbengine,
         )
         # now go through each symbol and calculate the yields
@@ -430,6 +719,11 @@ def update_dividend_yields(TTD_JMD, TTD_USD, TTD_BBD):
                 )
                 result = db_connect.dbcon.execute(upsert_stmt)
                 execute_completed_successfully = True
+                _publish_data_changes(
+                    db_connect,
+                    historical_dividend_yield_table_name,
+                    symbols=yearly_dividends_df["symbol"].unique(),
+                )
                 logger.info(f"Successfully wrote dividend yield data from table.")
                 logger.info(
                     "Number of rows affected in the calculated table was "
@@ -690,14 +984,9 @@ def update_simulator_portfolio_summary_market_values():
             FROM stocks_simulatorportfolios;",
             db_connect.dbengine,
         )
-        # get the last date that we have scraped data for
-        latest_date = pd.io.sql.read_sql(
-            f"SELECT date FROM daily_stock_summary WHERE os_bid_vol !=0 ORDER BY date DESC LIMIT 1;",
-            db_connect.dbengine,
-        )["date"][0]
-        # get the closing price for all shares on this date
+        # get the latest closing price for all shares
         closing_price_df = pd.io.sql.read_sql(
-            f"SELECT symbol, close_price FROM daily_stock_summary WHERE date='{latest_date}';",
+            f"SELECT symbol, close_price FROM latest_stock_price;",
             db_connect.dbengine,
         )
         # now merge the two dataframes to get the closing price
@@ -784,14 +1073,9 @@ def update_portfolio_summary_market_values():
             FROM portfolio_summary;",
             db_connect.dbengine,
         )
-        # get the last date that we have scraped data for
-        latest_date = pd.io.sql.read_sql(
-            f"SELECT date FROM daily_stock_summary WHERE os_bid_vol !=0 ORDER BY date DESC LIMIT 1;",
-            db_connect.dbengine,
-        )["date"][0]
-        # get the closing price for all shares on this date
+        # get the latest closing price for all shares
         closing_price_df = pd.io.sql.read_sql(
-            f"SELECT symbol, close_price FROM daily_stock_summary WHERE date='{latest_date}';",
+            f"SELECT symbol, close_price FROM latest_stock_price;",
             db_connect.dbengine,
         )
         # now merge the two dataframes to get the closing price
@@ -941,65 +1225,284 @@ def update_portfolio_sectors_values():
             logger.info("Successfully closed database connection.")
 
 
-def update_simulator_games():
+def _calculate_portfolio_daily_values(transactions_df, closing_prices_df, valuation_dates):
     """
-    Select all records from the stocks_simulatorgames table, then
-    calculate and upsert the interesting fields in the stocks_simulatorgames table
+    Replay the transactions of every user into their positions on each of the valuation dates, and value each
+    position at the latest closing price of its symbol on or before that date.
+    Returns the user_id, date, market_value and net_invested of each user on each valuation date from the date of
+    their first transaction.
+    """
+    valuation_dates = pd.DatetimeIndex(sorted(set(pd.to_datetime(valuation_dates))))
+    if transactions_df.empty or valuation_dates.empty:
+        return pd.DataFrame(columns=["user_id", "date", "market_value", "net_invested"])
+    transactions_df = transactions_df.assign(date=pd.to_datetime(transactions_df["date"]))
+    signed_shares = transactions_df["num_shares"] * np.where(transactions_df["bought_or_sold"] == "Bought", 1, -1)
+    transactions_df = transactions_df.assign(
+        signed_shares=signed_shares,
+        cash_invested=signed_shares * pd.to_numeric(transactions_df["share_price"]).astype(float),
+    )
+    # the positions change on the transaction dates, which may not be trading days
+    replay_dates = valuation_dates.union(pd.DatetimeIndex(transactions_df["date"].unique()))
+    positions_df = (
+        transactions_df.pivot_table(
+            index="date", columns=["user_id", "symbol"], values="signed_shares", aggfunc="sum", fill_value=0
+        )
+        .reindex(replay_dates, fill_value=0)
+        .cumsum()
+        .reindex(valuation_dates)
+    )
+    net_invested_df = (
+        transactions_df.pivot_table(index="date", columns="user_id", values="cash_invested", aggfunc="sum", fill_value=0)
+        .reindex(replay_dates, fill_value=0)
+        .cumsum()
+        .reindex(valuation_dates)
+    )
+    # carry the last closing price of each symbol forward over the days that it did not trade
+    closing_prices_df = closing_prices_df.assign(
+        date=pd.to_datetime(closing_prices_df["date"]),
+        close_price=pd.to_numeric(closing_prices_df["close_price"]).astype(float),
+    ).pivot_table(index="date", columns="symbol", values="close_price", aggfunc="last")
+    closing_prices_df = (
+        closing_prices_df.reindex(closing_prices_df.index.union(valuation_dates)).ffill().reindex(valuation_dates)
+    )
+    position_prices = closing_prices_df.reindex(columns=positions_df.columns.get_level_values("symbol")).to_numpy()
+    market_values_df = (
+        pd.DataFrame(
+            positions_df.to_numpy() * np.nan_to_num(position_prices),
+            index=valuation_dates,
+            columns=positions_df.columns,
+        )
+        .T.groupby(level="user_id")
+        .sum()
+        .T
+    )
+    daily_values_df = pd.DataFrame(
+        {
+            "market_value": market_values_df.stack(),
+            "net_invested": net_invested_df.stack(),
+        }
+    ).rename_axis(["date", "user_id"]).reset_index()
+    first_transaction_dates = daily_values_df["user_id"].map(transactions_df.groupby("user_id")["date"].min())
+    daily_values_df = daily_values_df[daily_values_df["date"] >= first_transaction_dates].copy()
+    daily_values_df["date"] = daily_values_df["date"].dt.date
+    daily_values_df[["market_value", "net_invested"]] = daily_values_df[["market_value", "net_invested"]].round(2)
+    return daily_values_df[["user_id", "date", "market_value", "net_invested"]]
+
+
+def _read_portfolio_transactions_from_db(db_connect):
+    return pd.io.sql.read_sql(
+        "SELECT user_id, symbol, date, bought_or_sold, num_shares, share_price FROM portfolio_transactions;",
+        db_connect.dbengine,
+    )
+
+
+def _write_portfolio_daily_values_to_db(db_connect, daily_values_df):
+    portfolio_daily_value_table = Table(
+        "portfolio_daily_value",
+        MetaData(),
+        autoload=True,
+        autoload_with=db_connect.dbengine,
+    )
+    daily_values = daily_values_df.to_dict("records")
+    for chunk_start in range(0, len(daily_values), PORTFOLIO_DAILY_VALUE_WRITE_CHUNK_SIZE):
+        insert_stmt = insert(portfolio_daily_value_table).values(
+            daily_values[chunk_start:chunk_start + PORTFOLIO_DAILY_VALUE_WRITE_CHUNK_SIZE]
+        )
+        upsert_stmt = insert_stmt.on_duplicate_key_update(
+            market_value=insert_stmt.inserted.market_value,
+            net_invested=insert_stmt.inserted.net_invested,
+        )
+        result = db_connect.dbcon.execute(upsert_stmt)
+        logger.info("Number of rows affected in the portfolio_daily_value table was " + str(result.rowcount))
+
+
+def _recalculate_changed_portfolio_daily_values(db_connect):
+    """
+    Recalculate the daily portfolio values of the users whose transactions were added, changed or deleted since the
+    last run, from the earliest date that each change affected, then clear their recalculation marks
+    """
+    recalculations_df = pd.io.sql.read_sql(
+        "SELECT user_id, from_date FROM portfolio_value_recalculations;", db_connect.dbengine
+    )
+    if recalculations_df.empty:
+        return
+    user_ids = recalculations_df["user_id"].tolist()
+    transactions_df = pd.io.sql.read_sql(
+        text(
+            "SELECT user_id, symbol, date, bought_or_sold, num_shares, share_price FROM portfolio_transactions "
+            "WHERE user_id IN :user_ids"
+        ).bindparams(bindparam("user_ids", expanding=True)),
+        db_connect.dbcon,
+        params={"user_ids": user_ids},
+    )
+    earliest_from_date = recalculations_df["from_date"].min()
+    trading_dates_df = pd.io.sql.read_sql(
+        text("SELECT DISTINCT date FROM daily_stock_summary WHERE date >= :from_date"),
+        db_connect.dbcon,
+        params={"from_date": earliest_from_date},
+    )
+    closing_prices_df = pd.io.sql.read_sql(
+        text(
+            "SELECT symbol, date, close_price FROM daily_stock_summary WHERE symbol IN :symbols AND close_price > 0"
+        ).bindparams(bindparam("symbols", expanding=True)),
+        db_connect.dbcon,
+        params={"symbols": transactions_df["symbol"].unique().tolist() or [""]},
+    )
+    daily_values_df = _calculate_portfolio_daily_values(
+        transactions_df, closing_prices_df, trading_dates_df["date"]
+    )
+    from_dates = daily_values_df["user_id"].map(recalculations_df.set_index("user_id")["from_date"])
+    daily_values_df = daily_values_df[pd.to_datetime(daily_values_df["date"]) >= pd.to_datetime(from_dates)]
+    with db_connect.dbcon.begin():
+        for recalculation in recalculations_df.to_dict("records"):
+            # values left from before a deleted (or moved) transaction must not outlive it
+            db_connect.dbcon.execute(
+                text("DELETE FROM portfolio_daily_value WHERE user_id = :user_id AND date >= :from_date"),
+                recalculation,
+            )
+        _write_portfolio_daily_values_to_db(db_connect, daily_values_df)
+        for recalculation in recalculations_df.to_dict("records"):
+            # changes marked while this ran (with an earlier date) are left for the next run
+            db_connect.dbcon.execute(
+                text(
+                    "DELETE FROM portfolio_value_recalculations WHERE user_id = :user_id AND from_date = :from_date"
+                ),
+                recalculation,
+            )
+    logger.info(f"Recalculated the daily portfolio values of {len(user_ids)} users with changed transactions.")
+
+
+def backfill_portfolio_daily_values():
+    """
+    Calculate the value of every portfolio on every trading day since its first transaction,
+    by replaying all of the transactions against the closing prices in one pass
+    """
+    logger.info("Now backfilling the daily values of all portfolios.")
+    try:
+        with DatabaseConnect() as db_connect:
+            transactions_df = _read_portfolio_transactions_from_db(db_connect)
+            if transactions_df.empty:
+                logger.info("There are no portfolio transactions to value.")
+                return 0
+            closing_prices_df = pd.io.sql.read_sql(
+                text(
+                    "SELECT symbol, date, close_price FROM daily_stock_summary "
+                    "WHERE symbol IN :symbols AND close_price > 0"
+                ).bindparams(bindparam("symbols", expanding=True)),
+                db_connect.dbcon,
+                params={"symbols": transactions_df["symbol"].unique().tolist()},
+            )
+            first_transaction_date = pd.to_datetime(transactions_df["date"]).min().date()
+            trading_dates_df = pd.io.sql.read_sql(
+                text("SELECT DISTINCT date FROM daily_stock_summary WHERE date >= :from_date"),
+                db_connect.dbcon,
+                params={"from_date": first_transaction_date},
+            )
+            daily_values_df = _calculate_portfolio_daily_values(
+                transactions_df, closing_prices_df, trading_dates_df["date"]
+            )
+            logger.info("Now writing the daily values of all portfolios to the database.")
+            _write_portfolio_daily_values_to_db(db_connect, daily_values_df)
+        return 0
+    except Exception:
+        logger.exception("Could not backfill the daily values of the portfolios.")
+
+
+def update_portfolio_daily_values():
+    """
+    Append the value of every portfolio at the close of the latest trading day, valued at the latest stock prices,
+    after recalculating the history of any portfolio whose transactions changed since the last run
+    """
+    logger.info("Now updating the daily values of all portfolios.")
+    try:
+        with DatabaseConnect() as db_connect:
+            _recalculate_changed_portfolio_daily_values(db_connect)
+            transactions_df = _read_portfolio_transactions_from_db(db_connect)
+            if transactions_df.empty:
+                logger.info("There are no portfolio transactions to value.")
+                return 0
+            latest_trading_date = pd.io.sql.read_sql(
+                "SELECT MAX(date) AS date FROM daily_stock_summary;", db_connect.dbengine
+            )["date"].iloc[0]
+            latest_prices_df = pd.io.sql.read_sql(
+                "SELECT symbol, date, close_price FROM latest_stock_price;", db_connect.dbengine
+            )
+            daily_values_df = _calculate_portfolio_daily_values(
+                transactions_df, latest_prices_df, [latest_trading_date]
+            )
+            _write_portfolio_daily_values_to_db(db_connect, daily_values_df)
+        return 0
+    except Exception:
+        logger.exception("Could not update the daily values of the portfolios.")
+
+
+def rebuild_stock_screener():
+    """
+    Rebuild the stock_screener table, that the screener api filters and sorts, from the latest prices,
+    technical analysis, annual fundamental ratios and dividend yields of every listed symbol.
+    The table is replaced in a single transaction, so screens never see it partly rebuilt
+    """
+    logger.info("Now rebuilding the stock screener table.")
+    try:
+        with DatabaseConnect() as db_connect:
+            with db_connect.dbcon.begin():
+                db_connect.dbcon.execute(text("DELETE FROM stock_screener"))
+                result = db_connect.dbcon.execute(
+                    text(f"INSERT INTO stock_screener ({STOCK_SCREENER_COLUMNS}) {STOCK_SCREENER_SELECT_QUERY}")
+                )
+            logger.info("Number of rows written to the stock screener table was " + str(result.rowcount))
+            _publish_data_changes(db_connect, "stock_screener")
+        return 0
+    except Exception:
+        logger.exception("Could not rebuild the stock screener table.")
+
+
+def update_simulator_games(game_ids=None):
+    """
+    Calculate the leaderboard for the simulator games (the portfolio value, gain/loss and position of each player),
+    then upsert the players and games that changed since the last run.
+    If a list of game_ids is passed in, only those games are recalculated
     """
     logger.info("Now trying to update the simulator games.")
     db_connect = None
     try:
         # set up the db connection
         db_connect = DatabaseConnect()
+        game_filter = ""
+        if game_ids is not None:
+            if not game_ids:
+                return 0
+            game_filter = f"WHERE games.game_id IN ({','.join(str(int(game_id)) for game_id in game_ids)})"
         # set up our dataframes from the db tables
         simulator_games_df = pd.io.sql.read_sql(
-            f"SELECT game_id, date_created,date_ended,game_name,game_code,private,is_active, starting_cash, num_players \
-            FROM stocks_simulatorgames;",
+            f"SELECT game_id, date_created,date_ended,game_name,private,is_active, starting_cash, num_players \
+            FROM stocks_simulatorgames AS games {game_filter};",
             db_connect.dbengine,
         )
+        # read the players with the totals of their portfolios, summed up in the db
         simulator_players_df = pd.io.sql.read_sql(
-            f"SELECT simulator_player_id, simulator_game_id,liquid_cash, user_id,overall_gain_loss_percent,current_position \
-            FROM stocks_simulatorplayers;",
-            db_connect.dbengine,
-        )
-        simulator_portfolio_df = pd.io.sql.read_sql(
-            f"SELECT simulator_player_id,total_gain_loss \
-            FROM stocks_simulatorportfolios;",
+            f"SELECT players.simulator_player_id, players.simulator_game_id AS game_id, players.liquid_cash, \
+            players.user_id, players.overall_gain_loss AS stored_overall_gain_loss, \
+            players.overall_gain_loss_percent AS stored_overall_gain_loss_percent, \
+            players.current_portfolio_value AS stored_current_portfolio_value, \
+            players.current_position AS stored_current_position, \
+            portfolios.overall_gain_loss, portfolios.holdings_value \
+            FROM stocks_simulatorplayers AS players \
+            INNER JOIN stocks_simulatorgames AS games ON games.game_id = players.simulator_game_id \
+            LEFT JOIN (SELECT simulator_player_id, SUM(total_gain_loss) AS overall_gain_loss, \
+            SUM(COALESCE(market_value, book_cost)) AS holdings_value \
+            FROM stocks_simulatorportfolios GROUP BY simulator_player_id) AS portfolios \
+            ON portfolios.simulator_player_id = players.simulator_player_id \
+            {game_filter};",
             db_connect.dbengine,
         )
-        # first calculate the overall gain/loss for each simulator player
-        simulator_portfolio_df = (
-            simulator_portfolio_df.groupby(["simulator_player_id"]).sum().reset_index()
-        )
-        # rename the total_gain_loss column
-        simulator_portfolio_df.rename(
-            columns={"total_gain_loss": "overall_gain_loss"}, inplace=True
-        )
-        # merge this df with the simulator players df
-        simulator_players_df = simulator_players_df.merge(
-            simulator_portfolio_df, how="outer", on=["simulator_player_id"]
-        )
-        # rename the simulator_game_id field
-        simulator_players_df.rename(
-            columns={"simulator_game_id": "game_id"}, inplace=True
-        )
-        #  merge with the simulator games df
         simulator_players_df = simulator_players_df.merge(
-            simulator_games_df, how="inner", on=["game_id"]
+            simulator_games_df[["game_id", "starting_cash"]], how="inner", on=["game_id"]
         )
-        # set up a new df column to track current portfolio value ( liquid cash + overall gain)
-        # simulator_players_df["current_portfolio_value"] = (
-        #     simulator_players_df["overall_gain_loss"]
-        #     + simulator_players_df["liquid_cash"]
-        # )
+        # the portfolio value is the cash that the player has left, plus the value of the shares that they hold
         simulator_players_df["current_portfolio_value"] = simulator_players_df[
             "liquid_cash"
-        ]
-        for index, row in simulator_players_df.iterrows():
-            if row["overall_gain_loss"] != np.nan:
-                row["current_portfolio_value"] = (
-                        row["liquid_cash"] + row["overall_gain_loss"]
-                )
+        ] + simulator_players_df["holdings_value"].fillna(0)
         # calculate the overall gain/loss percentage
         simulator_players_df["overall_gain_loss_percent"] = (
                 100
@@ -1008,19 +1511,44 @@ def update_simulator_games():
                         - simulator_players_df["starting_cash"]
                 )
                 / simulator_players_df["starting_cash"]
+        ).replace([np.inf, -np.inf], np.nan)
+        # the player with the highest portfolio value in each game is in first position
+        simulator_players_df["current_position"] = (
+            simulator_players_df.groupby("game_id")["current_portfolio_value"]
+            .rank(method="min", ascending=False)
+            .astype(int)
         )
-        # then group by simulator game and sort by portfolio value
-        # simulator_players_df["current_position"] = simulator_players_df.sort_values(
-        #     ["game_id", "current_portfolio_value"], ascending=False).groupby(["game_id"]).rank(method='min')
-        simulator_players_df["current_position"] = simulator_players_df.groupby("game_id")[
-            "current_portfolio_value"].rank("first", ascending=True)
         # for each simulator game, check if the game needs be marked as inactive
-        simulator_players_df["is_active"] = simulator_players_df.apply(
-            lambda x: (1 if (x["date_ended"] > date.today()) else 0),
-            axis=1,
+        stored_is_active = simulator_games_df["is_active"].astype(bool)
+        simulator_games_df["is_active"] = (
+                pd.to_datetime(simulator_games_df["date_ended"]) > pd.Timestamp(date.today())
+        ).astype(int)
+        # only write back the games where any player's standing changed, or the game was ended
+        player_changed = np.zeros(len(simulator_players_df), dtype=bool)
+        for column in [
+            "overall_gain_loss",
+            "overall_gain_loss_percent",
+            "current_portfolio_value",
+            "current_position",
+        ]:
+            calculated = pd.to_numeric(simulator_players_df[column], errors="coerce").round(2)
+            stored = pd.to_numeric(simulator_players_df[f"stored_{column}"], errors="coerce").round(2)
+            player_changed |= ~(
+                    (calculated == stored) | (calculated.isnull() & stored.isnull())
+            ).to_numpy()
+        touched_game_ids = set(simulator_players_df.loc[player_changed, "game_id"]) | set(
+            simulator_games_df.loc[
+                simulator_games_df["is_active"].astype(bool) != stored_is_active, "game_id"
+            ]
         )
+        if not touched_game_ids:
+            logger.info("No simulator games changed since the last update.")
+            return 0
+        logger.info(f"Now updating {len(touched_game_ids)} simulator games.")
         # copy the fields we need to the individual fields to write back to the database
-        simulator_games_df = simulator_players_df[
+        simulator_games_df = simulator_games_df[
+            simulator_games_df["game_id"].isin(touched_game_ids)
+        ][
             [
                 "game_id",
                 "date_created",
@@ -1033,6 +1561,8 @@ def update_simulator_games():
             ]
         ].copy()
         simulator_players_df = simulator_players_df[
+            simulator_players_df["game_id"].isin(touched_game_ids)
+        ][
             [
                 "simulator_player_id",
                 "game_id",
@@ -1044,7 +1574,7 @@ def update_simulator_games():
                 "current_portfolio_value",
             ]
         ].copy()
-        simulator_players_df = simulator_players_df.replace(np.NaN, None)
+        simulator_players_df = simulator_players_df.astype(object).replace({np.nan: None})
         simulator_players_df.rename(
             columns={
                 "game_id": "simulator_game_id",
@@ -1052,7 +1582,7 @@ def update_simulator_games():
             inplace=True,
         )
         # now write the df to the database
-        logger.info("Now writing portfolio sector data to database.")
+        logger.info("Now writing simulator game data to database.")
         execute_completed_successfully = False
         execute_failed_times = 0
         simulator_games_table = Table(
@@ -1069,32 +1599,32 @@ def update_simulator_games():
         )
         while not execute_completed_successfully and execute_failed_times < 5:
             try:
-                insert_stmt = insert(simulator_games_table).values(
-                    simulator_games_df.to_dict("records")
-                )
-                upsert_stmt = insert_stmt.on_duplicate_key_update(
-                    {x.name: x for x in insert_stmt.inserted}
-                )
-                result = db_connect.dbcon.execute(upsert_stmt)
-                execute_completed_successfully = True
-                logger.info("Successfully wrote simulator game data to db.")
-                logger.info(
-                    "Number of rows affected in the simulator game table was "
-                    + str(result.rowcount)
-                )
-                insert_stmt = insert(simulator_players_table).values(
-                    simulator_players_df.to_dict("records")
-                )
-                upsert_stmt = insert_stmt.on_duplicate_key_update(
-                    {x.name: x for x in insert_stmt.inserted}
-                )
-                result = db_connect.dbcon.execute(upsert_stmt)
+                with db_connect.dbcon.begin():
+                    insert_stmt = insert(simulator_games_table).values(
+                        simulator_games_df.to_dict("records")
+                    )
+                    upsert_stmt = insert_stmt.on_duplicate_key_update(
+                        {x.name: x for x in insert_stmt.inserted}
+                    )
+                    result = db_connect.dbcon.execute(upsert_stmt)
+                    logger.info(
+                        "Number of rows affected in the simulator game table was "
+                        + str(result.rowcount)
+                    )
+                    if not simulator_players_df.empty:
+                        insert_stmt = insert(simulator_players_table).values(
+                            simulator_players_df.to_dict("records")
+                        )
+                        upsert_stmt = insert_stmt.on_duplicate_key_update(
+                            {x.name: x for x in insert_stmt.inserted}
+                        )
+                        result = db_connect.dbcon.execute(upsert_stmt)
+                        logger.info(
+                            "Number of rows affected in the simulator player table was "
+                            + str(result.rowcount)
+                        )
                 execute_completed_successfully = True
-                logger.info("Successfully wrote simulator player data to db.")
-                logger.info(
-                    "Number of rows affected in the simulator player table was "
-                    + str(result.rowcount)
-                )
+                logger.info("Successfully wrote simulator game and player data to db.")
             except sqlalchemy.exc.OperationalError as operr:
                 logger.warning(str(operr))
                 time.sleep(1)
@@ -1202,8 +1732,14 @@ def main(args: list[str]):
     try:
         with multiprocessing.Pool(os.cpu_count()) as multipool:
             logger.info("Now starting stocks updater module.")
-            if cli_arguments.daily_update:
+            if cli_arguments.rebuild_latest_stock_prices:
+                multipool.apply(rebuild_latest_stock_price_table, ())
+            elif cli_arguments.backfill_portfolio_values:
+                multipool.apply(backfill_portfolio_daily_values, ())
+            elif cli_arguments.daily_update:
                 multipool.apply(update_portfolio_summary_market_values, ())
+                multipool.apply(update_portfolio_daily_values, ())
+                multipool.apply(rebuild_stock_screener, ())
             else:
                 # get the latest conversion rates
                 TTD_JMD, TTD_USD, TTD_BBD = multipool.apply(
@@ -1212,13 +1748,14 @@ def main(args: list[str]):
                 # update the fundamental analysis stock data
                 multipool.apply(
                     calculate_fundamental_analysis_ratios,
-                    (TTD_JMD, TTD_USD, TTD_BBD),
+                    (TTD_JMD, TTD_USD, TTD_BBD, cli_arguments.recalculate_all_ratios),
                 )
                 multipool.apply(update_dividend_yields, (TTD_JMD, TTD_USD, TTD_BBD))
                 # update the portfolio data for all users
                 multipool.apply(update_portfolio_summary_book_costs, ())
                 multipool.apply(update_portfolio_summary_market_values, ())
                 multipool.apply(update_portfolio_sectors_values, ())
+                multipool.apply(update_portfolio_daily_values, ())
                 # update the simulator portfolio data for all simulator players
                 multipool.apply(update_simulator_portfolio_summary_book_costs, ())
                 multipool.apply(
@@ -1226,6 +1763,8 @@ def main(args: list[str]):
                 )
                 multipool.apply(update_simulator_portfolio_sectors_values, ())
                 multipool.apply(update_simulator_games, ())
+                # rebuild the screener from the ratios and yields that were just updated
+                multipool.apply(rebuild_stock_screener, ())
             multipool.close()
             multipool.join()
             logger.info(os.path.basename(__file__) + " executed successfully.")
@@ -1242,6 +1781,21 @@ def set_up_arguments(args: list[str]):
         help="Update the portfolio market data with the latest values",
         action="store_true",
     )
+    parser.add_argument(
+        "--rebuild_latest_stock_prices",
+        help="Rebuild the latest_stock_price table from the full daily stock summary history",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--backfill_portfolio_values",
+        help="Calculate the daily value of every portfolio since its first transaction",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--recalculate_all_ratios",
+        help="Recalculate and rewrite the fundamental ratios for every report, instead of only the changed ones",
+        action="store_true",
+    )
     return parser.parse_args(args)
 
 
@@ -0,0 +1,61 @@
+"""
+Token authentication for the apis that caches the token and its user.
+
+The rest_framework TokenAuthentication looks up the token (joined with its user) on every request, and the app
+makes several api calls at once for each screen. CachedTokenAuthentication keeps each token that it has
+looked up in the cache for a short time, so that an authenticated request only needs a cache lookup.
+
+The cached tokens of a user are dropped whenever the user is saved (eg. when their password is changed or their
+account is deactivated by UserDelete), logs out, or has a token deleted or changed (see stocks/signals.py),
+so that a cached token never outlives the access that it grants.
+"""
+
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# how long (in seconds) a token is cached for after it is looked up
+TOKEN_CACHE_TIMEOUT = getattr(settings, "TOKEN_AUTHENTICATION_CACHE_TIMEOUT", 60 * 5)
+
+
+def token_cache_key(key: str) -> str:
+    """Get the cache key of a token, which is hashed so that the token itself is not stored in the cache key"""
+    return "auth_token:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def clear_cached_tokens(keys: Iterable[str]):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def clear_cached_user_tokens(user):
+    """Drop all of the cached tokens of a user"""
+    if user is None or user.pk is None:
+        return
+    clear_cached_tokens(Token.objects.filter(user=user).values_list("key", flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticate requests with a token like TokenAuthentication does, but read the token and its user from the
+    cache if they have been looked up recently
+    """
+
+    def authenticate_credentials(self, key: str) -> Tuple[object, Token]:
+        cache_key = token_cache_key(key)
+        token: Optional[Token] = cache.get(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related("user").get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            cache.set(cache_key, token, TOKEN_CACHE_TIMEOUT)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return token.user, token
@@ -71,7 +71,8 @@ def update_summarized_dividend_yields(TTD_JMD: Decimal, TTD_USD: Decimal, TTD_BB
         five_years_ago: int = current_year - 5
         ten_years_ago: int = current_year - 10
         # fetch all the listed equities that we have data on
-        all_listed_equities: QuerySet[models.ListedEquities] = models.ListedEquities.objects.all()
+        all_listed_equities: QuerySet[models.ListedEquities] = models.ListedEquities.objects.select_related(
+            "latest_stock_price").all()
         for listed_equity in all_listed_equities:
             logger.info(f"Now updating yields for {listed_equity.symbol}.")
             # check if a yield summary already exists for this symbol
@@ -105,11 +106,10 @@ def update_summarized_dividend_yields(TTD_JMD: Decimal, TTD_USD: Decimal, TTD_BB
                     currency_multiplication_factor = 1 / TTD_JMD
                 elif dividend_payments_within_last_12_months.first().currency == 'BBD':
                     currency_multiplication_factor = 1 / TTD_BBD
-            latest_stock_summary: models.DailyStockSummary = models.DailyStockSummary.objects.filter(
-                symbol=listed_equity).filter(close_price__gt=0).order_by('-date').first()
+            latest_stock_price: models.LatestStockPrice = listed_equity.latest_stock_price
             dividend_yield_ttm: Decimal = (
                                                   (
-                                                          sum_dividend_payments_within_last_12_months * currency_multiplication_factor) / latest_stock_summary.close_price) * 100
+                                                          sum_dividend_payments_within_last_12_months * currency_multiplication_factor) / latest_stock_price.close_price) * 100
             symbol_dividend_yield_summary.ttm_yield = dividend_yield_ttm
             # now calculate the yields for the previous years
             year_counter: int = current_year - 1
@@ -0,0 +1,280 @@
+"""
+Bulk exports of the price and market index history, for analytics jobs that need whole tables.
+
+Rows are read in chunks with keyset pagination (so the database never has to skip over rows, and no more than
+one chunk is held in memory) and each chunk is encoded and streamed to the client before the next is read.
+The columns can be projected and the rows filtered by symbol, index and date, and the output can be
+CSV, newline delimited JSON, or (if pyarrow is installed) an Arrow IPC stream or Parquet file.
+"""
+
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from django.db import models as django_models
+
+from . import models
+from .pagination import keyset_filter, keyset_order_by
+
+# the number of rows read from the database and encoded at a time
+EXPORT_CHUNK_SIZE = 5000
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+EXPORT_CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+EXPORT_FILE_EXTENSIONS = {
+    FORMAT_CSV: "csv",
+    FORMAT_NDJSON: "ndjson",
+    FORMAT_ARROW: "arrows",
+    FORMAT_PARQUET: "parquet",
+}
+# the formats that are written with pyarrow
+ARROW_FORMATS = [FORMAT_ARROW, FORMAT_PARQUET]
+
+
+class ExportDataset(NamedTuple):
+    model: Type[django_models.Model]
+    # the columns that can be exported, in their default order
+    columns: Tuple[str, ...]
+    # a unique ordering to read the rows in, which should match an index of the table
+    keyset_ordering: Tuple[str, ...]
+    # the column that the name filter (eg. the symbol) applies to
+    name_column: str
+    name_query_param: str
+
+
+EXPORT_DATASETS: Dict[str, ExportDataset] = {
+    "stockprices": ExportDataset(
+        model=models.DailyStockSummary,
+        columns=(
+            "symbol",
+            "date",
+            "open_price",
+            "high",
+            "low",
+            "close_price",
+            "last_sale_price",
+            "change_dollars",
+            "volume_traded",
+            "value_traded",
+            "was_traded_today",
+            "os_bid",
+            "os_bid_vol",
+            "os_offer",
+            "os_offer_vol",
+        ),
+        keyset_ordering=("date", "symbol"),
+        name_column="symbol",
+        name_query_param="symbol",
+    ),
+    "marketindices": ExportDataset(
+        model=models.HistoricalIndicesInfo,
+        columns=(
+            "date",
+            "index_name",
+            "index_value",
+            "index_change",
+            "change_percent",
+            "volume_traded",
+            "value_traded",
+            "num_trades",
+        ),
+        keyset_ordering=("date", "summary_id"),
+        name_column="index_name",
+        name_query_param="index_name",
+    ),
+}
+
+
+def get_export_queryset(
+    dataset: ExportDataset,
+    names: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> django_models.QuerySet:
+    queryset = dataset.model.objects.all()
+    if names:
+        queryset = queryset.filter(**{f"{dataset.name_column}__in": names})
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+def iterate_row_chunks(
+    queryset: django_models.QuerySet,
+    columns: Sequence[str],
+    ordering: Sequence[str],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[List[tuple]]:
+    """
+    Read the columns of the queryset in chunks, in the (unique) ordering given.
+    Each chunk is read with a separate query that continues after the last row of the previous one.
+    """
+    key_columns = [field.lstrip("-") for field in ordering]
+    query_columns = list(columns) + [column for column in key_columns if column not in columns]
+    key_indices = [query_columns.index(column) for column in key_columns]
+    ordered_queryset = queryset.order_by(*keyset_order_by(ordering)).values_list(*query_columns)
+    chunk_queryset = ordered_queryset
+    while True:
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield [row[: len(columns)] for row in chunk]
+        if len(chunk) < chunk_size:
+            return
+        last_row = chunk[-1]
+        chunk_queryset = ordered_queryset.filter(
+            keyset_filter(ordering, [last_row[index] for index in key_indices])
+        )
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns: Sequence[str], row_chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    csv_writer = csv.writer(buffer)
+    csv_writer.writerow(columns)
+    for chunk in row_chunks:
+        csv_writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # send the header even if there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns: Sequence[str], row_chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for chunk in row_chunks:
+        lines = [
+            json.dumps(dict(zip(columns, [_json_value(value) for value in row])), separators=(",", ":"))
+            for row in chunk
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkedSink:
+    """A write only file that pyarrow writes to, which hands back what has been written since it was last drained"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(dataset: ExportDataset, columns: Sequence[str]):
+    import pyarrow as pa
+
+    arrow_fields = []
+    for column in columns:
+        model_field = dataset.model._meta.get_field(column)
+        if isinstance(model_field, django_models.ForeignKey):
+            model_field = model_field.target_field
+        if isinstance(model_field, django_models.DateField):
+            arrow_type = pa.date32()
+        elif isinstance(model_field, (django_models.DecimalField, django_models.FloatField)):
+            arrow_type = pa.float64()
+        elif isinstance(model_field, django_models.IntegerField):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.string()
+        arrow_fields.append(pa.field(column, arrow_type))
+    return pa.schema(arrow_fields)
+
+
+def _arrow_record_batch(schema, chunk: List[tuple]):
+    import pyarrow as pa
+
+    arrays = []
+    for index, arrow_field in enumerate(schema):
+        values = [row[index] for row in chunk]
+        if pa.types.is_floating(arrow_field.type):
+            values = [None if value is None else float(value) for value in values]
+        arrays.append(pa.array(values, type=arrow_field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def encode_arrow(
+    dataset: ExportDataset, columns: Sequence[str], row_chunks: Iterator[List[tuple]], output_format: str
+) -> Iterator[bytes]:
+    """Encode the chunks as an Arrow IPC stream, or as a Parquet file with one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(dataset, columns)
+    sink = _ChunkedSink()
+    if output_format == FORMAT_PARQUET:
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for chunk in row_chunks:
+        record_batch = _arrow_record_batch(schema, chunk)
+        if output_format == FORMAT_PARQUET:
+            writer.write_table(pa.Table.from_batches([record_batch]))
+        else:
+            writer.write_batch(record_batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(
+    dataset: ExportDataset,
+    queryset: django_models.QuerySet,
+    columns: Sequence[str],
+    output_format: str,
+) -> Iterator[bytes]:
+    """Stream the columns of the queryset in the output format"""
+    row_chunks = iterate_row_chunks(queryset, columns, dataset.keyset_ordering)
+    if output_format == FORMAT_CSV:
+        return encode_csv(columns, row_chunks)
+    if output_format == FORMAT_NDJSON:
+        return encode_ndjson(columns, row_chunks)
+    return encode_arrow(dataset, columns, row_chunks, output_format)
+
+
+def is_arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,219 @@
+"""
+Helpers for caching pages and API responses that are built from scraped data.
+
+The scrapers and updaters write through SQLAlchemy, so they cannot clear the Django cache directly.
+Instead, each writer bumps a counter in the data_versions table for every table that it writes to,
+and the version of each table that a page depends on is made part of that page's cache key.
+A single query for the versions is then enough to tell if a cached page is still valid.
+
+Writers also publish the dates and symbols that they changed, as versions named "<table>:date:<YYYY-MM-DD>"
+and "<table>:symbol:<SYMBOL>" (see _publish_data_changes in scheduled_scripts/database_ops.py). Pages and
+API responses that only show some dates or symbols of a table depend on those versions instead, so that
+only the cached entries affected by a write are dropped.
+
+The same versions are used as the validators of conditional GET requests. Their digest is sent as the ETag (and
+the time of the latest write as the Last-Modified date) of a response, so that a client (or nginx) polling for
+changes gets a 304 Not Modified from the single versions query, without the page or API data being built.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import F
+from django.http.response import HttpResponseBase
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import models
+
+# the scraped tables that cached pages depend on
+DAILY_STOCK_SUMMARY = "daily_stock_summary"
+HISTORICAL_INDICES_INFO = "historical_indices_info"
+STOCK_NEWS_DATA = "stock_news_data"
+LATEST_STOCK_PRICE = "latest_stock_price"
+TECHNICAL_ANALYSIS_SUMMARY = "technical_analysis_summary"
+CALCULATED_FUNDAMENTAL_RATIOS = "calculated_fundamental_ratios"
+LATEST_FUNDAMENTAL_RATIOS = "latest_fundamental_ratios"
+HISTORICAL_DIVIDEND_INFO = "historical_dividend_info"
+HISTORICAL_DIVIDEND_YIELD = "historical_dividend_yield"
+LISTED_EQUITIES = "listed_equities"
+STOCK_SCREENER = "stock_screener"
+# the transactions of the portfolios and simulator portfolios, which are versioned per owner
+PORTFOLIO_TRANSACTIONS = "portfolio_transactions"
+SIMULATOR_TRANSACTIONS = "simulator_transactions"
+# how long to keep cached pages for (in seconds), even if the data that they depend on is unchanged
+CACHE_TIMEOUT = 60 * 60 * 24
+# how long (in seconds) shared caches such as nginx can serve a public page before revalidating it
+PUBLIC_PAGE_MAX_AGE = 60 * 5
+
+
+def data_version_name(table_name: str, date=None, symbol: Optional[str] = None, owner=None) -> str:
+    """Get the name of the version of a whole table, or of one date, symbol or owner (eg. a user) in that table"""
+    if date is not None:
+        # dates may be strings, dates or datetimes, so only keep the YYYY-MM-DD part
+        return f"{table_name}:date:{str(date)[:10]}"
+    if symbol is not None:
+        return f"{table_name}:symbol:{symbol}"
+    if owner is not None:
+        return f"{table_name}:owner:{owner}"
+    return table_name
+
+
+def get_data_versions_and_last_modified(names: Iterable[str]) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """
+    Fetch the current version of each of the names, and the time that the latest of them changed, in a single query
+    """
+    names = list(names)
+    versions = dict.fromkeys(names, 0)
+    last_modified = None
+    for name, version, updated_at in models.DataVersion.objects.filter(name__in=names).values_list(
+        "name", "version", "updated_at"
+    ):
+        versions[name] = version
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def get_data_versions(names: Iterable[str]) -> Dict[str, int]:
+    """Fetch the current version of each of the names in a single query"""
+    versions, _ = get_data_versions_and_last_modified(names)
+    return versions
+
+
+def _versions_digest(versions: Dict[str, int], parts: tuple) -> str:
+    version_string = ",".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    key_parts = ":".join(str(part) for part in parts)
+    return hashlib.md5(f"{version_string}|{key_parts}".encode("utf-8")).hexdigest()
+
+
+def build_cache_key(prefix: str, versions: Dict[str, int], *parts) -> str:
+    """Build a cache key that changes whenever any of the versions change"""
+    return f"{prefix}:{_versions_digest(versions, parts)}"
+
+
+def build_etag(versions: Dict[str, int], *parts) -> str:
+    """Build a (quoted) ETag that changes whenever any of the versions change"""
+    return f'"{_versions_digest(versions, parts)}"'
+
+
+def get_not_modified_response(
+    request, etag: str, last_modified: Optional[datetime]
+) -> Optional[HttpResponseBase]:
+    """Get a 304 Not Modified response if the client already has the current version of a response, or else None"""
+    last_modified_timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified_response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified_timestamp
+    )
+    if not_modified_response is not None:
+        set_validators(not_modified_response, etag, last_modified)
+    return not_modified_response
+
+
+def set_validators(response: HttpResponseBase, etag: str, last_modified: Optional[datetime]) -> None:
+    """Add the validators that clients send back in conditional requests to a response"""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+
+
+def bump_data_versions(names: Iterable[str]) -> None:
+    """Bump the version of each of the names, for writers that use the Django ORM"""
+    for name in names:
+        updated = models.DataVersion.objects.filter(name=name).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            models.DataVersion.objects.get_or_create(name=name, defaults={"version": 1})
+
+
+def publish_data_changes(table_name: str, dates: Iterable = (), symbols: Iterable = ()) -> None:
+    """Bump the versions of a table and of the dates and symbols changed in it, for writers that use the Django ORM"""
+    names = [table_name]
+    names += [data_version_name(table_name, date=changed_date) for changed_date in dates]
+    names += [data_version_name(table_name, symbol=symbol) for symbol in symbols]
+    bump_data_versions(dict.fromkeys(names))
+
+
+def set_api_cache_control(response: HttpResponseBase) -> None:
+    """
+    The apis need a token, so they must not be stored by shared caches,
+    but clients can keep them as long as they revalidate them before reuse
+    """
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+class CachedListApiMixin:
+    """
+    Cache the response of a list api view until any of the data versions that it depends on change.
+    Views set data_version_table, and can override get_data_version_names to depend on fewer versions.
+    """
+
+    data_version_table: str = ""
+
+    def get_data_version_table(self) -> str:
+        return self.data_version_table
+
+    def get_data_version_names(self) -> List[str]:
+        """Depend on the versions of the symbol requested, or of the whole table if there is none"""
+        filter_symbol = self.request.query_params.get("symbol")
+        if filter_symbol:
+            return [data_version_name(self.get_data_version_table(), symbol=filter_symbol)]
+        return [data_version_name(self.get_data_version_table())]
+
+    def list(self, request, *args, **kwargs):
+        versions, last_modified = get_data_versions_and_last_modified(self.get_data_version_names())
+        # answer clients that already have the current data without fetching it from the cache or database
+        etag = build_etag(versions, type(self).__name__, request.get_full_path())
+        not_modified_response = get_not_modified_response(request, etag, last_modified)
+        if not_modified_response is not None:
+            set_api_cache_control(not_modified_response)
+            return not_modified_response
+        cache_key = build_cache_key(f"api:{type(self).__name__}", versions, request.get_full_path())
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            api_response = Response(cached_data)
+        else:
+            api_response = super().list(request, *args, **kwargs)
+            cache.set(cache_key, api_response.data, CACHE_TIMEOUT)
+        if api_response.status_code == 200:
+            set_validators(api_response, etag, last_modified)
+            set_api_cache_control(api_response)
+        return api_response
+
+
+class ConditionalPageMixin:
+    """
+    Answer conditional GET requests for a page with a 304 Not Modified until any of the data versions that it
+    depends on change. Views override get_data_version_names, and can reuse self.data_versions to build the page.
+    Pages for anonymous users are marked as public, so that nginx can cache them for PUBLIC_PAGE_MAX_AGE seconds.
+    """
+
+    data_versions: Dict[str, int] = None
+
+    def get_data_version_names(self) -> List[str]:
+        raise NotImplementedError("Views using ConditionalPageMixin must set their data version names.")
+
+    def get(self, request, *args, **kwargs):
+        self.data_versions, last_modified = get_data_versions_and_last_modified(self.get_data_version_names())
+        # the navbar shows who is logged in, so each user gets a different version of the page
+        etag = build_etag(self.data_versions, type(self).__name__, request.get_full_path(), request.user.pk)
+        not_modified_response = get_not_modified_response(request, etag, last_modified)
+        if not_modified_response is not None:
+            self.set_page_cache_control(not_modified_response)
+            return not_modified_response
+        page_response = super().get(request, *args, **kwargs)
+        if page_response.status_code == 200:
+            set_validators(page_response, etag, last_modified)
+            self.set_page_cache_control(page_response)
+        return page_response
+
+    def set_page_cache_control(self, response: HttpResponseBase) -> None:
+        if self.request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=PUBLIC_PAGE_MAX_AGE)
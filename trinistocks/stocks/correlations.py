@@ -0,0 +1,162 @@
+"""
+Correlations and covariances of the daily returns of the listed stocks, for the diversification views.
+
+The closing prices of every symbol over a window of trading days are read in a single query, and pivoted into an
+aligned matrix of daily returns (one row per trading day, one column per symbol). A return is only counted on a day
+that the symbol has a close price for both that day and the trading day before it, so days without a price are
+left out rather than filled in. Each pair of symbols is then compared over the days that both have returns for
+(pairwise-complete), with the sums for every pair at once coming from a few matrix products.
+
+The matrices of each window are cached as float32 upper triangles until the daily stock summary changes.
+Requests for some of the symbols are answered by slicing the cached matrices of all of them.
+"""
+
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+
+from . import caching, models, reference_data
+
+# the windows (in trading days) that the matrices can be calculated over
+CORRELATION_WINDOWS = (30, 90, 180, 365, 730)
+DEFAULT_CORRELATION_WINDOW = 365
+# the fewest days that a pair of symbols must both have returns for to be compared
+MIN_OVERLAPPING_RETURNS = 20
+# enough calendar days to cover a window of trading days, with room for weekends and holidays
+CALENDAR_DAYS_PER_TRADING_DAY = 2
+EXTRA_CALENDAR_DAYS = 14
+
+
+def get_data_version_names() -> List[str]:
+    return [caching.DAILY_STOCK_SUMMARY]
+
+
+def check_window(window: int) -> None:
+    if window not in CORRELATION_WINDOWS:
+        raise ValueError(
+            f"{window} is not a valid window. Please use one of {', '.join(map(str, CORRELATION_WINDOWS))}."
+        )
+
+
+def pairwise_complete_statistics(returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Calculate the sample covariance and correlation of every pair of columns of a matrix of returns (with NaNs for
+    missing returns), each over only the rows that both columns have returns for, along with the number of those rows.
+    This gives the same results as pandas' DataFrame.cov() and DataFrame.corr(), without looping over the pairs.
+    """
+    present = ~np.isnan(returns)
+    # centering each column first keeps the sums of squares below from losing precision
+    column_means = np.nanmean(np.where(present.any(axis=0), returns, 0.0), axis=0)
+    centered_returns = np.where(present, returns - column_means, 0.0)
+    present = present.astype(float)
+    # for each pair (i, j), over the rows that both have returns for:
+    observations = present.T @ present
+    # the sum and sum of squares of column i
+    sums = centered_returns.T @ present
+    sums_of_squares = (centered_returns ** 2).T @ present
+    # the sum of the products of columns i and j
+    sums_of_products = centered_returns.T @ centered_returns
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = (sums_of_products - sums * sums.T / observations) / (observations - 1)
+        variances = (sums_of_squares - sums ** 2 / observations) / (observations - 1)
+        correlation = covariance / np.sqrt(variances * variances.T)
+    too_few_observations = observations < MIN_OVERLAPPING_RETURNS
+    covariance[too_few_observations] = np.nan
+    correlation[too_few_observations] = np.nan
+    # columns that never change have no correlation with anything
+    correlation[~np.isfinite(correlation)] = np.nan
+    np.clip(correlation, -1.0, 1.0, out=correlation)
+    return {"covariance": covariance, "correlation": correlation, "observations": observations.astype(int)}
+
+
+def _build_returns_matrix(window: int) -> pd.DataFrame:
+    """Read the close prices of the last window of trading days and align them into daily returns"""
+    latest_trading_date = reference_data.get_latest_trading_date()
+    start_date = latest_trading_date - timedelta(days=window * CALENDAR_DAYS_PER_TRADING_DAY + EXTRA_CALENDAR_DAYS)
+    price_records = models.DailyStockSummary.objects.filter(
+        date__gte=start_date, date__lte=latest_trading_date, close_price__gt=0
+    ).values_list("date", "symbol", "close_price")
+    prices_df = pd.DataFrame.from_records(list(price_records), columns=["date", "symbol", "close_price"])
+    prices_df["close_price"] = pd.to_numeric(prices_df["close_price"], errors="coerce").astype(float)
+    close_prices_df = prices_df.pivot_table(index="date", columns="symbol", values="close_price", aggfunc="last")
+    # a window of returns needs the close of the trading day before it as well
+    close_prices_df = close_prices_df.sort_index().iloc[-(window + 1):]
+    # a return is missing if either of its close prices is, rather than spanning the gap
+    return close_prices_df.pct_change(fill_method=None).iloc[1:]
+
+
+def _calculate_correlation_matrix(window: int) -> Dict:
+    returns_df = _build_returns_matrix(window)
+    statistics = pairwise_complete_statistics(returns_df.to_numpy(dtype=float))
+    upper_triangle = np.triu_indices(len(returns_df.columns))
+    return {
+        "window": window,
+        "start_date": returns_df.index[0] if len(returns_df.index) else None,
+        "end_date": returns_df.index[-1] if len(returns_df.index) else None,
+        "symbols": list(returns_df.columns),
+        # the matrices are symmetric, so only their upper triangles are kept
+        "correlation": statistics["correlation"][upper_triangle].astype(np.float32),
+        "covariance": statistics["covariance"][upper_triangle].astype(np.float32),
+        "observations": statistics["observations"][upper_triangle].astype(np.int32),
+    }
+
+
+def _unpack_matrix(upper_triangle_values: np.ndarray, num_symbols: int) -> np.ndarray:
+    matrix = np.empty((num_symbols, num_symbols), dtype=upper_triangle_values.dtype)
+    upper_rows, upper_columns = np.triu_indices(num_symbols)
+    matrix[upper_rows, upper_columns] = upper_triangle_values
+    matrix[upper_columns, upper_rows] = upper_triangle_values
+    return matrix
+
+
+def _as_nested_lists(matrix: np.ndarray, decimal_places: int) -> List[List[Optional[float]]]:
+    # missing values are sent as nulls, since NaN is not valid JSON
+    return [
+        [None if np.isnan(value) else round(float(value), decimal_places) for value in row]
+        for row in matrix
+    ]
+
+
+def get_correlation_matrix(
+    window: int = DEFAULT_CORRELATION_WINDOW,
+    symbols: Optional[Iterable[str]] = None,
+    data_versions: Optional[Dict[str, int]] = None,
+) -> Dict:
+    """
+    Get the correlation and (daily) covariance matrices of the returns of the symbols (or of every symbol) over the
+    last window of trading days. Symbols without any prices in the window are left out, and pairs of symbols with
+    fewer than MIN_OVERLAPPING_RETURNS days of returns in common have nulls instead.
+    """
+    check_window(window)
+    if data_versions is None:
+        data_versions = caching.get_data_versions(get_data_version_names())
+    cache_key = caching.build_cache_key("correlations", data_versions, window)
+    correlation_matrix = cache.get(cache_key)
+    if correlation_matrix is None:
+        correlation_matrix = _calculate_correlation_matrix(window)
+        cache.set(cache_key, correlation_matrix, caching.CACHE_TIMEOUT)
+    all_symbols = correlation_matrix["symbols"]
+    if symbols is None:
+        selected = np.arange(len(all_symbols))
+    else:
+        symbol_indexes = {symbol: index for index, symbol in enumerate(all_symbols)}
+        selected = np.array(
+            [symbol_indexes[symbol] for symbol in dict.fromkeys(symbols) if symbol in symbol_indexes], dtype=int
+        )
+    selection = np.ix_(selected, selected)
+    return {
+        "window": window,
+        "start_date": correlation_matrix["start_date"],
+        "end_date": correlation_matrix["end_date"],
+        "symbols": [all_symbols[index] for index in selected],
+        "correlation": _as_nested_lists(
+            _unpack_matrix(correlation_matrix["correlation"], len(all_symbols))[selection], 4
+        ),
+        "covariance": _as_nested_lists(
+            _unpack_matrix(correlation_matrix["covariance"], len(all_symbols))[selection], 8
+        ),
+        "observations": _unpack_matrix(correlation_matrix["observations"], len(all_symbols))[selection].tolist(),
+    }
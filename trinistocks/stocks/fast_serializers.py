@@ -0,0 +1,144 @@
+"""
+A fast read path for the list apis that return many rows.
+
+A ModelSerializer builds a model instance for every row and then calls each of its fields in turn.
+For the market data apis, which can return thousands of rows, this dominates the time taken by the request.
+ValuesListSerializer instead reads only the columns that the ModelSerializer outputs with .values_list(),
+and converts each column of a row with a function picked once for the matching ModelSerializer field,
+producing exactly the same data (and so exactly the same JSON) as the ModelSerializer.
+"""
+
+import decimal
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from django.db.models import Model
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# the values of the decimal query parameter, to output decimals as strings (the default) or as floats
+DECIMAL_AS_STRING = "string"
+DECIMAL_AS_FLOAT = "float"
+
+
+def _decimal_converter(field: fields.DecimalField, as_float: bool) -> Callable:
+    """Quantize decimals the same way that the DRF DecimalField does, then output them as strings or floats"""
+    if field.decimal_places is None:
+        quantum = None
+        context = None
+    else:
+        quantum = decimal.Decimal(".1") ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+    rounding = field.rounding
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        if quantum is not None:
+            value = value.quantize(quantum, rounding=rounding, context=context)
+        if field.normalize_output:
+            value = value.normalize()
+        if as_float:
+            return float(value)
+        if not coerce_to_string:
+            return value
+        return "{:f}".format(value)
+
+    return convert
+
+
+def _date_converter(field: fields.DateField) -> Optional[Callable]:
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None:
+        return None
+    if output_format.lower() == ISO_8601:
+        return lambda value: value if isinstance(value, str) else value.isoformat()
+    return field.to_representation
+
+
+def _build_converter(field: fields.Field, as_float: bool) -> Optional[Callable]:
+    """Pick the function used to convert a column, or None if its values can be used as they are"""
+    if isinstance(field, fields.DecimalField):
+        return _decimal_converter(field, as_float)
+    if isinstance(field, fields.DateTimeField):
+        return field.to_representation
+    if isinstance(field, fields.DateField):
+        return _date_converter(field)
+    if isinstance(field, fields.IntegerField):
+        return int
+    if isinstance(field, fields.FloatField):
+        return float
+    if isinstance(field, fields.CharField) and type(field) in (fields.CharField, fields.ChoiceField):
+        # text columns are already read from the database as strings
+        return None
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        # .values_list() already returns the primary key of related objects
+        return None
+    # fall back to the DRF field for anything else
+    return field.to_representation
+
+
+class ValuesListSerializer:
+    """
+    Serialize rows from .values_list() into the same output as a read only ModelSerializer.
+    Only ModelSerializers whose fields map directly onto model fields (with no source or method fields) are supported.
+    """
+
+    def __init__(self, model_serializer_class: Type[serializers.ModelSerializer]):
+        self.model_serializer_class = model_serializer_class
+        self.model: Type[Model] = model_serializer_class.Meta.model
+        self.fields: Dict[str, fields.Field] = model_serializer_class().fields
+        self.columns: Tuple[str, ...] = tuple(self.fields.keys())
+        for field_name, field in self.fields.items():
+            if field.source != field_name:
+                raise ValueError(f"{model_serializer_class.__name__}.{field_name} does not map onto a model field.")
+        self._converters = {
+            as_float: [_build_converter(field, as_float) for field in self.fields.values()]
+            for as_float in (False, True)
+        }
+
+    def get_query_columns(self, extra_columns: Iterable[str] = ()) -> Tuple[str, ...]:
+        """Get the columns to query, with any extra ones (eg. for pagination) after the output columns"""
+        return self.columns + tuple(column for column in extra_columns if column not in self.columns)
+
+    def to_representation(self, rows: Iterable[tuple], decimal_as: str = DECIMAL_AS_STRING) -> List[OrderedDict]:
+        """Convert rows whose first columns are the output columns, in order"""
+        converters = self._converters[decimal_as == DECIMAL_AS_FLOAT]
+        columns = self.columns
+        indexed_converters = [
+            (index, converter) for index, converter in enumerate(converters) if converter is not None
+        ]
+        data = []
+        for row in rows:
+            values = list(row[: len(columns)])
+            for index, converter in indexed_converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = converter(value)
+            data.append(OrderedDict(zip(columns, values)))
+        return data
+
+
+class FastListApiMixin:
+    """
+    List the results of a view with its fast_serializer, instead of its serializer_class.
+    Clients can ask for decimals to be returned as floats with decimal=float.
+    """
+
+    fast_serializer: ValuesListSerializer = None
+    decimal_query_param = "decimal"
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        decimal_as = request.query_params.get(self.decimal_query_param, DECIMAL_AS_STRING)
+        # also query the columns that the paginator needs to build its cursor
+        extra_columns = [field.lstrip("-") for field in getattr(self, "keyset_ordering", ())]
+        rows = queryset.values_list(*self.fast_serializer.get_query_columns(extra_columns), named=True)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.to_representation(page, decimal_as))
+        return Response(self.fast_serializer.to_representation(rows, decimal_as))
@@ -1,6 +1,17 @@
 import django_filters
 
-from stocks import models
+from stocks import models, news_search, reference_data
+
+
+class ListedSymbolFilter(django_filters.ChoiceFilter):
+    """
+    Filter by a listed symbol, validated against the cached reference data
+    instead of querying the listed equities for every request
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("choices", reference_data.get_listed_symbol_choices)
+        super().__init__(*args, **kwargs)
 
 
 class DailyTradingSummaryFilter(django_filters.FilterSet):
@@ -13,11 +24,12 @@ class DailyTradingSummaryFilter(django_filters.FilterSet):
 
 
 class StockHistoryFilter(django_filters.FilterSet):
+    symbol = ListedSymbolFilter()
+
     class Meta:
         model = models.DailyStockSummary
         fields = {
             'date': ['gte', 'lte', ],
-            'symbol': ['exact', ],
         }
 
 
@@ -29,10 +41,11 @@ class ListedStocksFilter(django_filters.FilterSet):
 
 
 class DividendHistoryFilter(django_filters.FilterSet):
+    symbol = ListedSymbolFilter()
+
     class Meta:
         model = models.HistoricalDividendInfo
         fields = {
-            'symbol': ['exact', ],
             'record_date': ['gte', 'lte', ],
         }
 
@@ -50,11 +63,12 @@ class MarketIndexHistoryFilter(django_filters.FilterSet):
 
 
 class OSTradesHistoryFilter(django_filters.FilterSet):
+    symbol = ListedSymbolFilter()
+
     class Meta:
         model = models.DailyStockSummary
         fields = {
             'date': ['gte', 'lte', ],
-            'symbol': ['exact', ],
         }
 
 
@@ -80,10 +94,15 @@ class PortfolioSummaryFilter(django_filters.FilterSet):
 
 
 class StockNewsHistoryFilter(django_filters.FilterSet):
+    symbol = ListedSymbolFilter()
+    search = django_filters.CharFilter(method="filter_search", label="Search")
+
+    def filter_search(self, queryset, name, value):
+        return news_search.search_news(queryset, value)
+
     class Meta:
         model = models.StockNewsData
         fields = {
             'date': ['gte', 'lte', ],
-            'symbol': ['exact', ],
             'category': ['exact', ],
         }
@@ -6,7 +6,7 @@ from django.contrib.auth import authenticate, get_user_model
 from django.core.exceptions import ValidationError
 
 # imports from local machine
-from stocks import models
+from stocks import models, reference_data
 
 
 class RegisterForm(forms.Form):
@@ -93,12 +93,9 @@ class LoginForm(forms.Form):
 class PortfolioTransactionForm(forms.Form):
 
     # Set up the required data for this form
-    ALL_LISTED_EQUITY_CHOICES = []
-    choices = models.ListedEquities.objects.all().order_by("symbol")
-    for choice in choices:
-        ALL_LISTED_EQUITY_CHOICES.append((choice.symbol, choice.symbol))
+    # (the choices are read from the reference data whenever the form is used, so new listings show up)
     symbol = forms.ChoiceField(widget=forms.Select(attrs={"class": ""}),
-                               choices=ALL_LISTED_EQUITY_CHOICES)
+                               choices=reference_data.get_listed_symbol_choices)
     num_shares = forms.CharField(widget=forms.TextInput(
         attrs={"class": "input"}))
     bought_or_sold = forms.ChoiceField(
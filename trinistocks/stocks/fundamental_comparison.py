@@ -0,0 +1,80 @@
+"""
+Comparisons of a fundamental indicator across any number of symbols, for the fundamental history page and the
+fundamental comparison api.
+
+The selected indicator is fetched for all of the symbols and both report types in a single query that only reads
+the columns needed, and is then pivoted into one series per symbol, aligned on the dates reported by any of them.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+from . import caching, models
+
+REPORT_TYPES = ["annual", "quarterly"]
+# the columns of the calculated ratios that are not indicators
+NON_INDICATOR_COLUMNS = ["id", "symbol", "date", "report_type"]
+
+
+def get_indicators() -> List[Dict[str, str]]:
+    """Get the field name and verbose name of each of the indicators that can be compared"""
+    return [
+        {"field_name": field.column, "verbose_name": field.verbose_name}
+        for field in models.FundamentalAnalysisSummary._meta.fields
+        if field.column not in NON_INDICATOR_COLUMNS
+    ]
+
+
+def get_indicator_verbose_name(indicator: str) -> str:
+    """Get the verbose name of an indicator, raising a ValueError if it is not one that can be compared"""
+    for valid_indicator in get_indicators():
+        if valid_indicator["field_name"] == indicator:
+            return valid_indicator["verbose_name"]
+    raise ValueError(f"{indicator} is not a valid fundamental indicator.")
+
+
+def get_fundamental_comparison(symbols: List[str], indicator: str, start_date: date, end_date: date) -> Dict:
+    """
+    Get the annual and quarterly values of an indicator for each of the symbols between two dates.
+    Each report type holds the dates reported by any of the symbols, in order, and the value for each symbol
+    on each of those dates (or None if it has no report on that date).
+    """
+    indicator_name = get_indicator_verbose_name(indicator)
+    values_by_date = {report_type: {} for report_type in REPORT_TYPES}
+    indicator_records = (
+        models.FundamentalAnalysisSummary.objects.filter(
+            symbol__in=symbols, report_type__in=REPORT_TYPES, date__gte=start_date, date__lte=end_date
+        )
+        .order_by("date")
+        .values_list("report_type", "symbol", "date", indicator)
+    )
+    for report_type, symbol, report_date, indicator_value in indicator_records:
+        values_by_date[report_type].setdefault(report_date, {})[symbol] = indicator_value
+    comparison = {"indicator": indicator, "indicator_name": indicator_name, "symbols": list(symbols)}
+    for report_type in REPORT_TYPES:
+        report_dates = list(values_by_date[report_type])
+        comparison[report_type] = {
+            "dates": report_dates,
+            "values": {
+                symbol: [values_by_date[report_type][report_date].get(symbol) for report_date in report_dates]
+                for symbol in symbols
+            },
+        }
+    return comparison
+
+
+def get_symbol_series(report: Dict, symbol: str) -> Dict[str, list]:
+    """Get the dates and values of one symbol from a report type of a comparison, leaving out the dates without a value"""
+    symbol_series = {"dates": [], "values": []}
+    for report_date, indicator_value in zip(report["dates"], report["values"][symbol]):
+        if indicator_value is not None:
+            symbol_series["dates"].append(report_date)
+            symbol_series["values"].append(indicator_value)
+    return symbol_series
+
+
+def get_data_version_names(symbols: List[str]) -> List[str]:
+    """Get the data versions that a comparison of the symbols depends on"""
+    return [
+        caching.data_version_name(caching.CALCULATED_FUNDAMENTAL_RATIOS, symbol=symbol) for symbol in symbols
+    ]
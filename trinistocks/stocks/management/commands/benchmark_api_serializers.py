@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from stocks import fast_serializers, serializers
+
+# the serializers of the list apis that have a fast read path
+BENCHMARKED_SERIALIZERS = [
+    serializers.StockPriceSerializer,
+    serializers.DailyStockSummarySerializer,
+    serializers.OutstandingTradesSerializer,
+    serializers.MarketIndicesSerializer,
+    serializers.DividendPaymentsSerializer,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the rows per second of the ModelSerializers used by the list apis with their fast "
+        "values_list read path, from the query to the rendered JSON, and check that both give the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="The number of rows to serialize per run.")
+        parser.add_argument("--runs", type=int, default=5, help="The number of runs to take the best time of.")
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        for serializer_class in BENCHMARKED_SERIALIZERS:
+            fast_serializer = fast_serializers.ValuesListSerializer(serializer_class)
+            queryset = fast_serializer.model.objects.order_by("pk")[: options["rows"]]
+
+            def model_serializer_json():
+                return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+            def fast_serializer_json():
+                rows = queryset.values_list(*fast_serializer.get_query_columns())
+                return renderer.render(fast_serializer.to_representation(rows))
+
+            model_serializer_output, model_serializer_time = self._time_best_run(model_serializer_json, options["runs"])
+            fast_serializer_output, fast_serializer_time = self._time_best_run(fast_serializer_json, options["runs"])
+            num_rows = queryset.count()
+            if not num_rows:
+                self.stdout.write(f"{serializer_class.__name__}: no rows to serialize.")
+                continue
+            self.stdout.write(
+                f"{serializer_class.__name__} ({num_rows} rows): "
+                f"ModelSerializer {num_rows / model_serializer_time:,.0f} rows/s, "
+                f"values_list {num_rows / fast_serializer_time:,.0f} rows/s "
+                f"({model_serializer_time / fast_serializer_time:.1f}x), "
+                f"identical output: {model_serializer_output == fast_serializer_output}"
+            )
+
+    @staticmethod
+    def _time_best_run(function, runs):
+        best_time = None
+        output = None
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            output = function()
+            run_time = time.perf_counter() - start_time
+            if best_time is None or run_time < best_time:
+                best_time = run_time
+        return output, best_time
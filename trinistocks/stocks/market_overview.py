@@ -0,0 +1,99 @@
+"""
+Queries for the market overview shown on the homepage and by the market overview api.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.db import connection
+
+from . import caching, models
+
+# the index series shown in the market overview, by the key that they are returned under
+MARKET_INDEX_NAMES = {
+    "tnt": "All T&T Totals",
+    "composite": "Composite Totals",
+    "cross_listed": "Cross-Listed Totals",
+    "sme": "Sme Totals",
+}
+OTHERS_SYMBOL = "Others"
+
+
+def get_top_value_traded(selected_date: date, top_n: int = 10) -> Tuple[List[str], List[Decimal]]:
+    """
+    Get the top_n symbols by value traded on the selected date, followed by an "Others" entry holding the total
+    value traded by all of the remaining symbols. Both are calculated by the database in one aggregate query.
+    """
+    daily_stock_summary_table = models.DailyStockSummary._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT CASE WHEN ranked.value_rank <= %s THEN ranked.symbol ELSE %s END AS graph_symbol,
+                SUM(ranked.value_traded) AS graph_value_traded,
+                MIN(ranked.value_rank) AS graph_rank
+            FROM (
+                SELECT symbol, value_traded,
+                    ROW_NUMBER() OVER (ORDER BY value_traded IS NULL, value_traded DESC) AS value_rank
+                FROM {daily_stock_summary_table}
+                WHERE date = %s AND was_traded_today = 1
+            ) ranked
+            GROUP BY graph_symbol
+            ORDER BY graph_rank
+            """,
+            [top_n, OTHERS_SYMBOL, selected_date],
+        )
+        rows = cursor.fetchall()
+    graph_symbols = [row[0] for row in rows]
+    # others is a total, so it is 0 rather than null if none of the other symbols had a value traded
+    graph_value_traded = [0 if row[0] == OTHERS_SYMBOL and row[1] is None else row[1] for row in rows]
+    # always show the others category, even if nothing else was traded
+    if graph_symbols and graph_symbols[-1] != OTHERS_SYMBOL:
+        graph_symbols.append(OTHERS_SYMBOL)
+        graph_value_traded.append(0)
+    return graph_symbols, graph_value_traded
+
+
+def get_market_index_series(start_date: date, end_date: date) -> Dict[str, Dict[str, list]]:
+    """
+    Get the dates and values of each of the market indices between the start and end dates (exclusive),
+    using a single query for all of the indices
+    """
+    index_series = {key: {"dates": [], "values": []} for key in MARKET_INDEX_NAMES}
+    keys_by_index_name = {index_name: key for key, index_name in MARKET_INDEX_NAMES.items()}
+    index_records = (
+        models.HistoricalIndicesInfo.objects.filter(
+            date__gt=start_date, date__lt=end_date, index_name__in=MARKET_INDEX_NAMES.values()
+        )
+        .order_by("index_name", "date")
+        .values_list("index_name", "date", "index_value")
+    )
+    for index_name, index_date, index_value in index_records:
+        series = index_series[keys_by_index_name[index_name]]
+        series["dates"].append(index_date)
+        series["values"].append(index_value)
+    return index_series
+
+
+def get_data_version_names(selected_date: date, index_days: int = 30) -> List[str]:
+    """
+    Get the data versions that the market overview for the selected date depends on,
+    which are the versions of the trading day itself and of the days shown in the index charts
+    """
+    return [caching.data_version_name(caching.DAILY_STOCK_SUMMARY, date=selected_date)] + [
+        caching.data_version_name(caching.HISTORICAL_INDICES_INFO, date=selected_date - timedelta(days=days_back))
+        for days_back in range(1, index_days)
+    ]
+
+
+def get_market_overview(selected_date: date, top_n: int = 10, index_days: int = 30) -> Dict:
+    """
+    Get the top symbols by value traded on the selected date, and the market indices for the days before it
+    """
+    graph_symbols, graph_value_traded = get_top_value_traded(selected_date, top_n)
+    return {
+        "date": selected_date,
+        "graph_symbols": graph_symbols,
+        "graph_value_traded": graph_value_traded,
+        "market_indices": get_market_index_series(selected_date - timedelta(days=index_days), selected_date),
+    }
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0030_auto_20230910_1621'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalCurrencyConversionRates',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('currency', models.CharField(max_length=3)),
+                ('ttd_rate', models.DecimalField(decimal_places=8, max_digits=20)),
+            ],
+            options={
+                'db_table': 'historical_currency_conversion_rates',
+                'managed': True,
+                'unique_together': {('date', 'currency')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0031_historicalcurrencyconversionrates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawFundamentalDataHashes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('date', models.DateField(verbose_name='Date')),
+                ('report_type', models.CharField(max_length=10)),
+                ('report_hash', models.CharField(max_length=20)),
+            ],
+            options={
+                'db_table': 'raw_fundamental_data_hashes',
+                'managed': True,
+                'unique_together': {('symbol', 'date', 'report_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0032_rawfundamentaldatahashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestStockPrice',
+            fields=[
+                ('symbol', models.OneToOneField(db_column='symbol', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_stock_price', serialize=False, to='stocks.listedequities')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('close_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Close Price ($)')),
+            ],
+            options={
+                'db_table': 'latest_stock_price',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0033_lateststockprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestFundamentalAnalysisSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('report_type', models.CharField(max_length=10)),
+                ('RoE', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('EPS', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('EPS_growth_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='EPS Growth Rate(%)')),
+                ('PEG', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('RoIC', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('working_capital', models.DecimalField(blank=True, decimal_places=3, max_digits=40, null=True, verbose_name='Working Capital')),
+                ('price_to_earnings_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='P/E')),
+                ('price_to_dividends_per_share_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='P/DPS')),
+                ('dividend_yield', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Dividend Yield(%)')),
+                ('dividend_payout_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Dividend Payout Ratio(%)')),
+                ('book_value_per_share', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BVPS')),
+                ('price_to_book_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='P/B')),
+                ('current_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Current Ratio')),
+                ('cash_per_share', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Cash per Share')),
+                ('symbol', models.ForeignKey(db_column='symbol', on_delete=django.db.models.deletion.CASCADE, related_name='latest_fundamental_analysis_data', to='stocks.listedequities')),
+            ],
+            options={
+                'db_table': 'latest_fundamental_ratios',
+                'managed': True,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='latestfundamentalanalysissummary',
+            index=models.Index(fields=['report_type', 'symbol'], name='latest_fund_report__307937_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='latestfundamentalanalysissummary',
+            unique_together={('symbol', 'report_type')},
+        ),
+    ]
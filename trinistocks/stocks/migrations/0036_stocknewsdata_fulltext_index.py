@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# stock_news_data is not managed by Django, so its full-text index is added here directly.
+# Only MySQL supports it; the news search falls back to a plain LIKE search on other databases.
+SEARCH_INDEX_NAME = "stock_news_data_search"
+
+
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'stock_news_data' AND index_name = %s",
+            [SEARCH_INDEX_NAME],
+        )
+        if cursor.fetchone()[0]:
+            return
+    schema_editor.execute(
+        f"ALTER TABLE stock_news_data ADD FULLTEXT INDEX {SEARCH_INDEX_NAME} (title, category)"
+    )
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(f"ALTER TABLE stock_news_data DROP INDEX {SEARCH_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0035_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0036_stocknewsdata_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoredstocks',
+            name='alert_price_above',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='monitoredstocks',
+            name='alert_price_below',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='PriceAlerts',
+            fields=[
+                ('price_alert_id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('alert_type', models.CharField(max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('symbol', models.ForeignKey(db_column='symbol', on_delete=django.db.models.deletion.CASCADE, to='stocks.listedequities')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'price_alerts',
+                'managed': True,
+                'unique_together': {('user', 'symbol', 'date', 'alert_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0037_monitoredstocks_price_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioDailyValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('market_value', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('net_invested', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'portfolio_daily_value',
+                'managed': True,
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
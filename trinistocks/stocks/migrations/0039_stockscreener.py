@@ -0,0 +1,83 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0038_portfoliodailyvalue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockScreener',
+            fields=[
+                ('symbol', models.OneToOneField(db_column='symbol', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='stocks.listedequities')),
+                ('security_name', models.CharField(max_length=100)),
+                ('sector', models.CharField(blank=True, max_length=100, null=True)),
+                ('last_close_price', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('sma_20', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('sma_200', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('beta', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('adtv', models.PositiveIntegerField(blank=True, null=True)),
+                ('high_52w', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('low_52w', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('wtd', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('mtd', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('ytd', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('report_date', models.DateField(blank=True, null=True)),
+                ('RoE', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('EPS', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('EPS_growth_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('PEG', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('RoIC', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('price_to_earnings_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('price_to_book_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('dividend_yield', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('dividend_payout_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('current_ratio', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('ttm_yield', models.DecimalField(blank=True, decimal_places=5, max_digits=20, null=True)),
+                ('three_year_yield', models.DecimalField(blank=True, decimal_places=5, max_digits=20, null=True)),
+                ('five_year_yield', models.DecimalField(blank=True, decimal_places=5, max_digits=20, null=True)),
+                ('ten_year_yield', models.DecimalField(blank=True, decimal_places=5, max_digits=20, null=True)),
+            ],
+            options={
+                'db_table': 'stock_screener',
+                'managed': True,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['sector'], name='stock_scree_sector_655f14_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['last_close_price'], name='stock_scree_last_cl_76d958_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['price_to_earnings_ratio'], name='stock_scree_price_t_3618bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['price_to_book_ratio'], name='stock_scree_price_t_bbd317_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['dividend_yield'], name='stock_scree_dividen_8917a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['ttm_yield'], name='stock_scree_ttm_yie_72c890_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['beta'], name='stock_scree_beta_ad87c0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockscreener',
+            index=models.Index(fields=['ytd'], name='stock_scree_ytd_2480b7_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0039_stockscreener'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioValueRecalculation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='stocks.user')),
+                ('from_date', models.DateField()),
+            ],
+            options={
+                'db_table': 'portfolio_value_recalculations',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0040_portfoliovaluerecalculation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricealerts',
+            name='claim_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -191,6 +191,24 @@ class DailyStockSummary(models.Model):
         return url
 
 
+class LatestStockPrice(models.Model):
+    symbol = models.OneToOneField(
+        ListedEquities,
+        models.CASCADE,
+        primary_key=True,
+        db_column="symbol",
+        related_name="latest_stock_price",
+    )
+    date = models.DateField(verbose_name="Date")
+    close_price = models.DecimalField(
+        max_digits=12, decimal_places=2, verbose_name="Close Price ($)"
+    )
+
+    class Meta:
+        managed = True
+        db_table = "latest_stock_price"
+
+
 class HistoricalDividendInfo(models.Model):
     dividend_id = models.AutoField(primary_key=True)
     symbol = models.ForeignKey(ListedEquities, models.CASCADE, db_column="symbol")
@@ -316,14 +334,7 @@ class TechnicalAnalysisSummary(models.Model):
         db_table = "technical_analysis_summary"
 
 
-class FundamentalAnalysisSummary(models.Model):
-    id = models.AutoField(primary_key=True)
-    symbol = models.ForeignKey(
-        ListedEquities,
-        models.CASCADE,
-        db_column="symbol",
-        related_name="fundamental_analysis_data",
-    )
+class FundamentalRatios(models.Model):
     date = models.DateField(verbose_name="Date")
     report_type = models.CharField(max_length=10)
     RoE = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
@@ -385,11 +396,115 @@ class FundamentalAnalysisSummary(models.Model):
         verbose_name="Cash per Share",
     )
 
+    class Meta:
+        abstract = True
+
+
+class FundamentalAnalysisSummary(FundamentalRatios):
+    id = models.AutoField(primary_key=True)
+    symbol = models.ForeignKey(
+        ListedEquities,
+        models.CASCADE,
+        db_column="symbol",
+        related_name="fundamental_analysis_data",
+    )
+
     class Meta:
         managed = False
         db_table = "calculated_fundamental_ratios"
 
 
+class LatestFundamentalAnalysisSummary(FundamentalRatios):
+    """The latest annual and quarterly ratios for each symbol, maintained by the fundamental ratios updater"""
+    symbol = models.ForeignKey(
+        ListedEquities,
+        models.CASCADE,
+        db_column="symbol",
+        related_name="latest_fundamental_analysis_data",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "latest_fundamental_ratios"
+        unique_together = (("symbol", "report_type"),)
+        indexes = [models.Index(fields=["report_type", "symbol"])]
+
+
+class StockScreener(models.Model):
+    """
+    The latest technical, fundamental (annual) and dividend yield metrics of each listed symbol in one row,
+    so that the screener can filter and sort on any of them without joins. Rebuilt by the updater after each run.
+    """
+    symbol = models.OneToOneField(ListedEquities, models.CASCADE, primary_key=True, db_column="symbol")
+    security_name = models.CharField(max_length=100)
+    sector = models.CharField(max_length=100, blank=True, null=True)
+    last_close_price = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
+    sma_20 = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
+    sma_200 = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
+    beta = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+    adtv = models.PositiveIntegerField(blank=True, null=True)
+    high_52w = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
+    low_52w = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True)
+    wtd = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    mtd = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    ytd = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    # the date of the annual report that the fundamental ratios are from
+    report_date = models.DateField(blank=True, null=True)
+    RoE = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    EPS = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    EPS_growth_rate = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    PEG = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    RoIC = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    price_to_earnings_ratio = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    price_to_book_ratio = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    dividend_yield = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    dividend_payout_ratio = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    current_ratio = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
+    ttm_yield = models.DecimalField(max_digits=20, decimal_places=5, blank=True, null=True)
+    three_year_yield = models.DecimalField(max_digits=20, decimal_places=5, blank=True, null=True)
+    five_year_yield = models.DecimalField(max_digits=20, decimal_places=5, blank=True, null=True)
+    ten_year_yield = models.DecimalField(max_digits=20, decimal_places=5, blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = "stock_screener"
+        # the metrics that screens filter and sort on the most
+        indexes = [
+            models.Index(fields=["sector"]),
+            models.Index(fields=["last_close_price"]),
+            models.Index(fields=["price_to_earnings_ratio"]),
+            models.Index(fields=["price_to_book_ratio"]),
+            models.Index(fields=["dividend_yield"]),
+            models.Index(fields=["ttm_yield"]),
+            models.Index(fields=["beta"]),
+            models.Index(fields=["ytd"]),
+        ]
+
+
+class HistoricalCurrencyConversionRates(models.Model):
+    date = models.DateField(verbose_name="Date")
+    currency = models.CharField(max_length=3)
+    # the number of units of this currency that one TTD buys
+    ttd_rate = models.DecimalField(max_digits=20, decimal_places=8)
+
+    class Meta:
+        managed = True
+        db_table = "historical_currency_conversion_rates"
+        unique_together = (("date", "currency"),)
+
+
+class RawFundamentalDataHashes(models.Model):
+    symbol = models.CharField(max_length=20)
+    date = models.DateField(verbose_name="Date")
+    report_type = models.CharField(max_length=10)
+    report_hash = models.CharField(max_length=20)
+
+    class Meta:
+        managed = True
+        db_table = "raw_fundamental_data_hashes"
+        unique_together = (("symbol", "date", "report_type"),)
+
+
 class PortfolioTransactions(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE, default=1)
     symbol = models.ForeignKey(ListedEquities, models.CASCADE, db_column="symbol")
@@ -423,6 +538,33 @@ class PortfolioSummary(models.Model):
         unique_together = [["user", "symbol"]]
 
 
+class PortfolioDailyValue(models.Model):
+    """The value of each user's portfolio at the close of each trading day, for charting it over time"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE)
+    date = models.DateField()
+    market_value = models.DecimalField(max_digits=20, decimal_places=2)
+    # the cost of the shares bought less the proceeds of the shares sold, up to this date
+    net_invested = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        managed = True
+        db_table = "portfolio_daily_value"
+        unique_together = [["user", "date"]]
+
+
+class PortfolioValueRecalculation(models.Model):
+    """
+    The earliest date from which a user's daily portfolio values are out of date, because a transaction on or after
+    it was added, changed or deleted. The updater recalculates the values from that date and then clears the row.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, models.CASCADE, primary_key=True)
+    from_date = models.DateField()
+
+    class Meta:
+        managed = True
+        db_table = "portfolio_value_recalculations"
+
+
 class PortfolioSectors(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE)
     sector = models.CharField(max_length=100)
@@ -504,6 +646,13 @@ class MonitoredStocks(models.Model):
     symbol = models.ForeignKey(
         ListedEquities, models.CASCADE, db_column="symbol", default="AGL"
     )
+    # the user is alerted when the price of the stock rises to or above, or falls to or below, these prices
+    alert_price_above = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True
+    )
+    alert_price_below = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True
+    )
 
     class Meta:
         managed = True
@@ -515,6 +664,25 @@ class MonitoredStocks(models.Model):
         ]
 
 
+class PriceAlerts(models.Model):
+    """The price alerts that have been sent to users, so that each alert is only sent once a day"""
+    price_alert_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE)
+    symbol = models.ForeignKey(ListedEquities, models.CASCADE, db_column="symbol")
+    date = models.DateField()
+    alert_type = models.CharField(max_length=20)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    threshold = models.DecimalField(max_digits=12, decimal_places=2)
+    sent_at = models.DateTimeField(auto_now_add=True)
+    # the run of the alerts that inserted (and so sends) this alert, when runs overlap
+    claim_token = models.CharField(max_length=32, blank=True, default="")
+
+    class Meta:
+        managed = True
+        db_table = "price_alerts"
+        unique_together = [["user", "symbol", "date", "alert_type"]]
+
+
 class SimulatorPortfolios(models.Model):
     simulator_portfolio_id = models.AutoField(primary_key=True, unique=True)
     simulator_player_id = models.ForeignKey(
@@ -580,3 +748,15 @@ class StockNewsData(models.Model):
     class Meta:
         managed = False
         db_table = "stock_news_data"
+
+
+class DataVersion(models.Model):
+    """A counter that is bumped by the scrapers and updaters whenever they write to a table,
+    so that cached pages built from that table can be invalidated"""
+    name = models.CharField(primary_key=True, max_length=100)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = "data_versions"
@@ -0,0 +1,62 @@
+"""
+Full-text search over the titles and categories of the stock news.
+
+On MySQL, searches use the FULLTEXT index on stock_news_data (title, category) added by migration 0036.
+InnoDB keeps that index up to date as the newsroom scraper upserts articles, so it never has to be rebuilt.
+Every word of a search must match the start of a word in the title or category, so partly typed words still
+find results, and the results are ranked by the relevance that MySQL calculates for them.
+Other databases (eg. sqlite for development) fall back to a slower LIKE search ordered by date.
+"""
+
+import re
+from typing import List
+
+from django.db import connections
+from django.db.models import F, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from . import models
+
+# the most words of a search that are used
+MAX_SEARCH_TERMS = 10
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3 by default) or its default stopwords,
+# so requiring any of them would make the search return nothing
+MIN_FULLTEXT_TERM_LENGTH = 3
+INNODB_DEFAULT_STOPWORDS = set(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to was what when where "
+    "who will with und www".split()
+)
+
+
+def parse_search_terms(search_query: str) -> List[str]:
+    """Split a search into its words, leaving out anything (like boolean search operators) that is not a word"""
+    return list(dict.fromkeys(re.findall(r"\w+", search_query.lower())))[:MAX_SEARCH_TERMS]
+
+
+def search_news(queryset: QuerySet, search_query: str) -> QuerySet:
+    """
+    Filter the news in the queryset to the articles that match the search, annotated with their relevance and
+    ordered by it (most relevant first, then newest first). A search without any words (eg. only operators) is
+    ignored, and the news are listed newest first as usual.
+    """
+    terms = parse_search_terms(search_query)
+    if not terms:
+        return queryset.order_by("-date", "-news_id")
+    fulltext_terms = [
+        term for term in terms if len(term) >= MIN_FULLTEXT_TERM_LENGTH and term not in INNODB_DEFAULT_STOPWORDS
+    ]
+    if connections[queryset.db].vendor == "mysql" and fulltext_terms:
+        news_table = models.StockNewsData._meta.db_table
+        relevance = RawSQL(
+            f"MATCH ({news_table}.title, {news_table}.category) AGAINST (%s IN BOOLEAN MODE)",
+            [" ".join(f"+{term}*" for term in fulltext_terms)],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.annotate(relevance=relevance)
+            .filter(relevance__gt=0)
+            .order_by(F("relevance").desc(), "-date", "-news_id")
+        )
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(category__icontains=term))
+    return queryset.annotate(relevance=Value(1.0, output_field=FloatField())).order_by("-date", "-news_id")
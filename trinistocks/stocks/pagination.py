@@ -0,0 +1,197 @@
+"""
+Keyset (cursor) pagination for the market data apis.
+
+Each page is selected with a WHERE clause on the ordering columns of the last row of the previous page,
+rather than with an OFFSET, so every page costs the same single index range scan no matter how deep into
+the history it is, and no more than one page of rows is ever loaded into memory.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import F, Model, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# the number of rows per page if none is requested, and the most that can be requested
+DEFAULT_PAGE_SIZE = getattr(settings, "API_PAGE_SIZE", 1000)
+MAX_PAGE_SIZE = getattr(settings, "API_MAX_PAGE_SIZE", 5000)
+
+
+def keyset_order_by(ordering: Sequence[str]) -> List:
+    """Get the order_by expressions for a keyset ordering, with nulls as the smallest values"""
+    order_by_expressions = []
+    for field in ordering:
+        if field.startswith("-"):
+            order_by_expressions.append(F(field[1:]).desc(nulls_last=True))
+        else:
+            order_by_expressions.append(F(field).asc(nulls_first=True))
+    return order_by_expressions
+
+
+def keyset_filter(ordering: Sequence[str], cursor: Sequence) -> Q:
+    """
+    Build the filter for the rows after the cursor (the values of the ordering fields of the last row seen),
+    which is (a after x) OR (a = x AND b after y) OR (a = x AND b = y AND c after z) ...
+    """
+    rows_after_cursor = Q()
+    equal_so_far = Q()
+    for field, value in zip(ordering, cursor):
+        descending = field.startswith("-")
+        field_name = field.lstrip("-")
+        if value is None:
+            # nulls are the smallest values, so nothing comes after them when descending
+            after = None if descending else Q(**{f"{field_name}__isnull": False})
+            equal = Q(**{f"{field_name}__isnull": True})
+        else:
+            if descending:
+                after = Q(**{f"{field_name}__lt": value}) | Q(**{f"{field_name}__isnull": True})
+            else:
+                after = Q(**{f"{field_name}__gt": value})
+            equal = Q(**{field_name: value})
+        if after is not None:
+            rows_after_cursor |= equal_so_far & after
+        equal_so_far &= equal
+    return rows_after_cursor
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate a queryset by the keyset_ordering of its view, which must be unique for the rows returned.
+    Fields prefixed with a "-" are ordered descending, and nulls are always ordered as the smallest values.
+    Clients page through the results by following the next link, can set the page_size (up to max_page_size),
+    and can skip the total count query with count=false.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    page_size = DEFAULT_PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None) -> Optional[List]:
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if self.get_include_count(request):
+            self.count = queryset.count()
+        queryset = queryset.order_by(*self.get_order_by_expressions())
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(cursor))
+        # fetch one extra row to find out if there is another page after this one
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data) -> Response:
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data["count"] = self.count
+        response_data["next"] = self.get_next_link()
+        response_data["results"] = data
+        return Response(response_data)
+
+    def get_ordering(self, view) -> Tuple[str, ...]:
+        ordering = getattr(view, "keyset_ordering", None)
+        if not ordering:
+            raise AssertionError(f"{type(view).__name__} must set keyset_ordering to use KeysetPagination.")
+        return tuple(ordering)
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_include_count(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, "true").lower() not in ["false", "0", "no"]
+
+    def get_order_by_expressions(self) -> List:
+        return keyset_order_by(self.ordering)
+
+    def get_keyset_filter(self, cursor: List) -> Q:
+        if len(cursor) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return keyset_filter(self.ordering, cursor)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        last_row = self.page[-1]
+        cursor = [self.get_cursor_value(last_row, field.lstrip("-")) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(cursor))
+
+    def get_cursor_value(self, row, field_name: str):
+        if isinstance(row, dict):
+            value = row[field_name]
+        elif isinstance(row, Model):
+            # use the raw value of foreign keys (eg. the symbol) rather than loading the related object
+            value = getattr(row, row._meta.get_field(field_name).attname)
+        else:
+            # named rows from .values_list(named=True)
+            value = getattr(row, field_name)
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        return str(value)
+
+    def encode_cursor(self, cursor: List) -> str:
+        return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request) -> Optional[List]:
+        encoded_cursor = request.query_params.get(self.cursor_query_param)
+        if not encoded_cursor:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded_cursor.encode("ascii")).decode("utf-8"))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, list):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_schema_operation_parameters(self, view) -> List:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value, taken from the next link of the previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Number of results to return per page (at most {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to false to leave out the total count of results.",
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+
+class NewsSearchPagination(PageNumberPagination):
+    """
+    Paginate the results of a news search by page number, since they are ordered by their relevance to the
+    search rather than by a unique key. Only the first few pages of a search are usually read.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,322 @@
+"""
+Time-weighted and money-weighted (XIRR) returns of the portfolios and the simulator portfolios, for each holding
+and for each portfolio overall.
+
+The returns include the dividends received on the shares held on each record date. The transactions of any number
+of portfolios, and the closing prices and dividends of their symbols, are each read in a single query and pivoted
+into arrays of dates by holdings, so that the returns of every holding (and, summed by owner, of every portfolio)
+are calculated together: the time-weighted returns by chain-linking the daily returns, and the money-weighted
+returns with a Newton solver that runs on all of the cash flow arrays at once.
+
+The returns of each owner are cached until they make a transaction, or the stock prices or dividends are updated.
+"""
+
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+
+from . import caching, models, reference_data
+
+DAYS_PER_YEAR = 365.0
+XIRR_MAX_ITERATIONS = 50
+XIRR_BISECTION_ITERATIONS = 200
+XIRR_TOLERANCE = 1e-9
+# the range of annual rates that the solver searches (-99.99% to 100000%)
+XIRR_MIN_RATE = -0.9999
+XIRR_MAX_RATE = 1000.0
+TRANSACTION_COLUMNS = ["owner_id", "symbol", "date", "bought_or_sold", "num_shares", "share_price"]
+NO_RETURNS = {"time_weighted_return": None, "money_weighted_return": None}
+
+
+def _net_present_values(cash_flows: np.ndarray, years: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore", invalid="ignore"):
+        return (cash_flows * (1.0 + rates) ** -years).sum(axis=0)
+
+
+def xirr(cash_flows: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """
+    Solve for the annual rate of return of each column of cash flows (money paid in is negative, and money received
+    is positive), at which the net present value of the column is zero. years holds the time of each cash flow,
+    in years since the first cash flow of its column. Columns without both negative and positive cash flows have
+    no rate of return (nan).
+    """
+    num_series = cash_flows.shape[1]
+    has_rate = (cash_flows < 0).any(axis=0) & (cash_flows > 0).any(axis=0)
+    tolerance = XIRR_TOLERANCE * np.abs(cash_flows).sum(axis=0)
+    rates = np.full(num_series, 0.1)
+    for _ in range(XIRR_MAX_ITERATIONS):
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            discount_factors = (1.0 + rates) ** -years
+            net_present_values = (cash_flows * discount_factors).sum(axis=0)
+            derivatives = (-years * cash_flows * discount_factors).sum(axis=0) / (1.0 + rates)
+            steps = net_present_values / derivatives
+        steps[~np.isfinite(steps)] = 0.0
+        rates = np.clip(rates - steps, XIRR_MIN_RATE, XIRR_MAX_RATE)
+        if (np.abs(steps) < XIRR_TOLERANCE).all():
+            break
+    converged = np.abs(_net_present_values(cash_flows, years, rates)) <= tolerance
+    # Newton's method can overshoot on unusual cash flows, so bisect the columns that it did not solve
+    unsolved = has_rate & ~converged
+    if unsolved.any():
+        rates[unsolved] = _bisect_xirr(cash_flows[:, unsolved], years[:, unsolved])
+    rates[~has_rate] = np.nan
+    return rates
+
+
+def _bisect_xirr(cash_flows: np.ndarray, years: np.ndarray) -> np.ndarray:
+    num_series = cash_flows.shape[1]
+    low_rates = np.full(num_series, XIRR_MIN_RATE)
+    high_rates = np.full(num_series, XIRR_MAX_RATE)
+    low_values = _net_present_values(cash_flows, years, low_rates)
+    high_values = _net_present_values(cash_flows, years, high_rates)
+    bracketed = np.sign(low_values) != np.sign(high_values)
+    for _ in range(XIRR_BISECTION_ITERATIONS):
+        middle_rates = (low_rates + high_rates) / 2.0
+        middle_values = _net_present_values(cash_flows, years, middle_rates)
+        same_sign_as_low = np.sign(middle_values) == np.sign(low_values)
+        low_rates = np.where(same_sign_as_low, middle_rates, low_rates)
+        low_values = np.where(same_sign_as_low, middle_values, low_values)
+        high_rates = np.where(same_sign_as_low, high_rates, middle_rates)
+    return np.where(bracketed, (low_rates + high_rates) / 2.0, np.nan)
+
+
+def time_weighted_returns(values: np.ndarray, flows: np.ndarray, income: np.ndarray) -> np.ndarray:
+    """
+    Chain-link the daily returns of each column of daily values, leaving out the money added to (positive flows)
+    or taken out of (negative flows) each column, and including the income (eg. dividends) that it paid out.
+    Flows are taken to happen at the end of each day, or at the start of the first day that a column has a value.
+    """
+    previous_values = np.vstack([np.zeros((1, values.shape[1])), values[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_growth = np.where(
+            previous_values > 0,
+            (values + income - flows) / previous_values,
+            np.where(flows > 0, (values + income) / flows, 1.0),
+        )
+    daily_growth[~np.isfinite(daily_growth)] = 1.0
+    return daily_growth.prod(axis=0) - 1.0
+
+
+def _years_since_first_flow(dates: pd.DatetimeIndex, flows: np.ndarray) -> np.ndarray:
+    day_numbers = ((dates - dates[0]).days.to_numpy()).astype(float)
+    first_flow_days = day_numbers[np.argmax(flows != 0, axis=0)]
+    return np.clip(day_numbers[:, np.newaxis] - first_flow_days[np.newaxis, :], 0, None) / DAYS_PER_YEAR
+
+
+def _as_percentage(rate: float) -> Optional[float]:
+    if np.isnan(rate):
+        return None
+    # adding 0.0 turns a rounded -0.0 into 0.0
+    return round(float(rate) * 100, 2) + 0.0
+
+
+def _returns(dates: pd.DatetimeIndex, values: np.ndarray, flows: np.ndarray, income: np.ndarray) -> List[Dict]:
+    """Get the time-weighted and money-weighted returns (as percentages) of each column"""
+    twr = time_weighted_returns(values, flows, income)
+    # the cash flows of the investor: money paid in, dividends received, then the value of what is left at the end
+    cash_flows = income - flows
+    cash_flows[-1] += values[-1]
+    mwr = xirr(cash_flows, _years_since_first_flow(dates, flows))
+    return [
+        {
+            "time_weighted_return": _as_percentage(twr_value),
+            "money_weighted_return": _as_percentage(mwr_value),
+        }
+        for twr_value, mwr_value in zip(twr, mwr)
+    ]
+
+
+def calculate_portfolio_analytics(
+    transactions_df: pd.DataFrame,
+    closing_prices_df: pd.DataFrame,
+    dividends_df: pd.DataFrame,
+    valuation_date: date,
+) -> Dict[int, Dict]:
+    """
+    Calculate the returns of every owner's portfolio up to the valuation date, overall and for each symbol held.
+
+    :param transactions_df: the owner_id, symbol, date, bought_or_sold, num_shares and share_price of each transaction
+    :param closing_prices_df: the symbol, date and close_price of the symbols traded
+    :param dividends_df: the symbol, record_date and dividend_amount of the dividends paid on the symbols
+    :return: for each owner, their overall returns and the returns of each of their holdings
+    """
+    transactions_df = transactions_df.assign(date=pd.to_datetime(transactions_df["date"]))
+    transactions_df = transactions_df[transactions_df["date"] <= pd.Timestamp(valuation_date)]
+    if transactions_df.empty:
+        return {}
+    signed_shares = transactions_df["num_shares"] * np.where(transactions_df["bought_or_sold"] == "Bought", 1, -1)
+    transactions_df = transactions_df.assign(
+        signed_shares=signed_shares,
+        cash_invested=signed_shares * pd.to_numeric(transactions_df["share_price"]).astype(float),
+    )
+    # the prices of the transactions stand in for the closing prices on the days that a symbol did not trade
+    closing_prices = (
+        pd.concat(
+            [
+                closing_prices_df[["symbol", "date", "close_price"]],
+                transactions_df[["symbol", "date", "share_price"]].rename(columns={"share_price": "close_price"}),
+            ]
+        )
+        .assign(date=lambda prices_df: pd.to_datetime(prices_df["date"]))
+        .drop_duplicates(subset=["symbol", "date"], keep="first")
+        .assign(close_price=lambda prices_df: pd.to_numeric(prices_df["close_price"]).astype(float))
+        .pivot_table(index="date", columns="symbol", values="close_price", aggfunc="last")
+    )
+    dividends = dividends_df.assign(
+        date=pd.to_datetime(dividends_df["record_date"]),
+        dividend_amount=pd.to_numeric(dividends_df["dividend_amount"]).astype(float),
+    ).pivot_table(index="date", columns="symbol", values="dividend_amount", aggfunc="sum")
+    first_date = transactions_df["date"].min()
+    dates = (
+        pd.DatetimeIndex(transactions_df["date"].unique())
+        .union(closing_prices.index)
+        .union(dividends.index)
+        .union([pd.Timestamp(valuation_date)])
+    )
+    dates = dates[(dates >= first_date) & (dates <= pd.Timestamp(valuation_date))]
+    # arrays of dates by holdings (owner, symbol)
+    positions_df = (
+        transactions_df.pivot_table(
+            index="date", columns=["owner_id", "symbol"], values="signed_shares", aggfunc="sum", fill_value=0
+        )
+        .reindex(dates, fill_value=0)
+        .cumsum()
+    )
+    flows = (
+        transactions_df.pivot_table(
+            index="date", columns=["owner_id", "symbol"], values="cash_invested", aggfunc="sum", fill_value=0
+        )
+        .reindex(index=dates, columns=positions_df.columns, fill_value=0)
+        .to_numpy(dtype=float)
+    )
+    holding_symbols = positions_df.columns.get_level_values("symbol")
+    # carry the last price forward over the days that a symbol did not trade
+    prices = (
+        closing_prices.reindex(closing_prices.index.union(dates))
+        .ffill()
+        .reindex(index=dates, columns=holding_symbols)
+        .to_numpy(dtype=float)
+    )
+    positions = positions_df.to_numpy(dtype=float)
+    values = positions * np.nan_to_num(prices)
+    income = positions * dividends.reindex(index=dates, columns=holding_symbols).fillna(0).to_numpy(dtype=float)
+    holding_returns = _returns(dates, values, flows, income)
+    # sum the holdings of each owner for their overall returns
+    owner_ids = positions_df.columns.get_level_values("owner_id")
+    owners = pd.Index(owner_ids.unique())
+    owner_matrix = (owner_ids.to_numpy()[:, np.newaxis] == owners.to_numpy()[np.newaxis, :]).astype(float)
+    overall_returns = _returns(dates, values @ owner_matrix, flows @ owner_matrix, income @ owner_matrix)
+    analytics = {
+        owner_id: {"overall": owner_returns, "holdings": {}} for owner_id, owner_returns in zip(owners, overall_returns)
+    }
+    for (owner_id, symbol), returns in zip(positions_df.columns, holding_returns):
+        analytics[owner_id]["holdings"][symbol] = returns
+    return analytics
+
+
+def _read_market_data(symbols: List[str], start_date: date):
+    closing_prices_df = pd.DataFrame.from_records(
+        list(
+            models.DailyStockSummary.objects.filter(
+                symbol__in=symbols, date__gte=start_date, close_price__gt=0
+            ).values_list("symbol_id", "date", "close_price")
+        ),
+        columns=["symbol", "date", "close_price"],
+    )
+    dividends_df = pd.DataFrame.from_records(
+        list(
+            models.HistoricalDividendInfo.objects.filter(
+                symbol__in=symbols, record_date__gte=start_date
+            ).values_list("symbol_id", "record_date", "dividend_amount")
+        ),
+        columns=["symbol", "record_date", "dividend_amount"],
+    )
+    return closing_prices_df, dividends_df
+
+
+def _read_portfolio_transactions(user_ids: List[int]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(
+        list(
+            models.PortfolioTransactions.objects.filter(user_id__in=user_ids).values_list(
+                "user_id", "symbol_id", "date", "bought_or_sold", "num_shares", "share_price"
+            )
+        ),
+        columns=TRANSACTION_COLUMNS,
+    )
+
+
+def _read_simulator_transactions(simulator_player_ids: List[int]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(
+        list(
+            models.SimulatorTransactions.objects.filter(simulator_player_id__in=simulator_player_ids).values_list(
+                "simulator_player_id", "symbol_id", "date", "bought_or_sold", "num_shares", "share_price"
+            )
+        ),
+        columns=TRANSACTION_COLUMNS,
+    )
+
+
+def _get_analytics(
+    transactions_table: str, owner_ids: Iterable[int], read_transactions: Callable[[List[int]], pd.DataFrame]
+) -> Dict[int, Dict]:
+    """
+    Get the cached analytics of each owner, and calculate the analytics of all of the owners missing from the cache
+    together
+    """
+    owner_ids = list(dict.fromkeys(owner_ids))
+    owner_version_names = {
+        owner_id: caching.data_version_name(transactions_table, owner=owner_id) for owner_id in owner_ids
+    }
+    market_version_names = [caching.LATEST_STOCK_PRICE, caching.HISTORICAL_DIVIDEND_INFO]
+    data_versions = caching.get_data_versions(market_version_names + list(owner_version_names.values()))
+    market_versions = {name: data_versions[name] for name in market_version_names}
+    cache_keys = {
+        owner_id: caching.build_cache_key(
+            f"analytics:{transactions_table}",
+            {**market_versions, version_name: data_versions[version_name]},
+            owner_id,
+        )
+        for owner_id, version_name in owner_version_names.items()
+    }
+    cached_analytics = cache.get_many(list(cache_keys.values()))
+    analytics = {
+        owner_id: cached_analytics[cache_key]
+        for owner_id, cache_key in cache_keys.items()
+        if cache_key in cached_analytics
+    }
+    missing_owner_ids = [owner_id for owner_id in owner_ids if owner_id not in analytics]
+    if missing_owner_ids:
+        transactions_df = read_transactions(missing_owner_ids)
+        calculated_analytics = {}
+        if not transactions_df.empty:
+            closing_prices_df, dividends_df = _read_market_data(
+                list(transactions_df["symbol"].unique()), transactions_df["date"].min()
+            )
+            calculated_analytics = calculate_portfolio_analytics(
+                transactions_df, closing_prices_df, dividends_df, reference_data.get_latest_trading_date()
+            )
+        for owner_id in missing_owner_ids:
+            analytics[owner_id] = calculated_analytics.get(owner_id, {"overall": dict(NO_RETURNS), "holdings": {}})
+        cache.set_many(
+            {cache_keys[owner_id]: analytics[owner_id] for owner_id in missing_owner_ids}, caching.CACHE_TIMEOUT
+        )
+    return analytics
+
+
+def get_portfolio_analytics(user_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Get the returns of the portfolios of the users, overall and for each symbol, keyed by user id"""
+    return _get_analytics(caching.PORTFOLIO_TRANSACTIONS, user_ids, _read_portfolio_transactions)
+
+
+def get_simulator_analytics(simulator_player_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Get the returns of the simulator portfolios of the players, overall and for each symbol, keyed by player id"""
+    return _get_analytics(caching.SIMULATOR_TRANSACTIONS, simulator_player_ids, _read_simulator_transactions)
+
+
+def get_holding_returns(analytics: Optional[Dict], symbol: str) -> Dict:
+    if not analytics:
+        return NO_RETURNS
+    return analytics["holdings"].get(symbol, NO_RETURNS)
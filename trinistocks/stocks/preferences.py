@@ -0,0 +1,18 @@
+"""
+The preferences (eg. the selected symbol, chart type and dates) that the history pages remember between visits.
+
+Setting a key of a session marks it as modified, even if the value has not changed, which makes the session
+middleware save the session to the database at the end of the request. Preferences are only set when they
+change, so browsing the history pages with the same selections reads the session without writing to it.
+"""
+
+from typing import Any
+
+from django.http import HttpRequest
+
+
+def set_preference(request: HttpRequest, key: str, value: Any):
+    """Store a preference in the session, only if it is different from the value already stored"""
+    if key in request.session and request.session[key] == value:
+        return
+    request.session[key] = value
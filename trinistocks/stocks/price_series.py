@@ -0,0 +1,157 @@
+"""
+Price series for the stock history charts.
+
+All of the columns for a chart are fetched in a single query, and long date ranges are reduced to a bounded
+number of points before being sent to the browser: candlestick charts are aggregated into weekly or monthly bars,
+and line charts are downsampled with the Largest-Triangle-Three-Buckets (LTTB) algorithm, which keeps the shape
+of the series (including its peaks and troughs) while dropping points that would not be visible anyway.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from . import models
+
+# the most points that we send to the browser for a single chart
+DEFAULT_POINT_BUDGET = 500
+# the bar sizes that daily candlesticks can be aggregated into, from the finest to the coarsest
+OHLC_AGGREGATION_INTERVALS = [("weekly", "W-FRI"), ("monthly", "M")]
+
+
+def get_ohlc_series(
+    symbol: str, start_date: date, end_date: date, point_budget: int = DEFAULT_POINT_BUDGET
+) -> Dict:
+    """
+    Get the open, high, low and close prices for a symbol between two dates, ordered by date.
+    If there are more daily bars than the point budget, they are aggregated into the finest of weekly or monthly
+    bars that fits in the budget (or monthly bars, if neither does).
+    """
+    price_records = (
+        models.DailyStockSummary.objects.filter(symbol=symbol, date__gte=start_date, date__lte=end_date)
+        .exclude(close_price__isnull=True)
+        .order_by("date")
+        .values_list("date", "open_price", "high", "low", "close_price")
+    )
+    prices_df = pd.DataFrame.from_records(
+        list(price_records), columns=["date", "open_price", "high", "low", "close_price"]
+    )
+    for column in ["open_price", "high", "low", "close_price"]:
+        prices_df[column] = pd.to_numeric(prices_df[column], errors="coerce").astype(float)
+    # days without any trades only have a close price, so use it for the rest of the bar
+    for column in ["open_price", "high", "low"]:
+        prices_df[column] = prices_df[column].fillna(prices_df["close_price"])
+    interval = "daily"
+    if len(prices_df.index) > point_budget:
+        prices_df["date"] = pd.to_datetime(prices_df["date"])
+        for interval, frequency in OHLC_AGGREGATION_INTERVALS:
+            bars_df = (
+                prices_df.groupby(pd.Grouper(key="date", freq=frequency))
+                .agg(
+                    date=("date", "first"),
+                    open_price=("open_price", "first"),
+                    high=("high", "max"),
+                    low=("low", "min"),
+                    close_price=("close_price", "last"),
+                )
+                .reset_index(drop=True)
+                .dropna(subset=["date"])
+            )
+            if len(bars_df.index) <= point_budget:
+                break
+        prices_df = bars_df
+        prices_df["date"] = prices_df["date"].dt.date
+    return {
+        "interval": interval,
+        "dates": prices_df["date"].tolist(),
+        "open_prices": prices_df["open_price"].tolist(),
+        "highs": prices_df["high"].tolist(),
+        "lows": prices_df["low"].tolist(),
+        "close_prices": prices_df["close_price"].tolist(),
+    }
+
+
+def get_close_price_series(
+    symbol: str, start_date: date, end_date: date, point_budget: int = DEFAULT_POINT_BUDGET
+) -> Dict:
+    """
+    Get the close prices for a symbol between two dates, ordered by date and downsampled with LTTB
+    if there are more of them than the point budget
+    """
+    price_records = (
+        models.DailyStockSummary.objects.filter(symbol=symbol, date__gte=start_date, date__lte=end_date)
+        .exclude(close_price__isnull=True)
+        .order_by("date")
+        .values_list("date", "close_price")
+    )
+    return _downsample_close_prices(
+        [record[0] for record in price_records], [record[1] for record in price_records], point_budget
+    )
+
+
+def get_close_price_series_for_symbols(
+    symbols: List[str], start_date: date, end_date: date, point_budget: int = DEFAULT_POINT_BUDGET
+) -> Dict[str, Dict]:
+    """
+    Get the close prices of each of the symbols between two dates in a single query, each ordered by date
+    and downsampled with LTTB like get_close_price_series
+    """
+    dates_by_symbol = {symbol: [] for symbol in symbols}
+    close_prices_by_symbol = {symbol: [] for symbol in symbols}
+    price_records = (
+        models.DailyStockSummary.objects.filter(symbol__in=symbols, date__gte=start_date, date__lte=end_date)
+        .exclude(close_price__isnull=True)
+        .order_by("symbol", "date")
+        .values_list("symbol", "date", "close_price")
+    )
+    for symbol, record_date, close_price in price_records:
+        dates_by_symbol[symbol].append(record_date)
+        close_prices_by_symbol[symbol].append(close_price)
+    return {
+        symbol: _downsample_close_prices(dates_by_symbol[symbol], close_prices_by_symbol[symbol], point_budget)
+        for symbol in symbols
+    }
+
+
+def _downsample_close_prices(dates: List[date], close_prices: List, point_budget: int) -> Dict:
+    close_prices = np.array([float(close_price) for close_price in close_prices], dtype=float)
+    selected_indices = lttb_indices(
+        np.array([record_date.toordinal() for record_date in dates], dtype=float), close_prices, point_budget
+    )
+    return {
+        "dates": [dates[index] for index in selected_indices],
+        "close_prices": close_prices[selected_indices].tolist(),
+    }
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select the indices of at most threshold points of the series (x, y) using Largest-Triangle-Three-Buckets.
+    The first and last points are always kept, and x must be sorted in ascending order.
+    """
+    num_points = len(x)
+    if threshold >= num_points or threshold < 3:
+        return np.arange(num_points)
+    selected = np.zeros(threshold, dtype=int)
+    # split the points between the first and last into threshold - 2 buckets
+    bucket_edges = np.linspace(1, num_points - 1, threshold - 1).astype(int)
+    previous_index = 0
+    for bucket in range(threshold - 2):
+        bucket_start, bucket_end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        # the third point of the triangle is the average of the next bucket (or the last point)
+        if bucket < threshold - 3:
+            next_start, next_end = bucket_edges[bucket + 1], bucket_edges[bucket + 2]
+            average_x, average_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            average_x, average_y = x[-1], y[-1]
+        # keep the point in this bucket that forms the largest triangle with the previous selected point
+        triangle_areas = np.abs(
+            (x[previous_index] - average_x) * (y[bucket_start:bucket_end] - y[previous_index])
+            - (x[previous_index] - x[bucket_start:bucket_end]) * (average_y - y[previous_index])
+        )
+        previous_index = bucket_start + int(np.argmax(triangle_areas))
+        selected[bucket + 1] = previous_index
+    selected[-1] = num_points - 1
+    return selected
@@ -0,0 +1,91 @@
+"""
+Process level caching of the reference data that almost every page needs.
+
+The listed equities (for the symbol dropdowns and filters) and the latest trading date (for the redirects and
+the navbar) change at most a few times a day, but were queried on every request. They are now kept in memory
+by each process, and only checked against their data version (see caching.py) once every
+REFERENCE_DATA_CHECK_INTERVAL seconds, so most requests do not query them at all, and a change made by the
+scrapers is picked up by every process within that interval.
+"""
+
+import time
+from datetime import date
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from . import caching, models
+
+# how long (in seconds) reference data is used for before its data version is checked again
+REFERENCE_DATA_CHECK_INTERVAL = 60
+
+LISTED_EQUITIES = "listed_equities"
+LATEST_TRADING_DATE = "latest_trading_date"
+
+
+class _ReferenceDataEntry(NamedTuple):
+    data_version: int
+    checked_at: float
+    value: object
+
+
+_reference_data: Dict[str, _ReferenceDataEntry] = {}
+
+
+def _get_reference_data(name: str, data_version_name: str, load: Callable):
+    """
+    Get the cached value of some reference data, checking its data version if it has not been checked recently,
+    and loading it again if that version has changed
+    """
+    entry = _reference_data.get(name)
+    now = time.monotonic()
+    if entry is not None and now - entry.checked_at < REFERENCE_DATA_CHECK_INTERVAL:
+        return entry.value
+    data_version = caching.get_data_versions([data_version_name])[data_version_name]
+    if entry is not None and entry.data_version == data_version:
+        value = entry.value
+    else:
+        value = load()
+    _reference_data[name] = _ReferenceDataEntry(data_version, now, value)
+    return value
+
+
+def clear_reference_data() -> None:
+    """Drop the reference data cached by this process, so that it is loaded again when it is next used"""
+    _reference_data.clear()
+
+
+def _load_listed_equities() -> Dict[str, "models.ListedEquities"]:
+    return {
+        listed_equity.symbol: listed_equity
+        for listed_equity in models.ListedEquities.objects.all().order_by("symbol")
+    }
+
+
+def _get_listed_equities_by_symbol() -> Dict[str, "models.ListedEquities"]:
+    return _get_reference_data(LISTED_EQUITIES, caching.LISTED_EQUITIES, _load_listed_equities)
+
+
+def get_listed_equities() -> List["models.ListedEquities"]:
+    """Get all of the listed equities, ordered by symbol"""
+    return list(_get_listed_equities_by_symbol().values())
+
+
+def get_listed_equity(symbol: str) -> "models.ListedEquities":
+    """Get the listed equity for a symbol, raising ListedEquities.DoesNotExist if it is not listed"""
+    try:
+        return _get_listed_equities_by_symbol()[symbol]
+    except KeyError:
+        raise models.ListedEquities.DoesNotExist(f"No listed equity was found for the symbol {symbol}.")
+
+
+def get_listed_symbol_choices() -> List[Tuple[str, str]]:
+    """Get the choices for a field that selects a listed symbol"""
+    return [(symbol, symbol) for symbol in _get_listed_equities_by_symbol()]
+
+
+def _load_latest_trading_date() -> date:
+    return models.DailyStockSummary.objects.latest("date").date
+
+
+def get_latest_trading_date() -> date:
+    """Get the last date that the daily stock summary has data for"""
+    return _get_reference_data(LATEST_TRADING_DATE, caching.DAILY_STOCK_SUMMARY, _load_latest_trading_date)
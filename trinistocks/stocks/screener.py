@@ -0,0 +1,128 @@
+"""
+Screens of the listed stocks, over the stock_screener table.
+
+A screen is a list of conditions joined by AND, eg. "pe<15 AND dividend_yield>4 AND price>sma_200".
+Each condition compares a metric with a number, or with another metric of the same stock, using one of
+<, <=, >, >=, = or !=. The text columns (symbol, security_name and sector) can only be compared with = or !=,
+eg. "sector=Banking" (quote values that contain spaces, eg. sector="Non-Banking Finance").
+Stocks missing a metric that a condition uses never match that condition, except with !=.
+Since every metric is a column of the one stock_screener table, a screen is answered by a single query on it.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+from typing import List, Tuple
+
+from django.db.models import DecimalField, F, PositiveIntegerField, Q, QuerySet
+
+from . import models
+
+# the most conditions that a screen can have
+MAX_SCREEN_CONDITIONS = 20
+# short names for the metrics that are screened on the most
+SCREENER_FIELD_ALIASES = {
+    "price": "last_close_price",
+    "pe": "price_to_earnings_ratio",
+    "pb": "price_to_book_ratio",
+    "eps": "EPS",
+    "eps_growth": "EPS_growth_rate",
+    "roe": "RoE",
+    "roic": "RoIC",
+    "peg": "PEG",
+    "payout_ratio": "dividend_payout_ratio",
+    "name": "security_name",
+}
+SCREENER_TEXT_FIELDS = ("symbol", "security_name", "sector")
+SCREENER_NUMERIC_FIELDS = tuple(
+    field.name
+    for field in models.StockScreener._meta.concrete_fields
+    if isinstance(field, (DecimalField, PositiveIntegerField))
+)
+# the model fields, looked up by their lowercase names, so that metrics are matched regardless of case
+_SCREENER_FIELDS = {
+    field_name.lower(): field_name for field_name in SCREENER_TEXT_FIELDS + SCREENER_NUMERIC_FIELDS
+}
+_SCREENER_FIELDS.update(SCREENER_FIELD_ALIASES)
+# the lookup used for each comparison, except != which excludes the matches of =
+_COMPARISON_LOOKUPS = {"<": "lt", "<=": "lte", ">": "gt", ">=": "gte", "=": "exact", "!=": "exact"}
+_CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|<|>|=)\s*(.+?)\s*$")
+# split on the ANDs that are not inside quotes
+_AND_PATTERN = re.compile(r"\s+AND\s+(?=(?:[^\"']*[\"'][^\"']*[\"'])*[^\"']*$)", re.IGNORECASE)
+
+
+def resolve_screener_field(name: str) -> str:
+    """Get the model field of a metric name or its alias"""
+    field_name = _SCREENER_FIELDS.get(name.lower())
+    if field_name is None:
+        raise ValueError(f"{name} is not a metric that can be screened on.")
+    if field_name == "symbol":
+        # compare the symbols themselves, rather than the listed equities that they refer to
+        return "symbol_id"
+    return field_name
+
+
+def _parse_value(field_name: str, value: str):
+    """Parse the right side of a condition into a number, a quoted text or a reference to another metric"""
+    if value[0] in "\"'":
+        if len(value) < 2 or value[-1] != value[0]:
+            raise ValueError(f"{value} is missing its closing quote.")
+        value = value[1:-1]
+        if field_name in SCREENER_NUMERIC_FIELDS:
+            raise ValueError(f"{field_name} can only be compared with a number or another metric.")
+        return value
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is not None and number.is_finite():
+        if field_name not in SCREENER_NUMERIC_FIELDS:
+            raise ValueError(f"{field_name} can only be compared with text.")
+        return number
+    if field_name not in SCREENER_NUMERIC_FIELDS:
+        # unquoted text, eg. sector=Banking
+        return value
+    other_field_name = resolve_screener_field(value)
+    if other_field_name not in SCREENER_NUMERIC_FIELDS:
+        raise ValueError(f"{field_name} can not be compared with {value}.")
+    return F(other_field_name)
+
+
+def parse_screen(screen: str) -> Q:
+    """Parse a screen into the filter that selects the stocks that match all of its conditions"""
+    conditions = [condition for condition in _AND_PATTERN.split(screen.strip()) if condition.strip()]
+    if len(conditions) > MAX_SCREEN_CONDITIONS:
+        raise ValueError(f"Screens can have at most {MAX_SCREEN_CONDITIONS} conditions.")
+    screen_filter = Q()
+    for condition in conditions:
+        condition_match = _CONDITION_PATTERN.match(condition)
+        if condition_match is None:
+            raise ValueError(f"{condition.strip()} is not a valid condition. Conditions look like pe<15.")
+        name, comparison, value = condition_match.groups()
+        field_name = resolve_screener_field(name)
+        if field_name not in SCREENER_NUMERIC_FIELDS and comparison not in ("=", "!="):
+            raise ValueError(f"{name} can only be compared with = or !=.")
+        lookup = Q(**{f"{field_name}__{_COMPARISON_LOOKUPS[comparison]}": _parse_value(field_name, value)})
+        screen_filter &= ~lookup if comparison == "!=" else lookup
+    return screen_filter
+
+
+def parse_screen_ordering(ordering: str) -> Tuple:
+    """
+    Parse a comma separated list of metrics to sort by (each prefixed with - to sort in descending order)
+    into the order_by arguments, with stocks missing a metric sorted last either way
+    """
+    order_by: List = []
+    for ordering_field in (field.strip() for field in ordering.split(",")):
+        if not ordering_field:
+            continue
+        descending = ordering_field.startswith("-")
+        field = F(resolve_screener_field(ordering_field.lstrip("-")))
+        order_by.append(field.desc(nulls_last=True) if descending else field.asc(nulls_last=True))
+    # keep the order of stocks with equal metrics stable
+    order_by.append("symbol")
+    return tuple(order_by)
+
+
+def screen_stocks(queryset: QuerySet, screen: str = "", ordering: str = "") -> QuerySet:
+    """Filter the stock screener queryset with a screen, and sort it (by symbol, unless an ordering is given)"""
+    return queryset.filter(parse_screen(screen)).order_by(*parse_screen_ordering(ordering))
@@ -3,14 +3,16 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from . import portfolio_analytics
 from .models import (LANGUAGE_CHOICES, STYLE_CHOICES, DailyStockSummary,
                      FundamentalAnalysisSummary, HistoricalDividendInfo,
                      HistoricalDividendYield, HistoricalIndicesInfo,
+                     LatestFundamentalAnalysisSummary, LatestStockPrice,
                      ListedEquities, MonitoredStocks, PortfolioSectors,
                      PortfolioSummary, PortfolioTransactions, SimulatorGames,
                      SimulatorPlayers, SimulatorPortfolios,
                      SimulatorPortfolioSectors, SimulatorTransactions,
-                     StockNewsData, SummarizedDividendYield,
+                     StockNewsData, StockScreener, SummarizedDividendYield,
                      TechnicalAnalysisSummary, User)
 
 
@@ -73,6 +75,41 @@ class TechnicalAnalysisSerializer(serializers.ModelSerializer):
         )
 
 
+class StockScreenerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockScreener
+        fields = (
+            "symbol",
+            "security_name",
+            "sector",
+            "last_close_price",
+            "sma_20",
+            "sma_200",
+            "beta",
+            "adtv",
+            "high_52w",
+            "low_52w",
+            "wtd",
+            "mtd",
+            "ytd",
+            "report_date",
+            "RoE",
+            "EPS",
+            "EPS_growth_rate",
+            "PEG",
+            "RoIC",
+            "price_to_earnings_ratio",
+            "price_to_book_ratio",
+            "dividend_yield",
+            "dividend_payout_ratio",
+            "current_ratio",
+            "ttm_yield",
+            "three_year_yield",
+            "five_year_yield",
+            "ten_year_yield",
+        )
+
+
 class FundamentalAnalysisSerializer(serializers.ModelSerializer):
     symbol = serializers.CharField(read_only=True, source="symbol.symbol")
     sector = serializers.CharField(read_only=True, source="symbol.sector")
@@ -96,6 +133,11 @@ class FundamentalAnalysisSerializer(serializers.ModelSerializer):
         )
 
 
+class LatestFundamentalAnalysisSerializer(FundamentalAnalysisSerializer):
+    class Meta(FundamentalAnalysisSerializer.Meta):
+        model = LatestFundamentalAnalysisSummary
+
+
 class StockPriceSerializer(serializers.ModelSerializer):
     class Meta:
         model = DailyStockSummary
@@ -111,7 +153,7 @@ class StockPriceSerializer(serializers.ModelSerializer):
 
 class LatestStockPriceSerializer(serializers.ModelSerializer):
     class Meta:
-        model = DailyStockSummary
+        model = LatestStockPrice
         fields = (
             "symbol",
             "date",
@@ -178,7 +220,27 @@ class OutstandingTradesSerializer(serializers.ModelSerializer):
         )
 
 
-class PortfolioSummarySerializer(serializers.ModelSerializer):
+class HoldingReturnsSerializerMixin(serializers.Serializer):
+    """
+    Add the time-weighted and money-weighted returns (%) of each holding,
+    from the portfolio analytics that the view passes in the "analytics" context
+    """
+
+    time_weighted_return = serializers.SerializerMethodField()
+    money_weighted_return = serializers.SerializerMethodField()
+
+    def get_time_weighted_return(self, holding):
+        return portfolio_analytics.get_holding_returns(
+            self.context.get("analytics"), holding.symbol_id
+        )["time_weighted_return"]
+
+    def get_money_weighted_return(self, holding):
+        return portfolio_analytics.get_holding_returns(
+            self.context.get("analytics"), holding.symbol_id
+        )["money_weighted_return"]
+
+
+class PortfolioSummarySerializer(HoldingReturnsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = PortfolioSummary
         fields = (
@@ -190,6 +252,8 @@ class PortfolioSummarySerializer(serializers.ModelSerializer):
             "market_value",
             "total_gain_loss",
             "gain_loss_percent",
+            "time_weighted_return",
+            "money_weighted_return",
         )
 
 
@@ -322,6 +386,8 @@ class SimulatorGamesSerializer(serializers.ModelSerializer):
 
 class SimulatorPlayersSerializer(serializers.ModelSerializer):
     username = serializers.CharField(read_only=True, source="user.username")
+    time_weighted_return = serializers.SerializerMethodField()
+    money_weighted_return = serializers.SerializerMethodField()
 
     class Meta:
         model = SimulatorPlayers
@@ -335,8 +401,22 @@ class SimulatorPlayersSerializer(serializers.ModelSerializer):
             "overall_gain_loss_percent",
             "current_portfolio_value",
             "current_position",
+            "time_weighted_return",
+            "money_weighted_return",
         )
 
+    def _get_overall_returns(self, player):
+        player_analytics = self.context.get("players_analytics", {}).get(player.simulator_player_id)
+        if player_analytics is None:
+            return portfolio_analytics.NO_RETURNS
+        return player_analytics["overall"]
+
+    def get_time_weighted_return(self, player):
+        return self._get_overall_returns(player)["time_weighted_return"]
+
+    def get_money_weighted_return(self, player):
+        return self._get_overall_returns(player)["money_weighted_return"]
+
 
 class SimulatorTransactionsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -351,7 +431,7 @@ class SimulatorTransactionsSerializer(serializers.ModelSerializer):
         )
 
 
-class SimulatorPortfolioSerializer(serializers.ModelSerializer):
+class SimulatorPortfolioSerializer(HoldingReturnsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = SimulatorPortfolios
         fields = (
@@ -364,6 +444,8 @@ class SimulatorPortfolioSerializer(serializers.ModelSerializer):
             "market_value",
             "total_gain_loss",
             "gain_loss_percent",
+            "time_weighted_return",
+            "money_weighted_return",
         )
 
 
@@ -386,4 +468,6 @@ class MonitoredStocksSerializer(serializers.ModelSerializer):
         fields = (
             "user",
             "symbol",
+            "alert_price_above",
+            "alert_price_below",
         )
\ No newline at end of file
@@ -1,10 +1,16 @@
 import logging
 
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
 from django.core.mail import send_mail
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
+from rest_framework.authtoken.models import Token
+
+from stocks import authentication, caching, models
 
 LOGGER = logging.getLogger("root")
 
@@ -43,3 +49,67 @@ def password_reset_token_created(
         fail_silently=False,
     )
     LOGGER.debug(f"Sent mail to {reset_password_token.user.email} successfully.")
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, *args, **kwargs):
+    """
+    Drop the cached api tokens of a user whenever they are saved, since their password or active status
+    may have changed
+    """
+    authentication.clear_cached_user_tokens(instance)
+
+
+@receiver(user_logged_out)
+def user_logged_out_clear_tokens(sender, request, user, *args, **kwargs):
+    authentication.clear_cached_user_tokens(user)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, *args, **kwargs):
+    authentication.clear_cached_tokens([instance.key])
+
+
+def _mark_portfolio_values_for_recalculation(user_id, from_date):
+    """Make the updater recalculate the user's daily portfolio values from the date (or an earlier one already marked)"""
+    _, created = models.PortfolioValueRecalculation.objects.get_or_create(
+        user_id=user_id, defaults={"from_date": from_date}
+    )
+    if not created:
+        models.PortfolioValueRecalculation.objects.filter(user_id=user_id, from_date__gt=from_date).update(
+            from_date=from_date
+        )
+
+
+@receiver(pre_save, sender=models.PortfolioTransactions)
+def portfolio_transaction_changing(sender, instance, *args, **kwargs):
+    """Moving a transaction to a later date also changes the daily values between its old and new dates"""
+    if instance.pk is None:
+        return
+    previous_transaction = (
+        models.PortfolioTransactions.objects.filter(pk=instance.pk).values("user_id", "date").first()
+    )
+    if previous_transaction is not None:
+        _mark_portfolio_values_for_recalculation(previous_transaction["user_id"], previous_transaction["date"])
+
+
+@receiver(post_save, sender=models.PortfolioTransactions)
+@receiver(post_delete, sender=models.PortfolioTransactions)
+def portfolio_transaction_changed(sender, instance, *args, **kwargs):
+    """
+    Bump the version of the user's transactions, which drops their cached portfolio returns,
+    and mark their daily portfolio values for recalculation from the date of the transaction
+    """
+    caching.bump_data_versions(
+        [caching.data_version_name(caching.PORTFOLIO_TRANSACTIONS, owner=instance.user_id)]
+    )
+    _mark_portfolio_values_for_recalculation(instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=models.SimulatorTransactions)
+@receiver(post_delete, sender=models.SimulatorTransactions)
+def simulator_transaction_changed(sender, instance, *args, **kwargs):
+    caching.bump_data_versions(
+        [caching.data_version_name(caching.SIMULATOR_TRANSACTIONS, owner=instance.simulator_player_id)]
+    )
@@ -0,0 +1,155 @@
+"""
+Streaming exports for the django-tables2 tables.
+
+The django-tables2 ExportMixin renders the whole table into a tablib dataset in memory before it sends anything.
+StreamingExportMixin instead reads the table's (filtered and ordered) queryset with .iterator() and sends each
+row as soon as it has been formatted, with the same render_* methods that format the table on the page.
+XLSX exports need openpyxl, and are refused when it is not installed.
+"""
+
+import csv
+import json
+import tempfile
+from typing import Iterable, Iterator, List
+
+from django.db.models import ForeignKey, QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.encoding import force_str
+from django_tables2.export.views import ExportMixin
+from django_tables2.rows import BoundRow
+
+# the number of rows read from the database, and written to the response, at a time
+EXPORT_CHUNK_SIZE = 2000
+STREAMING_EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class _Echo:
+    """A file-like object that returns what is written to it, so that csv.writer can format rows one at a time"""
+
+    def write(self, value):
+        return value
+
+
+def _exported_columns(table, exclude_columns: Iterable[str]) -> List:
+    """Get the columns to export, the same way that Table.as_values does"""
+    return [
+        column
+        for column in table.columns.iterall()
+        if not (column.column.exclude_from_export or column.name in exclude_columns)
+    ]
+
+
+def _select_related_for_columns(queryset: QuerySet, columns: List) -> QuerySet:
+    """Join the related tables that columns read from (eg. symbol__currency), instead of a query for every row"""
+    related_fields = set()
+    for column in columns:
+        accessor_parts = str(column.accessor).split("__")
+        if len(accessor_parts) < 2:
+            continue
+        try:
+            model_field = queryset.model._meta.get_field(accessor_parts[0])
+        except Exception:
+            continue
+        if isinstance(model_field, ForeignKey):
+            related_fields.add(accessor_parts[0])
+    if related_fields:
+        queryset = queryset.select_related(*sorted(related_fields))
+    return queryset
+
+
+def iterate_table_values(table, exclude_columns: Iterable[str] = ()) -> Iterator[List]:
+    """
+    Yield the header of the table and then the value of each cell of each of its rows (formatted with the
+    table's render_* and value_* methods, like Table.as_values), reading the rows with .iterator()
+    """
+    columns = _exported_columns(table, exclude_columns)
+    yield [force_str(column.header, strings_only=True) for column in columns]
+    queryset = _select_related_for_columns(table.data.data, columns)
+    for record in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        bound_row = BoundRow(record, table)
+        yield [force_str(bound_row.get_cell_value(column.name), strings_only=True) for column in columns]
+
+
+def stream_csv(table_values: Iterator[List]) -> Iterator[str]:
+    csv_writer = csv.writer(_Echo())
+    lines = []
+    for row in table_values:
+        lines.append(csv_writer.writerow(row))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
+
+
+def stream_json(table_values: Iterator[List]) -> Iterator[str]:
+    """Stream the rows as a list of objects keyed by the column headers, like the tablib json export"""
+    headers = next(table_values)
+    separator = ""
+    yield "["
+    for row in table_values:
+        yield separator + json.dumps(dict(zip(headers, row)), default=str)
+        separator = ", "
+    yield "]"
+
+
+def is_xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_xlsx(table_values: Iterator[List], sheet_title: str = "Sheet 1") -> Iterator[bytes]:
+    """
+    Write the rows to a write only workbook, which keeps them in a temporary file rather than in memory,
+    then stream the finished file. An xlsx file is a zip archive, so it can only be sent once it is complete.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_title)
+    for row in table_values:
+        worksheet.append(row)
+    with tempfile.TemporaryFile() as xlsx_file:
+        workbook.save(xlsx_file)
+        xlsx_file.seek(0)
+        while True:
+            data = xlsx_file.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+
+class StreamingExportMixin(ExportMixin):
+    """
+    An ExportMixin that streams csv, json and xlsx exports of querysets instead of building them in memory.
+    Any other format, or a table that is not backed by a queryset, is exported by the ExportMixin as before.
+    """
+
+    def create_export(self, export_format):
+        if export_format == "xlsx" and not is_xlsx_available():
+            return HttpResponse(
+                "Error: xlsx exports are not available on this server.", content_type="text/plain", status=406
+            )
+        table = self.get_table(**self.get_table_kwargs())
+        if export_format not in STREAMING_EXPORT_CONTENT_TYPES or not isinstance(
+            getattr(table.data, "data", None), QuerySet
+        ):
+            return super().create_export(export_format)
+        table_values = iterate_table_values(table, self.exclude_columns)
+        if export_format == "csv":
+            streamed_content = stream_csv(table_values)
+        elif export_format == "json":
+            streamed_content = stream_json(table_values)
+        else:
+            streamed_content = stream_xlsx(table_values)
+        response = StreamingHttpResponse(
+            streamed_content, content_type=STREAMING_EXPORT_CONTENT_TYPES[export_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="{self.get_export_filename(export_format)}"'
+        return response
@@ -10,7 +10,7 @@ from django import template
 from django.conf import settings
 from django.contrib.sessions.backends.db import SessionStore
 
-from .. import models
+from .. import reference_data
 
 register = template.Library()
 logger = logging.getLogger('root')
@@ -18,8 +18,7 @@ logger = logging.getLogger('root')
 
 @register.simple_tag
 def get_latest_date_dailytradingsummary():
-    latest_date = models.DailyStockSummary.objects.latest(
-        'date').date.strftime("%Y-%m-%d")
+    latest_date = reference_data.get_latest_trading_date().strftime("%Y-%m-%d")
     return latest_date
 
 
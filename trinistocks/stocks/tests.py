@@ -1,3 +1,188 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.test import Client, SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import correlations, models, screener
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Check that api requests only look up their token when it is not cached"""
+
+    api_url = "/api/simulatorgames"
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="tokenuser", email="tokenuser@trinistocks.com", password="old-password"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def test_token_is_only_queried_once(self):
+        # the token and its user, then the simulator games
+        with self.assertNumQueries(2):
+            response = self.client.get(self.api_url)
+        self.assertEqual(response.status_code, 200)
+        # only the simulator games
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                response = self.client.get(self.api_url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        self.assertEqual(self.client.get(self.api_url).status_code, 401)
+
+    def test_password_change_clears_cached_token(self):
+        self.client.get(self.api_url)
+        response = self.client.put(
+            "/api/passwordchange",
+            {"old_password": "old-password", "new_password": "new-password"},
+            format="json",
+        )
+        self.assertEqual(response.data["code"], 200)
+        with self.assertNumQueries(2):
+            self.client.get(self.api_url)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(self.api_url)
+        self.assertEqual(self.client.delete("/api/deleteuser").status_code, 200)
+        self.assertEqual(self.client.get(self.api_url).status_code, 401)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.api_url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.api_url).status_code, 401)
+
+    def test_logout_clears_cached_token(self):
+        web_client = Client()
+        web_client.force_login(self.user)
+        self.client.get(self.api_url)
+        web_client.logout()
+        with self.assertNumQueries(2):
+            self.client.get(self.api_url)
+
+
+class ScreenParsingTests(SimpleTestCase):
+    """Check that screens are parsed into the filters and orderings of the stock screener"""
+
+    def test_conditions_are_joined_with_and(self):
+        self.assertEqual(
+            screener.parse_screen("pe<15 AND dividend_yield>4 and price>sma_200"),
+            Q(price_to_earnings_ratio__lt=Decimal("15"))
+            & Q(dividend_yield__gt=Decimal("4"))
+            & Q(last_close_price__gt=F("sma_200")),
+        )
+
+    def test_text_conditions(self):
+        self.assertEqual(
+            screener.parse_screen('sector="Non-Banking Finance" AND symbol!=AGL'),
+            Q(sector__exact="Non-Banking Finance") & ~Q(symbol_id__exact="AGL"),
+        )
+
+    def test_empty_screen_matches_everything(self):
+        self.assertEqual(screener.parse_screen("  "), Q())
+
+    def test_invalid_screens_are_rejected(self):
+        for screen in ["pe<abc", "unknown>1", "pe 15", "sector>1", "pe<'15'", "price>sector"]:
+            with self.subTest(screen=screen), self.assertRaises(ValueError):
+                screener.parse_screen(screen)
+
+    def test_ordering(self):
+        self.assertEqual(
+            screener.parse_screen_ordering("-pe, price"),
+            (
+                F("price_to_earnings_ratio").desc(nulls_last=True),
+                F("last_close_price").asc(nulls_last=True),
+                "symbol",
+            ),
+        )
+        with self.assertRaises(ValueError):
+            screener.parse_screen_ordering("-unknown")
+
+
+class ScreenStocksTests(TestCase):
+    """Check that screens select and sort the rows of the stock screener table"""
+
+    @classmethod
+    def setUpClass(cls):
+        # listed_equities is not managed by django, so the test database does not have it
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(models.ListedEquities)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(models.ListedEquities)
+
+    @classmethod
+    def setUpTestData(cls):
+        for symbol, eps_growth_rate, peg in [
+            ("AGL", Decimal("25.00"), Decimal("0.600")),
+            ("NCBFG", Decimal("-10.00"), Decimal("-1.500")),
+            ("WCO", Decimal("5.00"), Decimal("4.200")),
+            ("GKC", None, None),
+        ]:
+            listed_equity = models.ListedEquities.objects.create(
+                symbol=symbol, security_name=f"{symbol} Limited", currency="TTD"
+            )
+            models.StockScreener.objects.create(
+                symbol=listed_equity,
+                security_name=listed_equity.security_name,
+                EPS_growth_rate=eps_growth_rate,
+                PEG=peg,
+            )
+
+    def _screened_symbols(self, screen, ordering=""):
+        return list(
+            screener.screen_stocks(models.StockScreener.objects.all(), screen, ordering).values_list(
+                "symbol_id", flat=True
+            )
+        )
+
+    def test_screen_on_peg(self):
+        self.assertEqual(self._screened_symbols("peg>0 AND peg<1 AND eps_growth>0"), ["AGL"])
+
+    def test_stocks_missing_a_metric_are_sorted_last(self):
+        self.assertEqual(self._screened_symbols("", "-peg"), ["WCO", "AGL", "NCBFG", "GKC"])
+
+
+class PairwiseCompleteStatisticsTests(SimpleTestCase):
+    """Check that the correlations and covariances match pandas' pairwise-complete calculations"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.returns = rng.normal(scale=0.01, size=(250, 6))
+        # make the first two columns correlated, then knock out some of the returns
+        self.returns[:, 1] += self.returns[:, 0]
+        self.returns[rng.random(self.returns.shape) < 0.3] = np.nan
+        # a column with too few returns to compare, and one with none at all
+        self.returns[:240, 4] = np.nan
+        self.returns[:, 5] = np.nan
+
+    def test_matches_pandas(self):
+        statistics = correlations.pairwise_complete_statistics(self.returns)
+        returns_df = pd.DataFrame(self.returns)
+        np.testing.assert_allclose(
+            statistics["correlation"],
+            returns_df.corr(min_periods=correlations.MIN_OVERLAPPING_RETURNS).to_numpy(),
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            statistics["covariance"],
+            returns_df.cov(min_periods=correlations.MIN_OVERLAPPING_RETURNS).to_numpy(),
+            atol=1e-12,
+        )
+        self.assertEqual(statistics["observations"][0, 5], 0)
+        self.assertTrue(np.isnan(statistics["correlation"][4]).all())
@@ -0,0 +1,93 @@
+"""
+Time series for the market index and outstanding trades history charts.
+
+Only the date and the one column being charted are read, in a single query, and long date ranges are resampled
+into weekly or monthly points so that the chart stays within a bounded number of points. Each column is resampled
+the way that suits it: levels (eg. an index value or a bid price) take the last value of each period,
+flows (eg. the value traded) are summed over the period, and outstanding volumes are averaged.
+"""
+
+from typing import Dict
+
+import pandas as pd
+from django.db.models import QuerySet
+
+from .price_series import DEFAULT_POINT_BUDGET, OHLC_AGGREGATION_INTERVALS
+
+AGGREGATION_LAST = "last"
+AGGREGATION_MEAN = "mean"
+AGGREGATION_SUM = "sum"
+
+INTERVAL_AUTO = "auto"
+INTERVAL_DAILY = "daily"
+# the intervals that daily values can be resampled into, from the finest to the coarsest
+RESAMPLE_INTERVALS = dict(OHLC_AGGREGATION_INTERVALS)
+CHART_INTERVALS = [INTERVAL_AUTO, INTERVAL_DAILY] + list(RESAMPLE_INTERVALS)
+
+# how each of the columns that can be charted is resampled
+MARKET_INDEX_COLUMN_AGGREGATIONS = {
+    "index_value": AGGREGATION_LAST,
+    "index_change": AGGREGATION_SUM,
+    "change_percent": AGGREGATION_MEAN,
+    "volume_traded": AGGREGATION_SUM,
+    "value_traded": AGGREGATION_SUM,
+    "num_trades": AGGREGATION_SUM,
+}
+OUTSTANDING_TRADES_COLUMN_AGGREGATIONS = {
+    "os_bid": AGGREGATION_LAST,
+    "os_bid_vol": AGGREGATION_MEAN,
+    "os_offer": AGGREGATION_LAST,
+    "os_offer_vol": AGGREGATION_MEAN,
+}
+
+
+def get_time_series(
+    queryset: QuerySet,
+    column: str,
+    column_aggregations: Dict[str, str],
+    interval: str = INTERVAL_AUTO,
+    point_budget: int = DEFAULT_POINT_BUDGET,
+) -> Dict:
+    """
+    Get the dates and values of a column of the (filtered) queryset, ordered by date.
+    The values are resampled into the interval requested, or with the auto interval, into the finest of
+    daily, weekly or monthly values that fits in the point budget (or monthly values, if none of them do).
+    Resampled values are dated on the last day in each period that has a value.
+    """
+    if column not in column_aggregations:
+        raise ValueError(f"{column} is not a column that can be charted.")
+    if interval not in CHART_INTERVALS:
+        raise ValueError(f"{interval} is not a valid chart interval. Please use one of {', '.join(CHART_INTERVALS)}.")
+    series_df = pd.DataFrame.from_records(
+        list(queryset.order_by("date").values_list("date", column)), columns=["date", "value"]
+    )
+    series_df["value"] = pd.to_numeric(series_df["value"], errors="coerce").astype(float)
+    if interval == INTERVAL_AUTO:
+        interval = INTERVAL_DAILY
+        if len(series_df.index) > point_budget:
+            for interval in RESAMPLE_INTERVALS:
+                resampled_df = _resample(series_df, RESAMPLE_INTERVALS[interval], column_aggregations[column])
+                if len(resampled_df.index) <= point_budget:
+                    break
+            series_df = resampled_df
+    elif interval != INTERVAL_DAILY:
+        series_df = _resample(series_df, RESAMPLE_INTERVALS[interval], column_aggregations[column])
+    return {
+        "interval": interval,
+        "dates": series_df["date"].tolist(),
+        # missing values are sent as nulls, since NaN is not valid JSON
+        "values": [None if pd.isna(value) else value for value in series_df["value"].tolist()],
+    }
+
+
+def _resample(series_df: pd.DataFrame, frequency: str, aggregation: str) -> pd.DataFrame:
+    dated_df = series_df.assign(period_date=pd.to_datetime(series_df["date"]))
+    resampled_df = (
+        dated_df.groupby(pd.Grouper(key="period_date", freq=frequency))
+        .agg(date=("date", "last"), value=("value", aggregation), num_values=("value", "count"))
+        .reset_index(drop=True)
+        .dropna(subset=["date"])
+    )
+    # a period without any values has no value, rather than a sum of 0
+    resampled_df.loc[resampled_df["num_values"] == 0, "value"] = None
+    return resampled_df[["date", "value"]]
@@ -114,6 +114,8 @@ urlpatterns = [
                   path("api/listedstocks", views.ListedStocksApiView.as_view()),
                   path("api/technicalanalysis", views.TechnicalAnalysisApiView.as_view()),
                   path("api/fundamentalanalysis", views.FundamentalAnalysisApiView.as_view()),
+                  path("api/stockscreener", views.StockScreenerApiView.as_view()),
+                  path("api/fundamentalcomparison", views.FundamentalComparisonApiView.as_view()),
                   path("api/stockprices", views.StockPriceApiView.as_view()),
                   path("api/lateststockprices", views.LatestStockPriceApiView.as_view()),
                   path("api/dividendpayments", views.DividendPaymentsApiView.as_view()),
@@ -121,8 +123,12 @@ urlpatterns = [
                   path("api/summarizeddividendyields", views.SummarizedDividendYieldsApiView.as_view()),
                   path("api/marketindices", views.MarketIndicesApiView.as_view()),
                   path("api/outstandingtrades", views.OutstandingTradesApiView.as_view()),
+                  path("api/marketoverview", views.MarketOverviewApiView.as_view()),
+                  path("api/correlations", views.CorrelationMatrixApiView.as_view()),
+                  path("api/export/<str:dataset_name>", views.BulkExportApiView.as_view()),
                   path("api/portfoliosummary", views.PortfolioSummaryApiView.as_view()),
                   path("api/portfoliosectors", views.PortfolioSectorsApiView.as_view()),
+                  path("api/portfoliovaluehistory", views.PortfolioValueHistoryApiView.as_view()),
                   path("api/portfoliotransaction", views.PortfolioTransactionPutApiView.as_view()),
                   path("api/portfoliotransactions", views.PortfolioTransactionsGetApiView.as_view()),
                   path("api/simulatorgames", views.SimulatorGamesApiView.as_view()),
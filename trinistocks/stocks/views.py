@@ -1,7 +1,7 @@
 # region IMPORTS
 # Imports from standard Python lib
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 from urllib.parse import urlencode
 
@@ -11,11 +11,13 @@ from django import forms
 from django.contrib.auth import authenticate, get_user_model, login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 # Imports from cheese factory
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.db.models import F
 from django.db.utils import IntegrityError
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
@@ -35,8 +37,28 @@ from rest_framework.response import Response
 from scheduled_scripts.updatedb import updater
 
 # Imports from local machine
-from . import filters, forms, models, serializers
+from . import (
+    bulk_export,
+    caching,
+    correlations,
+    fast_serializers,
+    filters,
+    forms,
+    fundamental_comparison,
+    market_overview,
+    models,
+    news_search,
+    pagination,
+    portfolio_analytics,
+    preferences,
+    price_series,
+    reference_data,
+    screener,
+    serializers,
+    time_series,
+)
 from . import tables as stocks_tables
+from .table_exports import StreamingExportMixin
 from .templatetags import stocks_template_tags
 
 # endregion
@@ -52,7 +74,7 @@ LOGGER = logging.getLogger("root")
 # Regular Page Views
 
 
-class HomePageView(ExportMixin, tables2.MultiTableMixin, FilterView):
+class HomePageView(caching.ConditionalPageMixin, ExportMixin, tables2.MultiTableMixin, FilterView):
     """
     Our homepage for trinistocks.com
     """
@@ -87,6 +109,16 @@ class HomePageView(ExportMixin, tables2.MultiTableMixin, FilterView):
                 return redirect(url)
         return super(HomePageView, self).get(request)
 
+    def get_data_version_names(self):
+        """
+        Depend on the versions of the trading day shown, the days in the index charts and the news
+        """
+        try:
+            selected_date = datetime.strptime(self.request.GET.get("date"), "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return [caching.DAILY_STOCK_SUMMARY, caching.HISTORICAL_INDICES_INFO, caching.STOCK_NEWS_DATA]
+        return market_overview.get_data_version_names(selected_date.date()) + [caching.STOCK_NEWS_DATA]
+
     def get_context_data(self, *args, **kwargs):
         try:
             errors = ""
@@ -94,90 +126,25 @@ class HomePageView(ExportMixin, tables2.MultiTableMixin, FilterView):
             # get the current context
             context = super().get_context_data(*args, **kwargs)
             selected_date = datetime.strptime(self.request.GET.get("date"), "%Y-%m-%d")
-            # get the date 4 weeks back for the market indexes
-            trailing_30d_date = selected_date - timedelta(days=30)
             if not selected_date:
                 raise RuntimeError("Could not get a valid date for this query.")
-            # Now select the records corresponding to the selected date
-            # as well as their symbols, and order by the highest volume traded
-            daily_trading_summary_records = (
-                models.DailyStockSummary.objects.filter(was_traded_today=1)
-                .filter(date=selected_date)
-                .select_related("symbol")
-                .order_by("-value_traded")
-            )
-            if not daily_trading_summary_records:
-                raise ValueError("No data available for the date selected.")
-            # rename the symbol field properly and select only required fields
-            selected_records = daily_trading_summary_records.values(
-                "symbol", "value_traded"
-            )
-            # check if an export request was received
-            # Set up the graph
-            # get the top 10 records by value traded
-            graph_symbols = [record["symbol"] for record in selected_records[:10]]
-            graph_value_traded = [
-                record["value_traded"] for record in selected_records[:10]
-            ]
-            # create a category for the sum of all other symbols (not in the top 10)
-            others = dict(symbol="Others", value_traded=0)
-            for record in selected_records:
-                if (record["symbol"] not in graph_symbols) and record["value_traded"]:
-                    others["value_traded"] += record["value_traded"]
-            # add the 'other' category to the graph
-            graph_symbols.append(others["symbol"])
-            graph_value_traded.append(others["value_traded"])
-            # get a human readable date
-            selected_date_parsed = selected_date.strftime("%Y-%m-%d")
-            # Now set up the data for the market indexes
-            market_indexes_records = (
-                models.HistoricalIndicesInfo.objects.filter(date__gt=trailing_30d_date)
-                .filter(date__lt=selected_date)
-                .order_by("date")
-            )
-            tnt_data = market_indexes_records.filter(index_name="All T&T Totals")
-            tnt_values = [obj.index_value for obj in tnt_data]
-            tnt_dates = [datetime.strftime(obj.date, "%d-%m-%Y") for obj in tnt_data]
-            composite_data = market_indexes_records.filter(
-                index_name="Composite Totals"
+            # the page only changes when the scrapers write new data, so cache it against the versions
+            # that it depends on (which were fetched to answer conditional requests)
+            cache_key = caching.build_cache_key(
+                "homepage", self.data_versions, selected_date.strftime("%Y-%m-%d")
             )
-            composite_dates = [
-                datetime.strftime(obj.date, "%d-%m-%Y") for obj in composite_data
-            ]
-            composite_values = [obj.index_value for obj in composite_data]
-            cross_listed_data = market_indexes_records.filter(
-                index_name="Cross-Listed Totals"
-            )
-            cross_listed_dates = [
-                datetime.strftime(obj.date, "%d-%m-%Y") for obj in cross_listed_data
-            ]
-            cross_listed_values = [obj.index_value for obj in cross_listed_data]
-            sme_data = market_indexes_records.filter(index_name="Sme Totals")
-            sme_dates = [datetime.strftime(obj.date, "%d-%m-%Y") for obj in sme_data]
-            sme_values = [obj.index_value for obj in sme_data]
-            # set up the news data
-            stock_news_records = models.StockNewsData.objects.select_related(
-                "symbol"
-            ).order_by("-date")[:10]
+            home_page_data = cache.get(cache_key)
+            if home_page_data is None:
+                home_page_data = self.get_home_page_data(selected_date)
+                cache.set(cache_key, home_page_data, caching.CACHE_TIMEOUT)
             # Now add our context data and return a response
             context["errors"] = errors
-            context["selected_date"] = selected_date.date()
-            context["selected_date_parsed"] = selected_date_parsed
-            context["graph_symbols"] = graph_symbols
-            context["graph_value_traded"] = graph_value_traded
-            context["tnt_dates"] = tnt_dates
-            context["tnt_values"] = tnt_values
-            context["composite_dates"] = composite_dates
-            context["composite_values"] = composite_values
-            context["cross_listed_dates"] = cross_listed_dates
-            context["cross_listed_values"] = cross_listed_values
-            context["sme_dates"] = sme_dates
-            context["sme_values"] = sme_values
+            context.update(home_page_data["context"])
             context["daily_traded_table"] = stocks_tables.DailyTradingSummaryTable(
-                daily_trading_summary_records
+                home_page_data["daily_trading_summary_records"]
             )
             context["stock_news_table"] = stocks_tables.StockNewsTable(
-                stock_news_records
+                home_page_data["stock_news_records"]
             )
             LOGGER.info("Successfully loaded page.")
         except ValueError as verr:
@@ -191,14 +158,56 @@ class HomePageView(ExportMixin, tables2.MultiTableMixin, FilterView):
             context["errors"] = ALERTMESSAGE + str(ex)
         return context
 
+    def get_home_page_data(self, selected_date):
+        """
+        Query and build everything shown on the homepage for the selected date
+        """
+        # Now select the records corresponding to the selected date
+        # as well as their symbols, and order by the highest volume traded
+        daily_trading_summary_records = list(
+            models.DailyStockSummary.objects.filter(was_traded_today=1)
+            .filter(date=selected_date)
+            .select_related("symbol")
+            .order_by("-value_traded")
+        )
+        if not daily_trading_summary_records:
+            raise ValueError("No data available for the date selected.")
+        # Set up the graph of the top 10 symbols by value traded, and the market indexes for the last 4 weeks
+        overview = market_overview.get_market_overview(selected_date.date())
+        market_indices = overview["market_indices"]
+        # set up the news data
+        stock_news_records = list(
+            models.StockNewsData.objects.select_related("symbol").order_by("-date")[:10]
+        )
+        context = {
+            "selected_date": selected_date.date(),
+            "selected_date_parsed": selected_date.strftime("%Y-%m-%d"),
+            "graph_symbols": overview["graph_symbols"],
+            "graph_value_traded": overview["graph_value_traded"],
+        }
+        for index_key, index_series in market_indices.items():
+            context[f"{index_key}_dates"] = [
+                datetime.strftime(index_date, "%d-%m-%Y") for index_date in index_series["dates"]
+            ]
+            context[f"{index_key}_values"] = index_series["values"]
+        return {
+            "context": context,
+            "daily_trading_summary_records": daily_trading_summary_records,
+            "stock_news_records": stock_news_records,
+        }
 
-class DailyTradingSummaryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+
+class DailyTradingSummaryView(
+    caching.ConditionalPageMixin, StreamingExportMixin, tables2.views.SingleTableMixin, FilterView
+):
     """
     Set up the data for the Daily Equity Summary page
     """
 
     template_name = "stocks/base_dailytradingsummary.html"
     model = models.DailyStockSummary
+    # the table shows the symbol and currency of each row from the listed equities
+    queryset = models.DailyStockSummary.objects.select_related("symbol")
     table_class = stocks_tables.DailyTradingSummaryTable
     filterset_class = filters.DailyTradingSummaryFilter
 
@@ -228,6 +237,12 @@ class DailyTradingSummaryView(ExportMixin, tables2.views.SingleTableMixin, Filte
                 return redirect(url)
         return super(DailyTradingSummaryView, self).get(request)
 
+    def get_data_version_names(self):
+        """
+        Depend on the version of the trading day shown
+        """
+        return [caching.data_version_name(caching.DAILY_STOCK_SUMMARY, date=self.request.GET.get("date"))]
+
     def get_context_data(self, *args, **kwargs):
         try:
             errors = ""
@@ -345,13 +360,14 @@ class ListedStocksView(ExportMixin, tables2.MultiTableMixin, FilterView):
         return context
 
 
-class TechnicalAnalysisSummary(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class TechnicalAnalysisSummary(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     Set up the data for the technical analysis summary page
     """
 
     template_name = "stocks/base_technicalanalysissummary.html"
     model = models.TechnicalAnalysisSummary
+    queryset = models.TechnicalAnalysisSummary.objects.select_related("symbol")
     table_class = stocks_tables.TechnicalAnalysisSummaryTable
     table_pagination = False
     filterset_class = filters.TechnicalAnalysisSummaryFilter
@@ -383,36 +399,18 @@ class FundamentalAnalysisSummary(
     """
 
     template_name = "stocks/base_fundamentalanalysissummary.html"
-    model = models.FundamentalAnalysisSummary
-    qs1 = model.objects.raw(
-        """
-        SELECT * 
-        FROM calculated_fundamental_ratios WHERE (symbol,date) IN (
-        SELECT symbol, MAX(date)
-        FROM calculated_fundamental_ratios
-        WHERE report_type='annual'
-        GROUP BY symbol
-        )
-        AND report_type='annual'
+    model = models.LatestFundamentalAnalysisSummary
+    table_pagination = False
+
+    def get_tables(self):
         """
-    )
-    qs2 = model.objects.raw(
-        """
-        SELECT * 
-        FROM calculated_fundamental_ratios WHERE (symbol,date) IN (
-        SELECT symbol, MAX(date)
-        FROM calculated_fundamental_ratios
-        WHERE report_type='quarterly'
-        GROUP BY symbol
-        )
-        AND report_type='quarterly'
+        Build the annual and quarterly tables from the latest ratios snapshot for each request
         """
-    )
-    tables = [
-        stocks_tables.FundamentalAnalysisSummaryTable(qs1),
-        stocks_tables.FundamentalAnalysisSummaryTable(qs2),
-    ]
-    table_pagination = False
+        queryset = self.model.objects.select_related("symbol")
+        return [
+            stocks_tables.FundamentalAnalysisSummaryTable(queryset.filter(report_type="annual")),
+            stocks_tables.FundamentalAnalysisSummaryTable(queryset.filter(report_type="quarterly")),
+        ]
 
     def get(self, request, *args, **kwargs):
         # get the filters included in the URL.
@@ -451,13 +449,15 @@ class FundamentalAnalysisSummary(
         return context
 
 
-class StockHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class StockHistoryView(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     The class for displaying the stock history view website
     """
 
     template_name = "base_stockhistory.html"
     model = models.DailyStockSummary  # models.something
+    # the table shows the currency of each row from the listed equities
+    queryset = models.DailyStockSummary.objects.select_related("symbol")
     table_class = stocks_tables.HistoricalStockInfoTable  # tables.something
     filterset_class = filters.StockHistoryFilter  # filters.something
     page_name = "Stock History"  # a string representing the name of the page
@@ -512,30 +512,38 @@ class StockHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
         # get the current context
         context = super().get_context_data(*args, **kwargs)
         try:
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
+            listed_stocks = reference_data.get_listed_equities()
             # check the chart type selected if the configure button was clicked
             self.selected_chart_type = self.request.GET.get("chart_type")
             # store the session variable
-            self.request.session["chart_type"] = self.selected_chart_type
+            preferences.set_preference(
+                self.request, "chart_type", self.selected_chart_type
+            )
             if "symbol" in self.request.GET:
                 self.selected_symbol = self.request.GET.get("symbol")
-                self.request.session["selected_symbol"] = self.selected_symbol
+                preferences.set_preference(
+                    self.request, "selected_symbol", self.selected_symbol
+                )
             if self.request.GET.get("configure_button"):
                 self.entered_start_date = datetime.strptime(
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
                 # store the date as a session variable to be reused
-                self.request.session[
-                    "entered_start_date"
-                ] = self.entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    self.entered_start_date.strftime("%Y-%m-%d"),
+                )
             # else look for the starting date in the GET variables
             elif self.request.GET.get("date__gte"):
                 self.entered_start_date = datetime.strptime(
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
-                self.request.session[
-                    "entered_start_date"
-                ] = self.entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    self.entered_start_date.strftime("%Y-%m-%d"),
+                )
             else:
                 # else raise an error
                 raise ValueError(
@@ -557,9 +565,7 @@ class StockHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
                 raise ValueError(
                     " Please ensure that you have included a sort order in the URL! For example: ?sort=date"
                 )
-            self.selected_stock = models.ListedEquities.objects.get(
-                symbol=self.selected_symbol
-            )
+            self.selected_stock = reference_data.get_listed_equity(self.selected_symbol)
             # store the context variable
             context["chart_type"] = self.selected_chart_type
             context["listed_stocks"] = listed_stocks
@@ -573,45 +579,24 @@ class StockHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
             context["close_prices"] = []
             context["highs"] = []
             context["lows"] = []
+            # fetch the series for the chart in one query, reduced to a number of points that the browser can draw
             if self.selected_chart_type == "line":
-                self.historical_records = (
-                    self.model.objects.filter(symbol=self.selected_symbol)
-                    .filter(date__gte=self.entered_start_date)
-                    .filter(date__lte=self.entered_end_date)
-                    .order_by(self.order_by)
+                close_price_series = price_series.get_close_price_series(
+                    self.selected_symbol, self.entered_start_date, self.entered_end_date
                 )
-                context["graph_labels"] = [obj.date for obj in self.historical_records]
-                context["graph_dataset_1"] = [
-                    float(obj.close_price) for obj in self.historical_records
-                ]
+                context["graph_labels"] = close_price_series["dates"]
+                context["graph_dataset_1"] = close_price_series["close_prices"]
             elif self.selected_chart_type == "candlestick":
-                # query and filter the records from the db
-                selected_records = (
-                    models.DailyStockSummary.objects.filter(symbol=self.selected_symbol)
-                    .filter(date__gte=self.entered_start_date)
-                    .filter(date__lte=self.entered_end_date)
-                    .order_by(self.order_by)
+                ohlc_series = price_series.get_ohlc_series(
+                    self.selected_symbol, self.entered_start_date, self.entered_end_date
                 )
                 # store the required values for the chart
-                context["chart_dates"] = [
-                    d.strftime("%Y-%m-%d")
-                    for d in selected_records.values_list("date", flat=True)
-                ]
-                context["open_prices"] = [
-                    float(num)
-                    for num in selected_records.values_list("open_price", flat=True)
-                ]
-                context["close_prices"] = [
-                    float(num)
-                    for num in selected_records.values_list("close_price", flat=True)
-                ]
-                context["lows"] = [
-                    float(num) for num in selected_records.values_list("low", flat=True)
-                ]
-                context["highs"] = [
-                    float(num)
-                    for num in selected_records.values_list("high", flat=True)
-                ]
+                context["chart_dates"] = [d.strftime("%Y-%m-%d") for d in ohlc_series["dates"]]
+                context["open_prices"] = ohlc_series["open_prices"]
+                context["close_prices"] = ohlc_series["close_prices"]
+                context["lows"] = ohlc_series["lows"]
+                context["highs"] = ohlc_series["highs"]
+                context["chart_interval"] = ohlc_series["interval"]
         except ValueError as verr:
             context["errors"] = ALERTMESSAGE + str(verr)
             LOGGER.warning("Got a value error while loading this page: " + str(verr))
@@ -670,15 +655,17 @@ class DividendHistoryView(FilterView):
         try:
             logging.debug("Now loading context data.")
             LOGGER.debug("Now loading all listed equities.")
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
+            listed_stocks = reference_data.get_listed_equities()
             # else look for the starting date in the GET variables
             if "record_date__gte" in self.request.GET:
                 self.entered_start_date = datetime.strptime(
                     self.request.GET.get("record_date__gte"), "%Y-%m-%d"
                 )
-                self.request.session[
-                    "entered_start_date"
-                ] = self.entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    self.entered_start_date.strftime("%Y-%m-%d"),
+                )
             else:
                 # else raise an error
                 raise ValueError(
@@ -695,7 +682,9 @@ class DividendHistoryView(FilterView):
                 )
             if "symbol" in self.request.GET:
                 self.selected_symbol = self.request.GET.get("symbol")
-                self.request.session["selected_symbol"] = self.selected_symbol
+                preferences.set_preference(
+                    self.request, "selected_symbol", self.selected_symbol
+                )
             else:
                 raise ValueError(
                     " Please ensure that you have included a symbol in the URL! For example: ?symbol=ACL"
@@ -710,9 +699,7 @@ class DividendHistoryView(FilterView):
                     "Your starting date must be before your ending date. Please recheck."
                 )
             # Fetch the records
-            self.selected_stock = models.ListedEquities.objects.get(
-                symbol=self.selected_symbol
-            )
+            self.selected_stock = reference_data.get_listed_equity(self.selected_symbol)
             self.historical_dividends_paid = (
                 models.HistoricalDividendInfo.objects.filter(
                     symbol=self.selected_symbol
@@ -765,7 +752,7 @@ class DividendHistoryView(FilterView):
         return context
 
 
-class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class MarketIndexHistoryView(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     Set up the data for the market indices history page
     """
@@ -820,7 +807,7 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
             # get the current context
             context = super().get_context_data(*args, **kwargs)
             LOGGER.debug("Now loading all listed equities.")
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
+            listed_stocks = reference_data.get_listed_equities()
             # now load all the data for the subclasses (pages)
             # note that different pages require different data, so we check which data is needed for the page
             # check if the configuration button was clicked
@@ -830,18 +817,22 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
                 # store the date as a session variable to be reused
-                self.request.session[
-                    "entered_start_date"
-                ] = entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    entered_start_date.strftime("%Y-%m-%d"),
+                )
                 self.entered_start_date = entered_start_date
             # else look for the starting date in the GET variables
             elif self.request.GET.get("date__gte"):
                 entered_start_date = datetime.strptime(
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
-                self.request.session[
-                    "entered_start_date"
-                ] = entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    entered_start_date.strftime("%Y-%m-%d"),
+                )
                 self.entered_start_date = entered_start_date
             else:
                 # else raise an error
@@ -853,8 +844,10 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                 entered_end_date = datetime.strptime(
                     self.request.GET.get("date__lte"), "%Y-%m-%d"
                 )
-                self.request.session["entered_end_date"] = entered_end_date.strftime(
-                    "%Y-%m-%d"
+                preferences.set_preference(
+                    self.request,
+                    "entered_end_date",
+                    entered_end_date.strftime("%Y-%m-%d"),
                 )
                 self.entered_end_date = entered_end_date
             # else look for the ending date in the GET variables
@@ -862,8 +855,10 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                 entered_end_date = datetime.strptime(
                     self.request.GET.get("date__lte"), "%Y-%m-%d"
                 )
-                self.request.session["entered_end_date"] = entered_end_date.strftime(
-                    "%Y-%m-%d"
+                preferences.set_preference(
+                    self.request,
+                    "entered_end_date",
+                    entered_end_date.strftime("%Y-%m-%d"),
                 )
                 self.entered_end_date = entered_end_date
             else:
@@ -904,18 +899,14 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                     self.model.objects.filter(date__gt=self.entered_start_date)
                     .filter(date__lte=self.entered_end_date)
                     .filter(index_name=self.index_name)
-                    .order_by(self.order_by)
                 )
             else:
                 self.historical_records = (
                     self.model.objects.filter(date__gt=self.entered_start_date)
                     .filter(date__lte=self.entered_end_date)
-                    .order_by(self.order_by)
                 )
             LOGGER.debug("Finished parsing GET parameters. Now loading graph data.")
             # Set up our graph
-            graph_labels = [obj.date for obj in self.historical_records]
-            # Store the variables for the subclasses to calculate the required dict
             self.set_graph_dataset()
             # add the context keys
             LOGGER.debug("Loading context keys.")
@@ -927,8 +918,9 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                 context["index_name"] = self.index_name
             context["entered_start_date"] = entered_start_date.strftime("%Y-%m-%d")
             context["entered_end_date"] = entered_end_date.strftime("%Y-%m-%d")
-            context["graph_labels"] = graph_labels
+            context["graph_labels"] = self.graph_labels
             context["graph_dataset"] = self.graph_dataset
+            context["chart_interval"] = self.chart_interval
             LOGGER.info("Successfully loaded page.")
         except ValueError as verr:
             context["errors"] = ALERTMESSAGE + str(verr)
@@ -944,12 +936,21 @@ class MarketIndexHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
     def set_graph_dataset(
             self,
     ):
-        self.graph_dataset = [
-            float(obj[self.index_parameter]) for obj in self.historical_records.values()
-        ]
+        """
+        Load the dates and values of the selected index parameter, resampled to fit the chart
+        """
+        index_series = time_series.get_time_series(
+            self.historical_records,
+            self.index_parameter,
+            time_series.MARKET_INDEX_COLUMN_AGGREGATIONS,
+            self.request.GET.get("interval", time_series.INTERVAL_AUTO),
+        )
+        self.graph_labels = index_series["dates"]
+        self.graph_dataset = index_series["values"]
+        self.chart_interval = index_series["interval"]
 
 
-class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class OSTradesHistoryView(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     Set up the data for the outstanding trades history page
     """
@@ -1007,7 +1008,7 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
             # get the current context
             context = super().get_context_data(*args, **kwargs)
             LOGGER.debug("Now loading all listed equities.")
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
+            listed_stocks = reference_data.get_listed_equities()
             # now load all the data for the subclasses (pages)
             # note that different pages require different data, so we check which data is needed for the page
             # check if the configuration button was clicked
@@ -1017,18 +1018,22 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
                 # store the date as a session variable to be reused
-                self.request.session[
-                    "entered_start_date"
-                ] = entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    entered_start_date.strftime("%Y-%m-%d"),
+                )
                 self.entered_start_date = entered_start_date
             # else look for the starting date in the GET variables
             elif self.request.GET.get("date__gte"):
                 entered_start_date = datetime.strptime(
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
-                self.request.session[
-                    "entered_start_date"
-                ] = entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    entered_start_date.strftime("%Y-%m-%d"),
+                )
                 self.entered_start_date = entered_start_date
             else:
                 # else raise an error
@@ -1040,8 +1045,10 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                 entered_end_date = datetime.strptime(
                     self.request.GET.get("date__lte"), "%Y-%m-%d"
                 )
-                self.request.session["entered_end_date"] = entered_end_date.strftime(
-                    "%Y-%m-%d"
+                preferences.set_preference(
+                    self.request,
+                    "entered_end_date",
+                    entered_end_date.strftime("%Y-%m-%d"),
                 )
                 self.entered_end_date = entered_end_date
             # else look for the ending date in the GET variables
@@ -1049,8 +1056,10 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                 entered_end_date = datetime.strptime(
                     self.request.GET.get("date__lte"), "%Y-%m-%d"
                 )
-                self.request.session["entered_end_date"] = entered_end_date.strftime(
-                    "%Y-%m-%d"
+                preferences.set_preference(
+                    self.request,
+                    "entered_end_date",
+                    entered_end_date.strftime("%Y-%m-%d"),
                 )
                 self.entered_end_date = entered_end_date
             else:
@@ -1062,12 +1071,16 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                 if self.request.GET.get("configure_button"):
                     selected_symbol = self.request.GET.get("symbol")
                     self.selected_symbol = selected_symbol
-                    self.request.session["selected_symbol"] = selected_symbol
+                    preferences.set_preference(
+                        self.request, "selected_symbol", selected_symbol
+                    )
                 # else look for the stock code in the GET variables
                 elif self.request.GET.get("symbol"):
                     selected_symbol = self.request.GET.get("symbol")
                     self.selected_symbol = selected_symbol
-                    self.request.session["selected_symbol"] = selected_symbol
+                    preferences.set_preference(
+                        self.request, "selected_symbol", selected_symbol
+                    )
                 else:
                     raise ValueError(
                         " Please ensure that you have included a symbol in the URL! For example: ?symbol=ACL"
@@ -1107,32 +1120,25 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                 errors += "Your starting date must be before your ending date. Please recheck."
             # Fetch the records
             if self.symbol_needed:
-                self.selected_stock = models.ListedEquities.objects.get(
-                    symbol=self.selected_symbol
-                )
+                self.selected_stock = reference_data.get_listed_equity(self.selected_symbol)
                 self.historical_records = (
                     self.model.objects.filter(symbol=self.selected_symbol)
                     .filter(date__gte=self.entered_start_date)
                     .filter(date__lte=self.entered_end_date)
-                    .order_by(self.order_by)
                 )
             elif self.index_name_needed:
                 self.historical_records = (
                     self.model.objects.filter(date__gt=self.entered_start_date)
                     .filter(date__lte=self.entered_end_date)
                     .filter(index_name=self.index_name)
-                    .order_by(self.order_by)
                 )
             else:
                 self.historical_records = (
                     self.model.objects.filter(date__gt=self.entered_start_date)
                     .filter(date__lte=self.entered_end_date)
-                    .order_by(self.order_by)
                 )
             LOGGER.debug("Finished parsing GET parameters. Now loading graph data.")
             # Set up our graph
-            graph_labels = [obj.date for obj in self.historical_records]
-            # Store the variables for the subclasses to calculate the required dict
             self.set_graph_dataset()
             # add the context keys
             LOGGER.debug("Loading context keys.")
@@ -1151,8 +1157,9 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
                 context["os_parameter_string"] = self.os_parameter_string
             context["entered_start_date"] = entered_start_date.strftime("%Y-%m-%d")
             context["entered_end_date"] = entered_end_date.strftime("%Y-%m-%d")
-            context["graph_labels"] = graph_labels
+            context["graph_labels"] = self.graph_labels
             context["graph_dataset"] = self.graph_dataset
+            context["chart_interval"] = self.chart_interval
             LOGGER.info("Successfully loaded page.")
         except ValueError as verr:
             context["errors"] = ALERTMESSAGE + str(verr)
@@ -1168,12 +1175,21 @@ class OSTradesHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVie
     def set_graph_dataset(
             self,
     ):
-        self.graph_dataset = [
-            obj[self.os_parameter] for obj in self.historical_records.values()
-        ]
+        """
+        Load the dates and values of the selected outstanding trades parameter, resampled to fit the chart
+        """
+        os_series = time_series.get_time_series(
+            self.historical_records,
+            self.os_parameter,
+            time_series.OUTSTANDING_TRADES_COLUMN_AGGREGATIONS,
+            self.request.GET.get("interval", time_series.INTERVAL_AUTO),
+        )
+        self.graph_labels = os_series["dates"]
+        self.graph_dataset = os_series["values"]
+        self.chart_interval = os_series["interval"]
 
 
-class FundamentalHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class FundamentalHistoryView(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     Set up the data for the fundamental history page
     """
@@ -1234,29 +1250,35 @@ class FundamentalHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
             if self.request.GET.get("symbol1"):
                 self.symbol1 = self.request.GET.get("symbol1")
                 # store the session variable
-                self.request.session["symbol1"] = self.symbol1
+                preferences.set_preference(self.request, "symbol1", self.symbol1)
             if self.request.GET.get("symbol2"):
                 self.symbol2 = self.request.GET.get("symbol2")
                 # store the session variable
-                self.request.session["symbol2"] = self.symbol2
+                preferences.set_preference(self.request, "symbol2", self.symbol2)
             if self.request.GET.get("indicator"):
                 self.selected_indicator = self.request.GET.get("indicator")
                 # store the session variable
-                self.request.session["selected_indicator"] = self.selected_indicator
+                preferences.set_preference(
+                    self.request, "selected_indicator", self.selected_indicator
+                )
             if self.request.GET.get("date__gte"):
                 entered_start_date = datetime.strptime(
                     self.request.GET.get("date__gte"), "%Y-%m-%d"
                 )
-                self.request.session[
-                    "entered_start_date"
-                ] = entered_start_date.strftime("%Y-%m-%d")
+                preferences.set_preference(
+                    self.request,
+                    "entered_start_date",
+                    entered_start_date.strftime("%Y-%m-%d"),
+                )
                 self.entered_start_date = entered_start_date
             if self.request.GET.get("date__lte"):
                 entered_end_date = datetime.strptime(
                     self.request.GET.get("date__lte"), "%Y-%m-%d"
                 )
-                self.request.session["entered_end_date"] = entered_end_date.strftime(
-                    "%Y-%m-%d"
+                preferences.set_preference(
+                    self.request,
+                    "entered_end_date",
+                    entered_end_date.strftime("%Y-%m-%d"),
                 )
                 self.entered_end_date = entered_end_date
             # validate input data
@@ -1264,81 +1286,38 @@ class FundamentalHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
                 errors += "Your starting date must be before your ending date. Please recheck."
             LOGGER.debug("Finished parsing GET parameters. Now loading graph data.")
             # fetch data from the db
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
-            historical_records_1 = (
-                self.model.objects.filter(symbol=self.symbol1)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
-                .filter(report_type="annual")
-            )
-            historical_records_2 = (
-                self.model.objects.filter(symbol=self.symbol2)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
-                .filter(report_type="annual")
-            )
-            historical_quarterly_records_1 = (
-                self.model.objects.filter(symbol=self.symbol1)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
-                .filter(report_type="quarterly")
-            )
-            historical_quarterly_records_2 = (
-                self.model.objects.filter(symbol=self.symbol2)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
-                .filter(report_type="quarterly")
+            listed_stocks = reference_data.get_listed_equities()
+            compared_symbols = list(dict.fromkeys([self.symbol1, self.symbol2]))
+            # fetch the selected indicator for both symbols and report types in one query
+            comparison = fundamental_comparison.get_fundamental_comparison(
+                compared_symbols, self.selected_indicator, self.entered_start_date, self.entered_end_date
             )
-            historical_close_prices_1 = (
-                models.DailyStockSummary.objects.filter(symbol=self.symbol1)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
-            )
-            historical_close_prices_2 = (
-                models.DailyStockSummary.objects.filter(symbol=self.symbol2)
-                .filter(date__gte=self.entered_start_date)
-                .filter(date__lte=self.entered_end_date)
+            close_prices = price_series.get_close_price_series_for_symbols(
+                compared_symbols, self.entered_start_date, self.entered_end_date
             )
             # set up a list of all the valid indicators
-            all_indicators = []
-            for field in self.model._meta.fields:
-                if field.column not in ["id", "symbol", "date", "report_type"]:
-                    temp_indicator = dict()
-                    temp_indicator["field_name"] = field.column
-                    temp_indicator["verbose_name"] = field.verbose_name
-                    all_indicators.append(temp_indicator)
-                    if field.column == self.selected_indicator:
-                        self.selected_indicator_verbose_name = field.verbose_name
+            all_indicators = fundamental_comparison.get_indicators()
+            self.selected_indicator_verbose_name = comparison["indicator_name"]
             # Set up our graph
             # set up the annual data
-            graph_labels_1 = [obj.date for obj in historical_records_1]
-            graph_labels_2 = [obj.date for obj in historical_records_2]
-            graph_dataset_1 = [
-                obj[self.selected_indicator] for obj in historical_records_1.values()
-            ]
-            graph_dataset_2 = [
-                obj[self.selected_indicator] for obj in historical_records_2.values()
-            ]
+            annual_series_1 = fundamental_comparison.get_symbol_series(comparison["annual"], self.symbol1)
+            annual_series_2 = fundamental_comparison.get_symbol_series(comparison["annual"], self.symbol2)
+            graph_labels_1 = annual_series_1["dates"]
+            graph_labels_2 = annual_series_2["dates"]
+            graph_dataset_1 = annual_series_1["values"]
+            graph_dataset_2 = annual_series_2["values"]
             # set up the quarterly data
-            quarterly_dates_1 = [obj.date for obj in historical_quarterly_records_1]
-            quarterly_dates_2 = [obj.date for obj in historical_quarterly_records_2]
-            quarterly_dataset_1 = [
-                obj[self.selected_indicator]
-                for obj in historical_quarterly_records_1.values()
-            ]
-            quarterly_dataset_2 = [
-                obj[self.selected_indicator]
-                for obj in historical_quarterly_records_2.values()
-            ]
+            quarterly_series_1 = fundamental_comparison.get_symbol_series(comparison["quarterly"], self.symbol1)
+            quarterly_series_2 = fundamental_comparison.get_symbol_series(comparison["quarterly"], self.symbol2)
+            quarterly_dates_1 = quarterly_series_1["dates"]
+            quarterly_dates_2 = quarterly_series_2["dates"]
+            quarterly_dataset_1 = quarterly_series_1["values"]
+            quarterly_dataset_2 = quarterly_series_2["values"]
             # also include the stock price below
-            graph_labels_3 = [obj.date for obj in historical_close_prices_1]
-            graph_labels_4 = [obj.date for obj in historical_close_prices_2]
-            graph_close_prices_1 = [
-                obj["close_price"] for obj in historical_close_prices_1.values()
-            ]
-            graph_close_prices_2 = [
-                obj["close_price"] for obj in historical_close_prices_2.values()
-            ]
+            graph_labels_3 = close_prices[self.symbol1]["dates"]
+            graph_labels_4 = close_prices[self.symbol2]["dates"]
+            graph_close_prices_1 = close_prices[self.symbol1]["close_prices"]
+            graph_close_prices_2 = close_prices[self.symbol2]["close_prices"]
             # add the context keys
             LOGGER.debug("Loading context keys.")
             context["errors"] = errors
@@ -1377,13 +1356,15 @@ class FundamentalHistoryView(ExportMixin, tables2.views.SingleTableMixin, Filter
         return context
 
 
-class StockNewsHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterView):
+class StockNewsHistoryView(StreamingExportMixin, tables2.views.SingleTableMixin, FilterView):
     """
     Set up the data for the news on each stock
     """
 
     template_name = "stocks/base_stocknewshistory.html"
     model = models.StockNewsData
+    # newest first, unless a search orders the news by relevance
+    queryset = models.StockNewsData.objects.select_related("symbol").order_by("-date")
     table_class = stocks_tables.StockNewsHistoryTable
     table_pagination = {"per_page": 10}
     filterset_class = filters.StockNewsHistoryFilter
@@ -1395,7 +1376,7 @@ class StockNewsHistoryView(ExportMixin, tables2.views.SingleTableMixin, FilterVi
             # get the current context
             context = super().get_context_data(*args, **kwargs)
             LOGGER.info("Successfully loaded page.")
-            listed_stocks = models.ListedEquities.objects.all().order_by("symbol")
+            listed_stocks = reference_data.get_listed_equities()
             context["listed_stocks"] = listed_stocks
         except ValueError as verr:
             context["errors"] = ALERTMESSAGE + str(verr)
@@ -1627,7 +1608,7 @@ class PortfolioTransactionsView(LoginRequiredMixin, FormView):
 
 
 class PortfolioSummaryView(
-    LoginRequiredMixin, ExportMixin, tables2.views.SingleTableMixin, FilterView
+    LoginRequiredMixin, StreamingExportMixin, tables2.views.SingleTableMixin, FilterView
 ):
     """
     A page showing an overview of stocks in each user's portfolio, and allowing the user to delete stocks as required.
@@ -1796,10 +1777,26 @@ class PasswordResetRequestView(FormView):
 # API Views
 
 
-class DailyStocksTradedApiView(generics.ListCreateAPIView):
+class DailyStocksTradedApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListCreateAPIView
+):
     serializer_class = serializers.DailyStockSummarySerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(serializers.DailyStockSummarySerializer)
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # page through the results in the order of a unique key
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("-value_traded", "symbol")
+    data_version_table = caching.DAILY_STOCK_SUMMARY
+
+    def get_data_version_names(self):
+        """
+        Depend on the date requested, or on the whole table if the last trading day is being requested
+        """
+        filter_date = self.request.query_params.get("date")
+        if filter_date:
+            return [caching.data_version_name(self.get_data_version_table(), date=filter_date)]
+        return [self.get_data_version_table()]
 
     def get_queryset(self):
         """
@@ -1819,10 +1816,21 @@ class DailyStocksTradedApiView(generics.ListCreateAPIView):
         )
 
 
-class StockNewsApiView(generics.ListCreateAPIView):
+class StockNewsApiView(caching.CachedListApiMixin, generics.ListCreateAPIView):
     serializer_class = serializers.StockNewsDataSerializer
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # searches are paged, ranked by relevance
+    pagination_class = pagination.NewsSearchPagination
+    data_version_table = caching.STOCK_NEWS_DATA
+
+    def paginate_queryset(self, queryset):
+        """
+        Only page through searches, so that requests without a search still get the full list of news
+        """
+        if not self.request.query_params.get("search"):
+            return None
+        return super().paginate_queryset(queryset)
 
     def get_queryset(self):
         """
@@ -1832,12 +1840,15 @@ class StockNewsApiView(generics.ListCreateAPIView):
         filter_symbol = self.request.query_params.get("symbol")
         filter_start_date = self.request.query_params.get("start_date")
         filter_category = self.request.query_params.get("category")
+        search_query = self.request.query_params.get("search")
         if filter_symbol is not None:
             queryset = queryset.filter(symbol=filter_symbol)
         if filter_start_date is not None:
             queryset = queryset.filter(date__gte=filter_start_date)
         if filter_category is not None:
             queryset = queryset.filter(category=filter_category)
+        if search_query:
+            queryset = news_search.search_news(queryset, search_query)
         return queryset
 
 
@@ -1866,10 +1877,11 @@ class ListedStocksApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class TechnicalAnalysisApiView(generics.ListCreateAPIView):
+class TechnicalAnalysisApiView(caching.CachedListApiMixin, generics.ListCreateAPIView):
     serializer_class = serializers.TechnicalAnalysisSerializer
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    data_version_table = caching.TECHNICAL_ANALYSIS_SUMMARY
 
     def get_queryset(self):
         """
@@ -1879,16 +1891,74 @@ class TechnicalAnalysisApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class FundamentalAnalysisApiView(generics.ListCreateAPIView):
+class StockScreenerApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListAPIView
+):
+    """
+    Screen the listed stocks on their latest technical, fundamental and dividend yield metrics,
+    eg. ?screen=pe<15 AND dividend_yield>4 AND price>sma_200&ordering=-dividend_yield
+    """
+
+    serializer_class = serializers.StockScreenerSerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(
+        serializers.StockScreenerSerializer
+    )
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+    data_version_table = caching.STOCK_SCREENER
+
+    def get_data_version_names(self):
+        """
+        The whole screener table is rebuilt at once, so it only has the one version
+        """
+        return [self.get_data_version_table()]
+
+    def list(self, request, *args, **kwargs):
+        # check the screen before looking in the cache, so that invalid screens are never cached
+        try:
+            self.screened_queryset = screener.screen_stocks(
+                models.StockScreener.objects.all(),
+                request.query_params.get("screen", ""),
+                request.query_params.get("ordering", ""),
+            )
+        except ValueError as verr:
+            return Response(
+                data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return self.screened_queryset
+
+
+class FundamentalAnalysisApiView(caching.CachedListApiMixin, generics.ListCreateAPIView):
     serializer_class = serializers.FundamentalAnalysisSerializer
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    data_version_table = caching.CALCULATED_FUNDAMENTAL_RATIOS
+
+    def get_data_version_table(self):
+        """
+        The latest ratios are read from their own table
+        """
+        if self.request.query_params.get("latest") is not None:
+            return caching.LATEST_FUNDAMENTAL_RATIOS
+        return self.data_version_table
+
+    def get_serializer_class(self):
+        if self.request.query_params.get("latest") is not None:
+            return serializers.LatestFundamentalAnalysisSerializer
+        return self.serializer_class
 
     def get_queryset(self):
         """
         check the url for any filters applied and return the filtered queryset
+        If the latest parameter is included, only return the latest annual/quarterly ratios for each symbol
         """
-        queryset = models.FundamentalAnalysisSummary.objects.all()
+        if self.request.query_params.get("latest") is not None:
+            queryset = models.LatestFundamentalAnalysisSummary.objects.select_related("symbol")
+        else:
+            queryset = models.FundamentalAnalysisSummary.objects.select_related("symbol")
         # check for any url filters applied
         filter_symbol = self.request.query_params.get("symbol")
         filter_report_type = self.request.query_params.get("report_type")
@@ -1902,10 +1972,70 @@ class FundamentalAnalysisApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class StockPriceApiView(generics.ListCreateAPIView):
+class FundamentalComparisonApiView(views.APIView):
+    """
+    Return an indicator for several symbols, with their annual and quarterly values aligned on the same dates
+    """
+
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+    # the most symbols that can be compared at once
+    max_symbols = 20
+
+    def get(self, request, format=None):
+        try:
+            symbols = list(
+                dict.fromkeys(
+                    symbol.strip() for symbol in request.query_params.get("symbols", "").split(",") if symbol.strip()
+                )
+            )
+            if not symbols:
+                raise ValueError("Please include a comma separated list of symbols to compare.")
+            if len(symbols) > self.max_symbols:
+                raise ValueError(f"At most {self.max_symbols} symbols can be compared at once.")
+            indicator = request.query_params.get("indicator")
+            if not indicator:
+                raise ValueError("Please include the indicator to compare.")
+            fundamental_comparison.get_indicator_verbose_name(indicator)
+            start_date = datetime.strptime(
+                request.query_params.get("start_date", stocks_template_tags.get_5_yr_back()), "%Y-%m-%d"
+            ).date()
+            end_date = datetime.strptime(
+                request.query_params.get("end_date", stocks_template_tags.get_today()), "%Y-%m-%d"
+            ).date()
+        except ValueError as verr:
+            return Response(data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST)
+        data_versions, last_modified = caching.get_data_versions_and_last_modified(
+            fundamental_comparison.get_data_version_names(symbols)
+        )
+        cache_parts = (",".join(symbols), indicator, start_date, end_date)
+        etag = caching.build_etag(data_versions, "api:fundamentalcomparison", *cache_parts)
+        not_modified_response = caching.get_not_modified_response(request, etag, last_modified)
+        if not_modified_response is not None:
+            caching.set_api_cache_control(not_modified_response)
+            return not_modified_response
+        cache_key = caching.build_cache_key("api:fundamentalcomparison", data_versions, *cache_parts)
+        comparison = cache.get(cache_key)
+        if comparison is None:
+            comparison = fundamental_comparison.get_fundamental_comparison(symbols, indicator, start_date, end_date)
+            cache.set(cache_key, comparison, caching.CACHE_TIMEOUT)
+        comparison_response = Response(comparison)
+        caching.set_validators(comparison_response, etag, last_modified)
+        caching.set_api_cache_control(comparison_response)
+        return comparison_response
+
+
+class StockPriceApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListCreateAPIView
+):
     serializer_class = serializers.StockPriceSerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(serializers.StockPriceSerializer)
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # page through the results in the order of a unique key
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("symbol", "date")
+    data_version_table = caching.DAILY_STOCK_SUMMARY
 
     def get_queryset(self):
         """
@@ -1922,25 +2052,31 @@ class StockPriceApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class LatestStockPriceApiView(generics.ListCreateAPIView):
+class LatestStockPriceApiView(caching.CachedListApiMixin, generics.ListCreateAPIView):
     serializer_class = serializers.LatestStockPriceSerializer
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    data_version_table = caching.LATEST_STOCK_PRICE
 
     def get_queryset(self):
         """
         Return the latest stock price for all stocks
         """
-        queryset = models.DailyStockSummary.objects.raw(
-            "SELECT t.daily_share_id,t.symbol,t.date,t.close_price FROM daily_stock_summary t INNER JOIN (SELECT daily_share_id,symbol,MAX(date) AS MaxDate FROM daily_stock_summary WHERE close_price <> 0.00 GROUP BY symbol) tm ON t.symbol = tm.symbol AND t.date = tm.MaxDate"
-        )
+        queryset = models.LatestStockPrice.objects.all()
         return queryset
 
 
-class DividendPaymentsApiView(generics.ListCreateAPIView):
+class DividendPaymentsApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListCreateAPIView
+):
     serializer_class = serializers.DividendPaymentsSerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(serializers.DividendPaymentsSerializer)
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # page through the results in the order of a unique key
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("symbol", "record_date")
+    data_version_table = caching.HISTORICAL_DIVIDEND_INFO
 
     def get_queryset(self):
         """
@@ -1957,10 +2093,11 @@ class DividendPaymentsApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class DividendYieldsApiView(generics.ListCreateAPIView):
+class DividendYieldsApiView(caching.CachedListApiMixin, generics.ListCreateAPIView):
     serializer_class = serializers.DividendYieldSerializer
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    data_version_table = caching.HISTORICAL_DIVIDEND_YIELD
 
     def get_queryset(self):
         """
@@ -1993,10 +2130,17 @@ class SummarizedDividendYieldsApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class MarketIndicesApiView(generics.ListCreateAPIView):
+class MarketIndicesApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListCreateAPIView
+):
     serializer_class = serializers.MarketIndicesSerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(serializers.MarketIndicesSerializer)
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # page through the results in the order of a unique key
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("date", "summary_id")
+    data_version_table = caching.HISTORICAL_INDICES_INFO
 
     def get_queryset(self):
         """
@@ -2013,10 +2157,102 @@ class MarketIndicesApiView(generics.ListCreateAPIView):
         return queryset
 
 
-class OutstandingTradesApiView(generics.ListCreateAPIView):
+class MarketOverviewApiView(views.APIView):
+    """
+    Return the top symbols by value traded on a date, along with the market indices for the 30 days before it
+    """
+
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+    # the most symbols that can be requested before they are grouped into others
+    max_top_n = 50
+
+    def get(self, request, format=None):
+        filter_date = request.query_params.get("date")
+        # if no date was included, send data for the last date
+        if not filter_date:
+            filter_date = stocks_template_tags.get_latest_date_dailytradingsummary()
+        try:
+            selected_date = datetime.strptime(filter_date, "%Y-%m-%d").date()
+            top_n = min(int(request.query_params.get("top", 10)), self.max_top_n)
+            if top_n < 1:
+                raise ValueError("top must be a positive number.")
+        except ValueError as verr:
+            return Response(data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST)
+        data_versions, last_modified = caching.get_data_versions_and_last_modified(
+            market_overview.get_data_version_names(selected_date)
+        )
+        etag = caching.build_etag(data_versions, "api:marketoverview", selected_date, top_n)
+        not_modified_response = caching.get_not_modified_response(request, etag, last_modified)
+        if not_modified_response is not None:
+            caching.set_api_cache_control(not_modified_response)
+            return not_modified_response
+        cache_key = caching.build_cache_key("api:marketoverview", data_versions, selected_date, top_n)
+        overview = cache.get(cache_key)
+        if overview is None:
+            overview = market_overview.get_market_overview(selected_date, top_n)
+            cache.set(cache_key, overview, caching.CACHE_TIMEOUT)
+        overview_response = Response(overview)
+        caching.set_validators(overview_response, etag, last_modified)
+        caching.set_api_cache_control(overview_response)
+        return overview_response
+
+
+class CorrelationMatrixApiView(views.APIView):
+    """
+    Return the correlation and covariance matrices of the daily returns of the listed stocks over a window of trading
+    days, for all of them or for the comma separated symbols requested (eg. the holdings of a portfolio)
+    """
+
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, format=None):
+        try:
+            window = int(
+                request.query_params.get(
+                    "window", correlations.DEFAULT_CORRELATION_WINDOW
+                )
+            )
+            correlations.check_window(window)
+        except ValueError as verr:
+            return Response(data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST)
+        symbols = None
+        if request.query_params.get("symbols"):
+            symbols = [
+                symbol.strip()
+                for symbol in request.query_params.get("symbols").split(",")
+                if symbol.strip()
+            ]
+        data_versions, last_modified = caching.get_data_versions_and_last_modified(
+            correlations.get_data_version_names()
+        )
+        etag = caching.build_etag(
+            data_versions, "api:correlations", window, request.query_params.get("symbols")
+        )
+        not_modified_response = caching.get_not_modified_response(request, etag, last_modified)
+        if not_modified_response is not None:
+            caching.set_api_cache_control(not_modified_response)
+            return not_modified_response
+        correlations_response = Response(
+            correlations.get_correlation_matrix(window, symbols, data_versions)
+        )
+        caching.set_validators(correlations_response, etag, last_modified)
+        caching.set_api_cache_control(correlations_response)
+        return correlations_response
+
+
+class OutstandingTradesApiView(
+    caching.CachedListApiMixin, fast_serializers.FastListApiMixin, generics.ListCreateAPIView
+):
     serializer_class = serializers.OutstandingTradesSerializer
+    fast_serializer = fast_serializers.ValuesListSerializer(serializers.OutstandingTradesSerializer)
     # require a token to access the api
     permission_classes = (permissions.IsAuthenticated,)
+    # page through the results in the order of a unique key
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("symbol", "date")
+    data_version_table = caching.DAILY_STOCK_SUMMARY
 
     def get_queryset(self):
         """
@@ -2033,6 +2269,55 @@ class OutstandingTradesApiView(generics.ListCreateAPIView):
         return queryset
 
 
+class BulkExportApiView(views.APIView):
+    """
+    Stream a whole dataset (stockprices or marketindices) as CSV, NDJSON, Arrow or Parquet,
+    with optional columns, symbol/index_name, start_date and end_date filters
+    """
+
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, dataset_name, format=None):
+        try:
+            dataset = bulk_export.EXPORT_DATASETS.get(dataset_name)
+            if dataset is None:
+                raise ValueError(f"Unknown dataset {dataset_name}.")
+            output_format = request.query_params.get("output", bulk_export.FORMAT_CSV)
+            if output_format not in bulk_export.EXPORT_CONTENT_TYPES:
+                raise ValueError(f"Unknown output format {output_format}.")
+            if output_format in bulk_export.ARROW_FORMATS and not bulk_export.is_arrow_available():
+                return Response(
+                    data=f"Error: {output_format} output is not available on this server.",
+                    status=status.HTTP_406_NOT_ACCEPTABLE,
+                )
+            columns = dataset.columns
+            if request.query_params.get("columns"):
+                columns = tuple(request.query_params.get("columns").split(","))
+                unknown_columns = [column for column in columns if column not in dataset.columns]
+                if unknown_columns:
+                    raise ValueError(f"Unknown columns {','.join(unknown_columns)}.")
+            names = None
+            if request.query_params.get(dataset.name_query_param):
+                names = request.query_params.get(dataset.name_query_param).split(",")
+            start_date = end_date = None
+            if request.query_params.get("start_date"):
+                start_date = datetime.strptime(request.query_params.get("start_date"), "%Y-%m-%d").date()
+            if request.query_params.get("end_date"):
+                end_date = datetime.strptime(request.query_params.get("end_date"), "%Y-%m-%d").date()
+        except ValueError as verr:
+            return Response(data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST)
+        queryset = bulk_export.get_export_queryset(dataset, names, start_date, end_date)
+        export_response = StreamingHttpResponse(
+            bulk_export.stream_export(dataset, queryset, columns, output_format),
+            content_type=bulk_export.EXPORT_CONTENT_TYPES[output_format],
+        )
+        export_response["Content-Disposition"] = (
+            f'attachment; filename="{dataset_name}.{bulk_export.EXPORT_FILE_EXTENSIONS[output_format]}"'
+        )
+        return export_response
+
+
 class PortfolioSummaryApiView(generics.ListCreateAPIView):
     serializer_class = serializers.PortfolioSummarySerializer
     # require a token to access the api
@@ -2045,6 +2330,59 @@ class PortfolioSummaryApiView(generics.ListCreateAPIView):
         queryset = models.PortfolioSummary.objects.all().filter(user=self.request.user)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        List the holdings with their time-weighted and money-weighted returns,
+        and with ?include_overall=true, the returns of the whole portfolio as well
+        """
+        self.analytics = portfolio_analytics.get_portfolio_analytics(
+            [request.user.pk]
+        )[request.user.pk]
+        api_response = super().list(request, *args, **kwargs)
+        if request.query_params.get("include_overall") == "true":
+            api_response.data = {
+                "holdings": api_response.data,
+                "overall": self.analytics["overall"],
+            }
+        return api_response
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["analytics"] = getattr(self, "analytics", None)
+        return context
+
+
+class PortfolioValueHistoryApiView(views.APIView):
+    """
+    Return the daily value of the current user's portfolio, and the net amount invested in it, for charting
+    """
+
+    # require a token to access the api
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, format=None):
+        try:
+            queryset = models.PortfolioDailyValue.objects.filter(user=request.user)
+            if request.query_params.get("start_date"):
+                queryset = queryset.filter(
+                    date__gte=datetime.strptime(request.query_params.get("start_date"), "%Y-%m-%d").date()
+                )
+            if request.query_params.get("end_date"):
+                queryset = queryset.filter(
+                    date__lte=datetime.strptime(request.query_params.get("end_date"), "%Y-%m-%d").date()
+                )
+        except ValueError as verr:
+            return Response(data="Error: " + str(verr), status=status.HTTP_400_BAD_REQUEST)
+        value_history = {"dates": [], "market_values": [], "net_invested": []}
+        # read with the (user, date) unique index
+        for value_date, market_value, net_invested in queryset.order_by("date").values_list(
+            "date", "market_value", "net_invested"
+        ):
+            value_history["dates"].append(value_date)
+            value_history["market_values"].append(market_value)
+            value_history["net_invested"].append(net_invested)
+        return Response(value_history)
+
 
 class PortfolioSectorsApiView(generics.ListCreateAPIView):
     serializer_class = serializers.PortfolioSectorsSerializer
@@ -2233,7 +2571,7 @@ class ChangePasswordView(generics.UpdateAPIView):
         if serializer.is_valid():
             # if both required passwords were provided, check the old password first
             if not self.object.check_password(serializer.data.get("old_password")):
-                response = {
+                api_response = {
                     "status": "failed",
                     "code": status.HTTP_401_UNAUTHORIZED,
                     "message": "Your provided credentials do not seem to match any existing record.",
@@ -2244,13 +2582,13 @@ class ChangePasswordView(generics.UpdateAPIView):
                 # set_password also hashes the password that the user will get
                 self.object.set_password(serializer.data.get("new_password"))
                 self.object.save()
-                response = {
+                api_response = {
                     "status": "success",
                     "code": status.HTTP_200_OK,
                     "message": "Your password was updated successfully!",
                     "data": [],
                 }
-            return Response(response)
+            return Response(api_response)
         else:
             # else the serializer may be missing some required parameter
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2324,6 +2662,15 @@ class SimulatorPlayersApiView(generics.ListCreateAPIView):
             )
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == "GET":
+            # calculate the returns of all of the players listed in one batch
+            context["players_analytics"] = portfolio_analytics.get_simulator_analytics(
+                self.get_queryset().values_list("simulator_player_id", flat=True)
+            )
+        return context
+
     def post(self, request):
         try:
             # check if this is an update request
@@ -2444,13 +2791,14 @@ class SimulatorTransactionsApiView(generics.UpdateAPIView):
                         )
             # first build our serializer data
             simulator_transaction_data = {}
+            simulator_game = models.SimulatorGames.objects.get(
+                game_name=self.request.POST["game_name"]
+            )
             simulator_transaction_data[
                 "simulator_player"
             ] = models.SimulatorPlayers.objects.get(
                 user=self.request.user,
-                simulator_game=models.SimulatorGames.objects.get(
-                    game_name=self.request.POST["game_name"]
-                ),
+                simulator_game=simulator_game,
             ).pk
             simulator_transaction_data["symbol"] = models.ListedEquities.objects.get(
                 symbol=self.request.POST["symbol"]
@@ -2470,6 +2818,8 @@ class SimulatorTransactionsApiView(generics.UpdateAPIView):
                 # update the market values
                 updater.update_simulator_portfolio_summary_market_values()
                 updater.update_simulator_portfolio_sectors_values()
+                # and the leaderboard for this game
+                updater.update_simulator_games(game_ids=[simulator_game.game_id])
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2499,14 +2849,28 @@ class SimulatorPortfoliosApiView(generics.ListCreateAPIView):
         Return all objects in the portfolio for the current authorized user
         """
         queryset = models.SimulatorPortfolios.objects.all().filter(
-            simulator_player_id=models.SimulatorPlayers.objects.get(
+            simulator_player_id=self.get_simulator_player()
+        )
+        return queryset
+
+    def get_simulator_player(self):
+        if not hasattr(self, "simulator_player"):
+            self.simulator_player = models.SimulatorPlayers.objects.get(
                 user=self.request.user,
                 simulator_game=models.SimulatorGames.objects.get(
                     game_name=self.request.GET["game_name"]
                 ),
             )
-        )
-        return queryset
+        return self.simulator_player
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == "GET":
+            simulator_player_id = self.get_simulator_player().pk
+            context["analytics"] = portfolio_analytics.get_simulator_analytics(
+                [simulator_player_id]
+            )[simulator_player_id]
+        return context
 
 
 class SimulatorPortfolioSectorsApiView(generics.ListCreateAPIView):
@@ -2553,8 +2917,25 @@ class MonitoredStocksApiView(generics.ListCreateAPIView):
                         symbol=models.ListedEquities(
                             symbol=self.request.POST["symbol"]
                         ),
+                        alert_price_above=self.request.POST.get("alert_price_above")
+                        or None,
+                        alert_price_below=self.request.POST.get("alert_price_below")
+                        or None,
                     )
                     queryset.save()
+                elif self.request.POST["operation"] == "set_alerts":
+                    # set (or clear, if they are left out) the price alerts of a monitored stock
+                    models.MonitoredStocks.objects.filter(
+                        user=self.request.user,
+                        symbol=models.ListedEquities(
+                            symbol=self.request.POST["symbol"]
+                        ),
+                    ).update(
+                        alert_price_above=self.request.POST.get("alert_price_above")
+                        or None,
+                        alert_price_below=self.request.POST.get("alert_price_below")
+                        or None,
+                    )
                 elif self.request.POST["operation"] == "remove_monitor":
                     queryset = models.MonitoredStocks.objects.filter(
                         user=self.request.user,
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
 
 from django.urls import reverse_lazy
 
@@ -68,7 +69,7 @@ DEFAULT_AUTO_FIELD: str = 'django.db.models.fields.BigAutoField'
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "stocks.authentication.CachedTokenAuthentication",
     ],
 }
 DJANGO_REST_PASSWORDRESET_TOKEN_CONFIG = {
@@ -96,6 +97,26 @@ MIDDLEWARE = [
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+# read sessions from the cache, so that only the requests that change a session use the database
+# (the history pages only store their preferences when they change, see stocks/preferences.py)
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Cached pages are keyed on the data versions bumped by the scrapers (see stocks/caching.py),
+# so they work with any backend. Sessions (and api token lookups) are cached here too, though, so in production
+# this must be a cache shared by all of the workers (eg. the file based default), or else a logout in one worker
+# is not seen by the others. locmem is only suitable for testing with a single process.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get(
+            "DJANGO_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "trinistocks_cache")
+        ),
+    }
+}
 
 ROOT_URLCONF = "trinistocks.urls"
 
@@ -254,9 +275,14 @@ AUTH_USER_MODEL = "stocks.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "stocks.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
+# the default and largest number of rows per page for the paginated market data apis
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 1000))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 5000))
+# how long (in seconds) api tokens are cached for after they are looked up
+TOKEN_AUTHENTICATION_CACHE_TIMEOUT = int(os.environ.get("TOKEN_AUTHENTICATION_CACHE_TIMEOUT", 60 * 5))